@@ -9,9 +9,10 @@ from bemore.core.connectors import (
     RequiredInput,
     RequiredMultiInput,
     connect,
+    disconnect,
 )
-from bemore.core.node import BasicNode, NodeProto
-from bemore.core.system import BasicSystem, SystemProto
+from bemore.core.node import AsyncNodeProto, BasicNode, BatchNodeProto, NodeProto
+from bemore.core.system import BasicSystem, ExecutionPlan, SystemProto
 from bemore.core.typing import DynamicTypeVar
 from bemore.types import Float, Int, String
 
@@ -29,11 +30,15 @@ __all__ = [
     "RequiredMultiInput",
     "BasicOutput",
     "connect",
+    "disconnect",
     # bemore.core.node
+    "AsyncNodeProto",
     "BasicNode",
+    "BatchNodeProto",
     "NodeProto",
     # bemore.core.system
     "BasicSystem",
+    "ExecutionPlan",
     "SystemProto",
     # bemore.core.typing
     "DynamicTypeVar",
@@ -1,9 +1,117 @@
+import array
 import ast
-from typing import Any, Collection, Dict, Set, Tuple
+import copy
+import importlib.util
+import itertools
+import operator
+import sys
+import threading
+from collections.abc import Sized
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    cast,
+)
 
-from bemore import BasicNode, BasicSystem, RequiredInput, SystemProto
+from bemore import (
+    BasicNode,
+    BasicSystem,
+    ExecutionPlan,
+    Float,
+    Int,
+    NodeProto,
+    RequiredInput,
+    SystemProto,
+)
+from bemore.core import code_gen
 from bemore.core.connectors import BasicOutput, InputConnectorProto, OutputConnectorProto
+from bemore.core.node import fingerprint_node
+from bemore.core.source_map import statement_node, tag_statements
 from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Abs, Divide, Modulo, Product, Subtract, Sum
+
+# Nodes whose generated code computes the same values when fed whole float arrays
+VECTORIZABLE_NODES = (KeywordInput, Output, Int, Float, Sum, Product, Subtract, Divide, Modulo, Abs)
+
+# Pools that For can spread independent iterations over
+THREADS = "threads"
+PROCESSES = "processes"
+
+# How a loop output combines the values of its iterations
+LAST = "last"
+COLLECT = "collect"
+ARRAY = "array"
+REDUCE = "reduce"
+
+OUTPUT_MODES = (LAST, COLLECT, ARRAY, REDUCE)
+
+
+@dataclass(frozen=True)
+class OutputMode:
+    mode: str = LAST
+    # Element type of ARRAY outputs, as an array module type code
+    typecode: str = "d"
+    # Binary function folding the values of REDUCE outputs, starting from the first value
+    function: Optional[Callable[[Any, Any], Any]] = None
+
+    @property
+    def function_name(self) -> Optional[str]:
+        # Dotted name the function can be imported by, if there is one
+        if self.function is None:
+            return None
+
+        # Functions of C accelerator modules, e.g. _operator, are found through the public module
+        module_name = getattr(self.function, "__module__", None) or ""
+        qualified_name = getattr(self.function, "__qualname__", "")
+        for candidate in dict.fromkeys([module_name.lstrip("_"), module_name]):
+            target: Any = sys.modules.get(candidate)
+            for attribute in qualified_name.split("."):
+                target = getattr(target, attribute, None)
+
+            if target is self.function:
+                return (
+                    qualified_name if candidate == "builtins" else f"{candidate}.{qualified_name}"
+                )
+
+        return None
+
+
+_worker = threading.local()
+
+
+def _start_worker(
+    subsystem: SystemProto,
+    replayed: List[int],
+    boundary: List[Tuple[int, int]],
+    inputs: Dict[str, Any],
+) -> None:
+    # Each worker loops over its own copy of the subsystem, without the nodes that are replayed
+    subsystem = copy.deepcopy(subsystem)
+    nodes = list(subsystem.nodes)
+    _worker.boundary = [list(nodes[node].get_outputs())[output] for node, output in boundary]
+    subsystem.remove_nodes(*[nodes[node] for node in replayed])
+    _worker.subsystem = subsystem
+    _worker.inputs = inputs
+
+
+def _run_chunk(
+    iterations: Sequence[Dict[str, Any]],
+) -> List[Tuple[Dict[str, Any], Tuple[Any, ...]]]:
+    return [
+        (output_map, tuple(output.get_value() for output in _worker.boundary))
+        for output_map in _worker.subsystem.run_each(iterations, **_worker.inputs)
+    ]
 
 
 class For[T](BasicNode):
@@ -12,11 +120,27 @@ class For[T](BasicNode):
         self._inputs: Dict[str, InputConnectorProto[Any]] = {}
         self._iterables: Dict[str, InputConnectorProto[Any]] = {}
         self._outputs: Dict[str, OutputConnectorProto[Any]] = {}
+        self._output_modes: Dict[str, OutputMode] = {}
 
         # Initialize with a basic system
         self._subsystem: SystemProto = BasicSystem("for")
+        self._subsystem.owner = self
 
         self.inline_subsystem: bool = True
+        self.vectorize: bool = True
+        self.hoist_invariants: bool = True
+        # Lets generated code run the loop in one pass with the loops over the same iterations.
+        # Loops with side effects, like appending to a list with Append, are never fused, a
+        # COLLECT output builds the same list and can be.
+        self.fuse: bool = True
+
+        # Declares the iterations independent, so they can be run on a THREADS or PROCESSES pool
+        self.parallel: Optional[str] = None
+        self.max_workers: Optional[int] = None
+        self.chunk_size: int = 1
+
+        # Streams the per-iteration outputs as iterators, the loop only runs as they are consumed
+        self.stream: bool = False
 
     @property
     def subsystem(self) -> SystemProto:
@@ -26,6 +150,51 @@ class For[T](BasicNode):
     def subsystem(self, subsystem: SystemProto) -> None:
         # Set the new system
         self._subsystem = subsystem
+        self._subsystem.owner = self
+        self.mark_modified()
+
+    @property
+    def subsystems(self) -> Tuple[SystemProto]:
+        return (self._subsystem,)
+
+    @property
+    def cacheable(self) -> bool:
+        # Streamed outputs can only be consumed once, so every run creates new ones
+        return not self.stream and self._subsystem.cacheable
+
+    @property
+    def has_side_effects(self) -> bool:
+        return any(node.has_side_effects for node in self._subsystem.nodes)
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        subsystem_fingerprint = self._subsystem.fingerprint
+        if subsystem_fingerprint is None:
+            return None
+
+        # Reduce functions that can't be named can't be told apart either
+        if any(
+            mode.function is not None and mode.function_name is None
+            for mode in self._output_modes.values()
+        ):
+            return None
+
+        return fingerprint_node(
+            self,
+            list(self._inputs),
+            list(self._iterables),
+            list(self._outputs),
+            self.inline_subsystem,
+            self.hoist_invariants,
+            self.fuse,
+            self._can_vectorize(),
+            self._is_streaming(),
+            [
+                (name, mode.mode, mode.typecode, mode.function_name)
+                for name, mode in self._output_modes.items()
+            ],
+            subsystem_fingerprint,
+        )
 
     @property
     def input_names(self) -> Set[str]:
@@ -68,9 +237,16 @@ class For[T](BasicNode):
         self,
         name: str,
         signature: Any,
+        mode: str = LAST,
+        typecode: str = "d",
+        function: Optional[Callable[[Any, Any], Any]] = None,
     ) -> OutputConnectorProto[Any]:
         assert name not in self._outputs, f"Output with the name {name} already exists."
+        assert mode in OUTPUT_MODES, f"Unknown output mode '{mode}'."
+        assert mode != ARRAY or typecode in array.typecodes, f"Unknown type code '{typecode}'."
+        assert mode != REDUCE or function is not None, "Reduced outputs need a function."
         self._outputs[name] = BasicOutput(self, name, signature)
+        self._output_modes[name] = OutputMode(mode, typecode, function)
 
         self._subsystem.add_node(Output(name))
 
@@ -79,6 +255,7 @@ class For[T](BasicNode):
     def remove_output(self, name: str) -> None:
         assert name in self._outputs, f"Output with the name {name} does not exist."
         del self._outputs[name]
+        del self._output_modes[name]
 
         for node in self._subsystem.get_outputs():
             if node.name == name:
@@ -86,26 +263,170 @@ class For[T](BasicNode):
                 break
 
     def get_inputs(self) -> Collection[InputConnectorProto[Any]]:
-        return self._inputs.values()
+        return [*self._inputs.values(), *self._iterables.values()]
+
+    def output_mode(self, name: str) -> OutputMode:
+        return self._output_modes[name]
 
     def get_outputs(self) -> Collection[OutputConnectorProto[Any]]:
         return self._outputs.values()
 
     def run(self) -> None:
         iterable_values = [connector.get_value() for connector in self._iterables.values()]
-        iterable_names = self._iterables.keys()
-        output_map = {}
+        iterable_names = list(self._iterables.keys())
 
         inputs = {connector.name: connector.get_value() for connector in self._inputs.values()}
+        iterations = (dict(zip(iterable_names, values)) for values in zip(*iterable_values))
+
+        if self._is_streaming():
+            assert self.parallel is None, "Streaming loops cannot run in parallel."
+            assert not self._is_collecting(), "Streaming loop outputs have no modes."
+            # Every output streams from its own copy of the subsystem, so streams share no state
+            # with each other or with later runs, whatever pace they are consumed at. Only the
+            # values of iterators, which can't be iterated again, are buffered between them.
+            count = len(self._outputs)
+            copies = [_copies(values, count) for values in iterable_values]
+            for position, name in enumerate(self._outputs):
+                subsystem = copy.deepcopy(self._subsystem, {id(self): None})
+                split = [values[position] for values in copies]
+                iterations = (dict(zip(iterable_names, items)) for items in zip(*split))
+                stream = subsystem.run_each(iterations, [name], **inputs)
+                self._outputs[name].set_value(map(operator.itemgetter(name), stream))
+            return
 
-        for values in zip(*iterable_values):
-            iterable_inputs = {name: value for name, value in zip(iterable_names, values)}
-            inputs.update(iterable_inputs)
-            output_map = self._subsystem.run(**inputs)
+        if self.parallel is None:
+            output_maps = self._subsystem.run_each(iterations, **inputs)
+        else:
+            output_maps = self._run_parallel(list(iterations), inputs)
 
-        for name, value in output_map.items():
+        # Collected outputs are preallocated when the iterables know their length
+        size = None
+        if all(isinstance(values, Sized) for values in iterable_values):
+            size = min((len(values) for values in iterable_values), default=0)
+
+        for name, value in self._collect(output_maps, size).items():
+            self._outputs[name].set_value(value)
+
+    async def arun(self) -> None:
+        # Awaiting the subsystem keeps async nodes of the loop body on the caller's event loop
+        if self._is_streaming() or self.parallel is not None:
+            self.run()
+            return
+
+        iterable_values = [connector.get_value() for connector in self._iterables.values()]
+        iterable_names = list(self._iterables.keys())
+        inputs = {connector.name: connector.get_value() for connector in self._inputs.values()}
+
+        output_maps = [
+            await self._subsystem.arun(**inputs, **dict(zip(iterable_names, values)))
+            for values in zip(*iterable_values)
+        ]
+        for name, value in self._collect(output_maps, len(output_maps)).items():
             self._outputs[name].set_value(value)
 
+    def _collect(
+        self, output_maps: Iterable[Dict[str, Any]], size: Optional[int]
+    ) -> Dict[str, Any]:
+        results: Dict[str, Any] = {}
+        for name, mode in self._output_modes.items():
+            if mode.mode == COLLECT:
+                results[name] = [] if size is None else [None] * size
+            elif mode.mode == ARRAY:
+                results[name] = array.array(mode.typecode)
+                if size is not None:
+                    results[name].frombytes(bytes(size * results[name].itemsize))
+
+        modes = [
+            (name, mode.mode, cast(Callable[[Any, Any], Any], mode.function))
+            for name, mode in self._output_modes.items()
+        ]
+        for index, output_map in enumerate(output_maps):
+            for name, kind, function in modes:
+                value = output_map[name]
+                if kind == LAST:
+                    results[name] = value
+                elif kind == REDUCE:
+                    results[name] = function(results[name], value) if index else value
+                elif size is None:
+                    results[name].append(value)
+                else:
+                    results[name][index] = value
+
+        return results
+
+    def _run_parallel(
+        self, iterations: List[Dict[str, Any]], inputs: Dict[str, Any]
+    ) -> Iterator[Dict[str, Any]]:
+        assert self.chunk_size >= 1, "Chunks need at least one iteration."
+        plan = self._subsystem.prepare()
+
+        # Nodes with side effects, and everything downstream of them, are replayed here in
+        # iteration order, fed with the values the workers computed for their inputs
+        replayed: Dict[NodeProto, None] = {}
+        for node in plan.nodes:
+            if node.has_side_effects or any(
+                predecessor in replayed for predecessor in plan.predecessors[node]
+            ):
+                replayed[node] = None
+
+        boundary_nodes = {
+            predecessor: None
+            for node in replayed
+            for predecessor in plan.predecessors[node]
+            if predecessor not in replayed and predecessor not in plan.inputs.values()
+        }
+        nodes = list(self._subsystem.nodes)
+        boundary = [
+            (nodes.index(node), index)
+            for node in boundary_nodes
+            for index in range(len(node.get_outputs()))
+        ]
+        boundary_outputs = [output for node in boundary_nodes for output in node.get_outputs()]
+
+        # The owner is left out of the copy sent to the workers, it belongs to the outer system
+        subsystem = copy.deepcopy(self._subsystem, {id(self): None})
+        initargs = (subsystem, [nodes.index(node) for node in replayed], boundary, inputs)
+        chunks = list(itertools.batched(iterations, self.chunk_size))
+
+        for name, value in inputs.items():
+            plan.inputs[name].set_value(value)
+
+        with self._executor(initargs) as executor:
+            for chunk, results in zip(chunks, executor.map(_run_chunk, chunks)):
+                for values, (output_map, boundary_values) in zip(chunk, results):
+                    if not replayed:
+                        yield output_map
+                        continue
+
+                    for name, value in values.items():
+                        plan.inputs[name].set_value(value)
+
+                    for output, value in zip(boundary_outputs, boundary_values):
+                        output.set_value(value)
+
+                    for node in replayed:
+                        node.run()
+
+                    output_map.update(
+                        (name, node.get_value())
+                        for name, node in plan.outputs.items()
+                        if node in replayed
+                    )
+                    yield output_map
+
+        # Only part of the subsystem ran here, the next sequential run starts from scratch
+        for node in plan.nodes:
+            self._subsystem.mark_dirty(node)
+
+    def _executor(self, initargs: Tuple[Any, ...]) -> Executor:
+        if self.parallel == THREADS:
+            return ThreadPoolExecutor(self.max_workers, "bemore-for", _start_worker, initargs)
+
+        if self.parallel == PROCESSES:
+            return ProcessPoolExecutor(self.max_workers, None, _start_worker, initargs)
+
+        raise Exception(f"Unknown parallel mode '{self.parallel}'.")
+
     def validate(self) -> None:
         for input_node in self._inputs.values():
             input_node.validate()
@@ -114,14 +435,59 @@ class For[T](BasicNode):
             output_node.validate()
 
     def generate_ast(self) -> ast.Module:
+        chain = self._fusion_chain()
+        if len(chain) > 1:
+            # The fused loop takes the place of the last loop of the chain
+            return self._generate_fused_ast(chain) if chain[-1] is self else code_gen.module()
+
+        return self._generate_loop_ast()
+
+    def _generate_loop_ast(self) -> ast.Module:
+        index = self._code_gen_index()
+        size = self._code_gen_size()
+        targets, hoisted, body, values = self._generate_parts()
+        output_assignments = [
+            self._output_statement(name, value, index, size) for name, value in values.items()
+        ]
+
+        iterables = [
+            code_gen.name(connector.code_gen_name) for connector in self._iterables.values()
+        ]
+        target: ast.expr = ast.Tuple(
+            elts=[ast.Name(name, ast.Store()) for name in targets], ctx=ast.Store()
+        )
+        before, first = _first_iteration(index, hoisted)
+        loop_iter = code_gen.call("zip", *iterables)
+        if self._is_collecting() or first:
+            target = ast.Tuple([ast.Name(index, ast.Store()), target], ast.Store())
+            loop_iter = code_gen.call("enumerate", loop_iter)
+
+        for_loop = _for(target, loop_iter, [*first, *body, *output_assignments])
+
+        if self._is_streaming():
+            return code_gen.module(before, self._generate_streaming_ast(for_loop).body)
 
+        allocations = self._generate_allocations(size)
+        loops = [
+            *self._generate_imports(),
+            *(_sizing(iterables, size) if allocations else []),
+            *allocations,
+            for_loop,
+        ]
+        if self._can_vectorize():
+            loops = self._generate_vectorized_ast(loops, [*hoisted, *body], values).body
+
+        return code_gen.module(before, loops)
+
+    def _generate_parts(
+        self,
+    ) -> Tuple[List[str], List[ast.stmt], List[ast.stmt], Dict[str, ast.expr]]:
+        # Iteration variables, hoisted statements, loop body and output values of the loop
         singular_names = list(self._inputs.keys())
         iterable_names = list(self._iterables.keys())
         input_name_node_map = {node.name: node for node in self._subsystem.get_inputs()}
 
-        iterable_node_names: list[ast.expr] = [
-            ast.Name(input_name_node_map[name].output.code_gen_name) for name in iterable_names
-        ]
+        targets = [input_name_node_map[name].output.code_gen_name for name in iterable_names]
 
         singular_node_name_aliases: Dict[str, str] = {
             input_name_node_map[name].output.code_gen_name: self._inputs[name].code_gen_name
@@ -130,27 +496,586 @@ class For[T](BasicNode):
 
         subsystem_ast = self._subsystem.generate_ast()
 
+        # The loop outputs get the values reaching the subsystem outputs
+        values: Dict[str, ast.expr] = {
+            node.name: code_gen.name(next(iter(node.get_inputs())).code_gen_name)
+            for node in self._subsystem.get_outputs()
+        }
+
         if self.inline_subsystem:
             # Replace subsystem singular inputs with for loop singular names
-            for node in ast.walk(subsystem_ast):
+            reads = [code_gen.expression(value) for value in values.values()]
+            for node in ast.walk(code_gen.module(subsystem_ast.body, reads)):
                 if isinstance(node, ast.Name):
                     alias = singular_node_name_aliases.get(node.id)
                     if alias is not None:
                         node.id = alias
 
-        for_loop = ast.For(
-            iter=ast.Call(
-                ast.Name("zip"),
-                args=[ast.Name(connector.code_gen_name) for connector in self._iterables.values()],
-                keywords=[],
+        body, hoisted = self._split_invariants(subsystem_ast.body)
+        return targets, hoisted, body, values
+
+    def _generate_fused_ast(self, chain: List["For[Any]"]) -> ast.Module:
+        # The chain runs as one loop over the iterations of its first loop. Later loops read the
+        # values earlier loops collect straight from their bodies, and lists that nothing else
+        # reads are never built.
+        head = chain[0]
+        assert head.system is not None
+        index = head._code_gen_index()
+        size = head._code_gen_size()
+        iterables = [
+            code_gen.name(connector.code_gen_name) for connector in head._iterables.values()
+        ]
+        values: Dict[OutputConnectorProto[Any], ast.expr] = {}
+        targets: List[ast.expr] = []
+        preamble: List[ast.stmt] = []
+        chain_hoisted: List[ast.stmt] = []
+        allocations: List[ast.stmt] = []
+        body: List[ast.stmt] = []
+
+        for position, loop in enumerate(chain):
+            loop_targets, hoisted, loop_body, outputs = loop._generate_parts()
+
+            iteration: List[ast.stmt] = []
+            for connector, variable in zip(loop._iterables.values(), loop_targets):
+                source = _upstream(connector)
+                if loop is head:
+                    targets.append(ast.Name(variable, ast.Store()))
+                    values[source] = code_gen.name(variable)
+                else:
+                    iteration.append(code_gen.assign(variable, copy.deepcopy(values[source])))
+
+            read_later = {
+                connector
+                for later in itertools.islice(chain, position + 1, None)
+                for connector in later._iterables.values()
+            }
+            skipped: Set[str] = set()
+            statements: List[ast.stmt] = []
+            for name, value in outputs.items():
+                output = loop._outputs[name]
+                if loop._output_modes[name].mode == COLLECT:
+                    values[output] = value
+                    connections = output.get_connections()
+                    if connections and all(connection in read_later for connection in connections):
+                        skipped.add(name)
+                        continue
+                statements.append(loop._output_statement(name, value, index, size))
+
+            imports = loop._generate_imports()
+            loop_allocations = loop._generate_allocations(size, skipped)
+            tag_statements([*hoisted, *imports, *loop_allocations, *iteration, *statements], loop)
+            preamble.extend(imports)
+            chain_hoisted.extend(hoisted)
+            allocations.extend(loop_allocations)
+            body.extend([*iteration, *loop_body, *statements])
+
+        target = ast.Tuple(
+            [ast.Name(index, ast.Store()), ast.Tuple(targets, ast.Store())], ast.Store()
+        )
+        loop_iter = code_gen.call("enumerate", code_gen.call("zip", *iterables))
+        before, first = _first_iteration(index, chain_hoisted)
+        fused = [*before, _for(target, loop_iter, [*first, *body])]
+
+        # Later loops iterating the iterables of the first loop would get nothing from iterators
+        # the first loop used up, so with iterators the loops run one after the other
+        if not any(
+            not _collected_by(chain, _upstream(connector))
+            for loop in chain[1:]
+            for connector in loop._iterables.values()
+        ):
+            sizing = _sizing(iterables, size) if allocations else []
+            return code_gen.module(preamble, sizing, allocations, fused)
+
+        separate: List[ast.stmt] = []
+        for loop in chain:
+            loop_ast = loop._generate_loop_ast()
+            tag_statements(loop_ast.body, loop)
+            separate.extend(loop_ast.body)
+
+        return code_gen.module(
+            preamble,
+            _sizing(iterables, size),
+            [ast.If(_is_sized(size), [*allocations, *fused], separate)],
+        )
+
+    def _fusion_chain(self) -> List["For[Any]"]:
+        if self.system is None:
+            return [self]
+
+        for chain in _fusion_chains(self.system.prepare()):
+            if self in chain:
+                return chain
+
+        return [self]
+
+    def _is_fusable(self) -> bool:
+        # Vectorized and streaming loops are generated differently, loops with side effects
+        # could observe the interleaving
+        return (
+            self.fuse
+            and self.inline_subsystem
+            and bool(self._iterables)
+            and not self._is_streaming()
+            and not self._can_vectorize()
+            and not self.has_side_effects
+            and all(connector.get_connections() for connector in self.get_inputs())
+        )
+
+    def _can_fuse_after(
+        self, chain: List["For[Any]"], key: int, reach: Dict[NodeProto, Set[int]]
+    ) -> bool:
+        # Singular inputs are read before the fused loop, so they can't come from the chain
+        if any(key in reach.get(_upstream(c).node, set()) for c in self._inputs.values()):
+            return False
+
+        sources = [_upstream(connector) for connector in self._iterables.values()]
+        raw = [source for source in sources if not _collected_by(chain, source)]
+        chain_sources = {
+            _upstream(connector) for loop in chain for connector in loop._iterables.values()
+        }
+        head_sources = {_upstream(connector) for connector in chain[0]._iterables.values()}
+
+        # Iterating over a list collected by the chain or over exactly the iterables of its
+        # first loop makes the same number of iterations
+        return all(source in chain_sources for source in raw) and (
+            len(raw) < len(sources) or set(raw) == head_sources
+        )
+
+    def _split_invariants(
+        self, statements: List[ast.stmt]
+    ) -> Tuple[List[ast.stmt], List[ast.stmt]]:
+        # Statements of nodes giving the same values in every iteration are hoisted out of the
+        # loop body, see _first_iteration
+        if not self.hoist_invariants:
+            return statements, []
+
+        varying = self._varying_nodes()
+        body: List[ast.stmt] = []
+        hoisted: List[ast.stmt] = []
+        for statement in statements:
+            node = self._subsystem_node(statement_node(statement))
+            if node is None or node in varying:
+                body.append(statement)
+            else:
+                hoisted.append(statement)
+
+        return body, hoisted
+
+    def _subsystem_node(self, node: Optional[NodeProto]) -> Optional[NodeProto]:
+        # Statements hoisted out of nested subsystems are tagged with their nested nodes
+        while node is not None and node.system is not None and node.system is not self._subsystem:
+            node = node.system.owner
+
+        return node if node is not None and node.system is self._subsystem else None
+
+    def _is_collecting(self) -> bool:
+        return any(mode.mode != LAST for mode in self._output_modes.values())
+
+    def _code_gen_index(self) -> str:
+        assert self.system is not None
+        return f"{self.system.code_gen_scope(self)}index"
+
+    def _code_gen_size(self) -> str:
+        assert self.system is not None
+        return f"{self.system.code_gen_scope(self)}size"
+
+    def _output_statement(self, name: str, value: ast.expr, index: str, size: str) -> ast.stmt:
+        mode = self._output_modes[name]
+        output = self._outputs[name].code_gen_name
+        if mode.mode in (COLLECT, ARRAY):
+            # Filled in by index when the size is known, see _sizing
+            fill = ast.Assign(
+                targets=[ast.Subscript(code_gen.name(output), code_gen.name(index), ast.Store())],
+                value=value,
+                lineno=0,
+            )
+            append = code_gen.call(f"{output}.append", copy.deepcopy(value))
+            return ast.If(_is_sized(size), [fill], [code_gen.expression(append)])
+
+        if mode.mode == REDUCE:
+            function = mode.function_name
+            if function is None:
+                raise Exception(f"Cannot generate code for the reduce function of '{name}'.")
+
+            first = _compare(index, ast.Eq(), ast.Constant(0))
+            reduced = code_gen.call(function, code_gen.name(output), copy.deepcopy(value))
+            return code_gen.assign(output, ast.IfExp(first, value, reduced))
+
+        return code_gen.assign(output, value)
+
+    def _generate_imports(self) -> List[ast.stmt]:
+        statements: List[ast.stmt] = []
+        for mode in self._output_modes.values():
+            if mode.mode == ARRAY:
+                statements.append(code_gen.import_module("array"))
+            elif mode.mode == REDUCE and mode.function_name and "." in mode.function_name:
+                statements.append(code_gen.import_module(mode.function_name.rsplit(".", 1)[0]))
+
+        return statements
+
+    def _generate_allocations(self, size: str, skipped: Collection[str] = ()) -> List[ast.stmt]:
+        # Collected outputs are allocated to the size of the iterations if it is known, and start
+        # empty if not, see _sizing
+        statements: List[ast.stmt] = []
+        for name, mode in self._output_modes.items():
+            output = self._outputs[name].code_gen_name
+            if name in skipped:
+                continue
+            elif mode.mode == COLLECT:
+                empty = ast.List([ast.Constant(None)], ast.Load())
+                filled: ast.expr = ast.BinOp(empty, ast.Mult(), code_gen.name(size))
+                appended: ast.expr = ast.List([], ast.Load())
+                statements.append(code_gen.assign(output, _if_sized(size, filled, appended)))
+            elif mode.mode == ARRAY:
+                typecode = ast.Constant(mode.typecode)
+                itemsize = ast.Constant(array.array(mode.typecode).itemsize)
+                filled = code_gen.call(
+                    "array.array",
+                    typecode,
+                    code_gen.call("bytes", ast.BinOp(code_gen.name(size), ast.Mult(), itemsize)),
+                )
+                appended = code_gen.call("array.array", copy.deepcopy(typecode))
+                statements.append(code_gen.assign(output, _if_sized(size, filled, appended)))
+
+        return statements
+
+    def _is_streaming(self) -> bool:
+        # A loop without outputs has nothing to stream and runs right away
+        return self.stream and bool(self._outputs)
+
+    def _generate_streaming_ast(self, for_loop: ast.For) -> ast.Module:
+        # The loop becomes a generator of output tuples, each output iterating its own generator
+        # over its own copies of the iterables, like For.run does
+        assert self.system is not None
+        assert not self._is_collecting(), "Streaming loop outputs have no modes."
+        scope = self.system.code_gen_scope(self)
+        outputs = [self._outputs[node.name].code_gen_name for node in self._subsystem.get_outputs()]
+        iterables = [connector.code_gen_name for connector in self._iterables.values()]
+        parameters = [f"{scope}iterable_{position}" for position in range(len(iterables))]
+        copies = [f"{scope}copies_{position}" for position in range(len(iterables))]
+        count = ast.Constant(len(outputs))
+
+        for node in ast.walk(for_loop.iter):
+            if isinstance(node, ast.Call) and ast.unparse(node.func) == "zip":
+                node.args = [code_gen.name(name) for name in parameters]
+        for_loop.body.append(
+            code_gen.expression(
+                ast.Yield(ast.Tuple([code_gen.name(output) for output in outputs], ast.Load()))
+            )
+        )
+        generator = ast.FunctionDef(
+            name=f"{scope}stream",
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(name) for name in parameters],
+                kwonlyargs=[],
+                kw_defaults=[],
+                defaults=[],
             ),
-            target=ast.Tuple(elts=iterable_node_names),
-            body=subsystem_ast.body,
-            col_offset=0,
-            end_col_offset=None,
-            end_lineno=None,
+            body=[for_loop],
+            decorator_list=[],
+            returns=None,
+            type_params=[],
             lineno=0,
+        )
+
+        # Iterators are split into one copy per output, anything else is iterated again
+        copy_iterables: List[ast.stmt] = []
+        for iterable, name in zip(iterables, copies):
+            one_shot = ast.Compare(
+                code_gen.call("iter", code_gen.name(iterable)),
+                [ast.Is()],
+                [code_gen.name(iterable)],
+            )
+            repeated = ast.BinOp(
+                ast.Tuple([code_gen.name(iterable)], ast.Load()), ast.Mult(), count
+            )
+            tee = code_gen.call("itertools.tee", code_gen.name(iterable), count)
+            copy_iterables.append(code_gen.assign(name, ast.IfExp(one_shot, tee, repeated)))
+
+        return code_gen.module(
+            [
+                code_gen.import_module("itertools"),
+                code_gen.import_module("operator"),
+                generator,
+            ],
+            copy_iterables,
+            [
+                code_gen.assign(
+                    output,
+                    code_gen.call(
+                        "map",
+                        code_gen.call("operator.itemgetter", ast.Constant(index)),
+                        code_gen.call(
+                            generator.name,
+                            *[
+                                ast.Subscript(code_gen.name(name), ast.Constant(index), ast.Load())
+                                for name in copies
+                            ],
+                        ),
+                    ),
+                )
+                for index, output in enumerate(outputs)
+            ],
+        )
+
+    def _can_vectorize(self) -> bool:
+        return (
+            not self._is_streaming()
+            and all(mode.mode != REDUCE for mode in self._output_modes.values())
+            and self.vectorize
+            and bool(self._iterables)
+            and all(isinstance(node, VECTORIZABLE_NODES) for node in self._subsystem.nodes)
+            # sum() of more than two floats compensates rounding errors, adding arrays doesn't
+            and all(
+                len(node.input.get_connections()) <= 2
+                for node in self._subsystem.nodes
+                if isinstance(node, Sum)
+            )
+            and importlib.util.find_spec("numpy") is not None
+        )
+
+    def _generate_vectorized_ast(
+        self, loops: List[ast.stmt], body: List[ast.stmt], outputs: Dict[str, ast.expr]
+    ) -> ast.Module:
+        # The loop body runs once over whole arrays. Anything numpy would treat differently from
+        # Python floats, e.g. other element types or division by zero, falls back to the loop.
+        assert self.system is not None
+        vectorized = f"{self.system.code_gen_scope(self)}vectorized"
+
+        input_nodes = {node.name: node for node in self._subsystem.get_inputs()}
+        arrays = [
+            (input_nodes[name].output.code_gen_name, connector.code_gen_name)
+            for name, connector in self._iterables.items()
+        ]
+        first = arrays[0][0]
+
+        conditions: List[ast.expr] = [_compare(f"{first}.size", ast.Gt(), ast.Constant(0))]
+        for values, _ in arrays:
+            conditions.append(_compare(f"{values}.dtype.kind", ast.Eq(), ast.Constant("f")))
+            conditions.append(_compare(f"{values}.ndim", ast.Eq(), ast.Constant(1)))
+            if values != first:
+                size = code_gen.name(f"{first}.size")
+                conditions.append(_compare(f"{values}.size", ast.Eq(), size))
+
+        convert = ast.Try(
+            body=[
+                *[
+                    code_gen.assign(values, code_gen.call("numpy.asarray", code_gen.name(source)))
+                    for values, source in arrays
+                ],
+                code_gen.assign(vectorized, ast.BoolOp(ast.And(), conditions)),
+            ],
+            handlers=[
+                _handler(
+                    ast.Tuple([code_gen.name("TypeError"), code_gen.name("ValueError")]),
+                    [code_gen.assign(vectorized, ast.Constant(False))],
+                )
+            ],
             orelse=[],
+            finalbody=[],
         )
 
-        return ast.Module(body=[for_loop], type_ignores=[])
+        # Outputs get the Python floats the loop would give them. Values that are the same in
+        # every iteration are repeated for collected outputs.
+        varying = self._varying_nodes()
+        size = code_gen.name(f"{first}.size")
+        output_values: List[ast.stmt] = []
+        for node in self._subsystem.get_outputs():
+            mode = self._output_modes[node.name]
+            value = copy.deepcopy(outputs[node.name])
+            if mode.mode == LAST and node in varying:
+                value = _method(ast.Subscript(value, ast.Constant(-1)), "item")
+            elif mode.mode == COLLECT and node in varying:
+                value = _method(value, "tolist")
+            elif mode.mode == COLLECT:
+                value = ast.BinOp(ast.List([value], ast.Load()), ast.Mult(), size)
+            elif mode.mode == ARRAY and node in varying:
+                value = code_gen.call(
+                    "array.array", ast.Constant(mode.typecode), _method(value, "tolist")
+                )
+            elif mode.mode == ARRAY:
+                repeated = ast.List([value], ast.Load())
+                value = ast.BinOp(
+                    code_gen.call("array.array", ast.Constant(mode.typecode), repeated),
+                    ast.Mult(),
+                    size,
+                )
+            output_values.append(code_gen.assign(self._outputs[node.name].code_gen_name, value))
+
+        vectorized_body = ast.Try(
+            body=[
+                ast.With(
+                    items=[
+                        ast.withitem(
+                            ast.Call(
+                                code_gen.name("numpy.errstate"),
+                                args=[],
+                                keywords=[ast.keyword("all", ast.Constant("raise"))],
+                            )
+                        )
+                    ],
+                    body=[*copy.deepcopy(body), *output_values],
+                    lineno=0,
+                )
+            ],
+            handlers=[
+                _handler(
+                    code_gen.name("FloatingPointError"),
+                    [code_gen.assign(vectorized, ast.Constant(False))],
+                )
+            ],
+            orelse=[],
+            finalbody=[],
+        )
+
+        return code_gen.module(
+            [
+                code_gen.import_module("numpy"),
+                convert,
+                ast.If(code_gen.name(vectorized), [vectorized_body], []),
+                ast.If(ast.UnaryOp(ast.Not(), code_gen.name(vectorized)), loops, []),
+            ]
+        )
+
+    def _varying_nodes(self) -> Set[NodeProto]:
+        varying: Set[NodeProto] = set()
+        iterable_names = set(self._iterables)
+        for node in self._subsystem.prepare().nodes:
+            if isinstance(node, KeywordInput) and node.name in iterable_names:
+                varying.add(node)
+            elif node.has_side_effects or not node.cacheable:
+                # Their effects, or fresh values, are expected in every iteration
+                varying.add(node)
+            elif any(
+                connection.node in varying
+                for connector in node.get_inputs()
+                for connection in connector.get_connections()
+            ):
+                varying.add(node)
+
+        return varying
+
+
+def _compare(left: str, operator: ast.cmpop, right: ast.expr) -> ast.expr:
+    return ast.Compare(code_gen.name(left), [operator], [right])
+
+
+def _first_iteration(index: str, hoisted: List[ast.stmt]) -> Tuple[List[ast.stmt], List[ast.stmt]]:
+    # Hoisted statements that may raise run once, in the first iteration, so like For.run a loop
+    # without iterations doesn't raise their errors. Constants and imports go before the loop.
+    before: List[ast.stmt] = []
+    first: List[ast.stmt] = []
+    for statement in hoisted:
+        if isinstance(statement, (ast.Import, ast.ImportFrom)) or (
+            isinstance(statement, ast.Assign) and isinstance(statement.value, ast.Constant)
+        ):
+            before.append(statement)
+        else:
+            first.append(statement)
+
+    if not first:
+        return before, []
+
+    return before, [ast.If(_compare(index, ast.Eq(), ast.Constant(0)), first, [])]
+
+
+def _method(value: ast.expr, method: str) -> ast.expr:
+    return ast.Call(ast.Attribute(value, method, ast.Load()), args=[], keywords=[])
+
+
+def _handler(exception: ast.expr, body: List[ast.stmt]) -> ast.ExceptHandler:
+    return ast.ExceptHandler(type=exception, name=None, body=body, lineno=0)
+
+
+def _for(target: ast.expr, loop_iter: ast.expr, body: List[ast.stmt]) -> ast.For:
+    return ast.For(
+        iter=loop_iter,
+        target=target,
+        body=body,
+        col_offset=0,
+        end_col_offset=None,
+        end_lineno=None,
+        lineno=0,
+        orelse=[],
+    )
+
+
+def _sizing(iterables: List[ast.expr], size: str) -> List[ast.stmt]:
+    # Like For.run, collected outputs are preallocated and filled in by index when the iterables
+    # know their length, and appended to when they don't, e.g. for generators. The size is None
+    # for the latter.
+    if not iterables:
+        return [code_gen.assign(size, ast.Constant(0))]
+
+    checks = [
+        code_gen.call("isinstance", copy.deepcopy(iterable), code_gen.name("collections.abc.Sized"))
+        for iterable in iterables
+    ]
+    lengths = [code_gen.call("len", copy.deepcopy(iterable)) for iterable in iterables]
+    sized = checks[0] if len(checks) == 1 else ast.BoolOp(ast.And(), checks)
+    length = code_gen.call("min", *lengths) if len(lengths) > 1 else lengths[0]
+
+    return [
+        code_gen.import_module("collections.abc"),
+        code_gen.assign(size, ast.IfExp(sized, length, ast.Constant(None))),
+    ]
+
+
+def _is_sized(size: str) -> ast.expr:
+    return _compare(size, ast.IsNot(), ast.Constant(None))
+
+
+def _if_sized(size: str, sized: ast.expr, unsized: ast.expr) -> ast.expr:
+    return ast.IfExp(_is_sized(size), sized, unsized)
+
+
+def _copies(values: Iterable[Any], count: int) -> Sequence[Iterable[Any]]:
+    # Iterators can only be iterated once, so they are split, anything else is iterated again
+    if iter(values) is values:
+        return itertools.tee(values, count)
+
+    return (values,) * count
+
+
+def _upstream(connector: InputConnectorProto[Any]) -> OutputConnectorProto[Any]:
+    return cast(OutputConnectorProto[Any], connector.get_connections()[0])
+
+
+def _collected_by(chain: List[For[Any]], source: OutputConnectorProto[Any]) -> bool:
+    return any(
+        source.node is loop and loop.output_mode(source.name).mode == COLLECT for loop in chain
+    )
+
+
+def _fusion_chains(plan: ExecutionPlan) -> List[List[For[Any]]]:
+    # Loops join the most recent open chain they can run along with. A chain closes once any
+    # other node depends on it, as the fused loop takes the place of the chain's last loop.
+    chains: List[List[For[Any]]] = []
+    open_chains: List[int] = []
+    reach: Dict[NodeProto, Set[int]] = {}
+    for node in plan.nodes:
+        depends = set().union(*(reach[predecessor] for predecessor in plan.predecessors[node]))
+        joined = None
+        if isinstance(node, For) and node._is_fusable():
+            joined = next(
+                (
+                    key
+                    for key in reversed(open_chains)
+                    if node._can_fuse_after(chains[key], key, reach)
+                ),
+                None,
+            )
+            if joined is None:
+                joined = len(chains)
+                chains.append([])
+                open_chains.append(joined)
+            chains[joined].append(node)
+
+        # Side effects, e.g. appending to a list a loop iterates over, keep their place
+        if node.has_side_effects:
+            open_chains.clear()
+        open_chains = [key for key in open_chains if key == joined or key not in depends]
+        reach[node] = depends if joined is None else depends | {joined}
+
+    return chains
@@ -1,143 +1,198 @@
-# @dataclass(frozen=True)
-# class IfRelayPair(Generic[_T]):
-#     true: BasicRelay[_T]
-#     false: BasicRelay[_T]
-
-
-# class If(BasicNode):
-#     def __init__(self) -> None:
-#         super().__init__()
-#         self.condition: RequiredInput[Any] = RequiredInput(self, "condition", bool)
-#         self._true_system: System = BasicSystem("if true")
-#         self._false_system: System = BasicSystem("if false")
-#         self._inputs: Dict[str, IfRelayPair[Any]] = {}
-#         self._outputs: Dict[str, IfRelayPair[Any]] = {}
-
-#     @property
-#     def true_system(self) -> System:
-#         return self._true_system
-
-#     @true_system.setter
-#     def true_system(self, system: System) -> None:
-#         # Remove I/O
-#         for relay_pair in self._inputs.values():
-#             self._true_system.remove_node(relay_pair.true)
-
-#         for relay_pair in self._outputs.values():
-#             self._true_system.remove_node(relay_pair.true)
-
-#         # Set the new system
-#         self._true_system = system
-
-#         # Add I/O
-#         for relay_pair in self._inputs.values():
-#             self._true_system.add_node(relay_pair.true)
-
-#         for relay_pair in self._outputs.values():
-#             self._true_system.add_node(relay_pair.true)
-
-#     @property
-#     def false_system(self) -> System:
-#         return self._false_system
-
-#     @false_system.setter
-#     def false_system(self, system: System) -> None:
-#         # Remove I/O
-#         for relay_pair in self._inputs.values():
-#             self._false_system.remove_node(relay_pair.false)
-
-#         for relay_pair in self._outputs.values():
-#             self._false_system.remove_node(relay_pair.false)
-
-#         # Set the new system
-#         self._false_system = system
-
-#         # Add I/O
-#         for relay_pair in self._inputs.values():
-#             self._false_system.add_node(relay_pair.false)
-
-#         for relay_pair in self._outputs.values():
-#             self._false_system.add_node(relay_pair.false)
-
-#     def add_input(self, name: str) -> IfRelayPair[Any]:
-#         assert name not in self._inputs, f"Input with the name {name} already exists."
-
-#         true_relay: BasicRelay[Any] = BasicRelay()
-#         true_relay.name = name
-#         self._true_system.add_node(true_relay)
-
-#         false_relay: BasicRelay[Any] = BasicRelay()
-#         false_relay.name = name
-#         self._false_system.add_node(false_relay)
-
-#         new_pair = IfRelayPair(true=true_relay, false=false_relay)
-#         self._inputs[name] = new_pair
-
-#         return new_pair
-
-#     def remove_input(self, name: str) -> None:
-#         assert name in self._inputs, f"Input with the name {name} does not exist"
-#         relay_pair = self._inputs[name]
-#         self._true_system.remove_node(relay_pair.true)
-#         self._false_system.remove_node(relay_pair.false)
-#         del self._inputs[name]
-
-#     def add_output(self, name: str) -> IfRelayPair[Any]:
-#         assert name not in self._outputs, f"Output with the name {name} already exists."
-
-#         true_relay: BasicRelay[Any] = BasicRelay()
-#         true_relay.name = name
-#         self._true_system.add_node(true_relay)
-
-#         false_relay: BasicRelay[Any] = BasicRelay()
-#         false_relay.name = name
-#         self._false_system.add_node(false_relay)
-
-#         new_pair = IfRelayPair(true=true_relay, false=false_relay)
-#         self._inputs[name] = new_pair
-
-#         return new_pair
-
-#     def remove_output(self, name: str) -> None:
-#         assert name in self._outputs, f"Input with the name {name} does not exist"
-#         relay_pair = self._outputs[name]
-#         self._true_system.remove_node(relay_pair.true)
-#         self._false_system.remove_node(relay_pair.false)
-#         del self._outputs[name]
-
-#     def get_inputs(self) -> Iterable[Connector]:
-#         all_inputs: List[Connector] = []
-#         for relay_pair in self._inputs.values():
-#             all_inputs.extend([relay_pair.true.input, relay_pair.false.input])
-
-#         return all_inputs
-
-#     def get_outputs(self) -> Iterable[Connector]:
-#         all_outputs = []
-#         for relay_pair in self._outputs.values():
-#             all_outputs.extend([relay_pair.true.input, relay_pair.false.input])
-
-#         return all_outputs
-
-#     def run(self) -> None:
-#         if self.condition.get_value():
-#             self._true_system.run()
-#         else:
-#             self._false_system.run()
-
-#     def validate(self) -> None:
-#         self._true_system.validate()
-#         self._false_system.validate()
-
-#     def generate_ast(self) -> ast.Module:
-#         if_statememt = ast.If(
-#             test=ast.Name(self.condition.code_gen_name),
-#             body=self._true_system.generate_ast().body,
-#             orelse=self._false_system.generate_ast().body,
-#             col_offset=0,
-#             end_col_offset=None,
-#             end_lineno=None,
-#             lineno=0,
-#         )
-
-#         return ast.Module(body=[if_statememt], type_ignores=[])
+import ast
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+from bemore import BasicNode, BasicSystem, RequiredInput, SystemProto
+from bemore.core import code_gen
+from bemore.core.connectors import BasicOutput, InputConnectorProto, OutputConnectorProto
+from bemore.core.node import fingerprint_node
+from bemore.core.system_nodes import KeywordInput, Output
+
+
+class If(BasicNode):
+    def __init__(self) -> None:
+        super().__init__()
+        self.condition: RequiredInput[Any] = RequiredInput(self, "condition", bool)
+        self._inputs: Dict[str, InputConnectorProto[Any]] = {}
+        self._outputs: Dict[str, OutputConnectorProto[Any]] = {}
+
+        # Only the subsystem selected by the condition is run
+        self._true_subsystem: SystemProto = BasicSystem("if true")
+        self._true_subsystem.owner = self
+        self._false_subsystem: SystemProto = BasicSystem("if false")
+        self._false_subsystem.owner = self
+
+    @property
+    def true_subsystem(self) -> SystemProto:
+        return self._true_subsystem
+
+    @true_subsystem.setter
+    def true_subsystem(self, subsystem: SystemProto) -> None:
+        self._true_subsystem = subsystem
+        self._true_subsystem.owner = self
+        self.mark_modified()
+
+    @property
+    def false_subsystem(self) -> SystemProto:
+        return self._false_subsystem
+
+    @false_subsystem.setter
+    def false_subsystem(self, subsystem: SystemProto) -> None:
+        self._false_subsystem = subsystem
+        self._false_subsystem.owner = self
+        self.mark_modified()
+
+    @property
+    def subsystems(self) -> Tuple[SystemProto, SystemProto]:
+        return self._true_subsystem, self._false_subsystem
+
+    @property
+    def cacheable(self) -> bool:
+        # Changes to the branches mark the If dirty, so only their nodes decide
+        return all(node.cacheable for system in self.subsystems for node in system.nodes)
+
+    @property
+    def has_side_effects(self) -> bool:
+        return any(node.has_side_effects for system in self.subsystems for node in system.nodes)
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        fingerprints = [subsystem.fingerprint for subsystem in self.subsystems]
+        if None in fingerprints:
+            return None
+
+        return fingerprint_node(self, list(self._inputs), list(self._outputs), fingerprints)
+
+    def add_input(
+        self,
+        name: str,
+        signature: Any,
+    ) -> Tuple[InputConnectorProto[Any], KeywordInput[Any], KeywordInput[Any]]:
+        assert name not in self._inputs, f"Input with the name {name} already exists."
+
+        true_input_node = KeywordInput[Any](name)
+        self._true_subsystem.add_node(true_input_node)
+        false_input_node = KeywordInput[Any](name)
+        self._false_subsystem.add_node(false_input_node)
+        self._inputs[name] = RequiredInput(self, name, signature)
+
+        return self._inputs[name], true_input_node, false_input_node
+
+    def remove_input(self, name: str) -> None:
+        assert name in self._inputs, f"Input with the name {name} does not exist"
+        del self._inputs[name]
+
+        for subsystem in self.subsystems:
+            for node in subsystem.get_inputs():
+                if node.name == name:
+                    subsystem.remove_node(node)
+                    break
+
+    def add_output(
+        self,
+        name: str,
+        signature: Any,
+    ) -> Tuple[OutputConnectorProto[Any], Output[Any], Output[Any]]:
+        assert name not in self._outputs, f"Output with the name {name} already exists."
+        self._outputs[name] = BasicOutput(self, name, signature)
+
+        # Both subsystems have to give the output a value
+        true_output_node = Output[Any](name)
+        self._true_subsystem.add_node(true_output_node)
+        false_output_node = Output[Any](name)
+        self._false_subsystem.add_node(false_output_node)
+
+        return self._outputs[name], true_output_node, false_output_node
+
+    def remove_output(self, name: str) -> None:
+        assert name in self._outputs, f"Output with the name {name} does not exist."
+        del self._outputs[name]
+
+        for subsystem in self.subsystems:
+            for node in subsystem.get_outputs():
+                if node.name == name:
+                    subsystem.remove_node(node)
+                    break
+
+    def get_inputs(self) -> Collection[InputConnectorProto[Any]]:
+        return [self.condition, *self._inputs.values()]
+
+    def get_outputs(self) -> Collection[OutputConnectorProto[Any]]:
+        return self._outputs.values()
+
+    def run(self) -> None:
+        subsystem, inputs = self._select()
+        for name, value in subsystem.run(**inputs).items():
+            self._outputs[name].set_value(value)
+
+    async def arun(self) -> None:
+        subsystem, inputs = self._select()
+        for name, value in (await subsystem.arun(**inputs)).items():
+            self._outputs[name].set_value(value)
+
+    def _select(self) -> Tuple[SystemProto, Dict[str, Any]]:
+        subsystem = self._true_subsystem if self.condition.get_value() else self._false_subsystem
+        inputs = {name: connector.get_value() for name, connector in self._inputs.items()}
+        return subsystem, inputs
+
+    def run_batch(self, size: int) -> None:
+        # Records are split by their condition and each subsystem runs one batch over its share,
+        # the outputs then select the value of the subsystem each record went through
+        conditions = self.condition.get_value()
+        columns = {name: connector.get_value() for name, connector in self._inputs.items()}
+        results: Dict[str, List[Any]] = {name: [None] * size for name in self._outputs}
+
+        for selected, subsystem in zip([True, False], self.subsystems):
+            indices = [index for index in range(size) if bool(conditions[index]) is selected]
+            if not indices:
+                continue
+
+            records = [
+                {name: column[index] for name, column in columns.items()} for index in indices
+            ]
+            for name, column in subsystem.run_batch(records).items():
+                for index, value in zip(indices, column):
+                    results[name][index] = value
+
+        for name, column in results.items():
+            self._outputs[name].set_value(column)
+
+    def validate(self) -> None:
+        self.condition.validate()
+        for input_connector in self._inputs.values():
+            input_connector.validate()
+
+        for output_connector in self._outputs.values():
+            output_connector.validate()
+
+    def generate_ast(self) -> ast.Module:
+        if_statement = ast.If(
+            test=code_gen.name(self.condition.code_gen_name),
+            body=self._generate_branch(self._true_subsystem),
+            orelse=self._generate_branch(self._false_subsystem),
+            lineno=0,
+        )
+
+        return code_gen.module([if_statement])
+
+    def _generate_branch(self, subsystem: SystemProto) -> List[ast.stmt]:
+        subsystem_ast = subsystem.generate_ast()
+
+        # Bind the If outputs to the values reaching the subsystem outputs
+        output_assignments = [
+            code_gen.assign(
+                self._outputs[node.name].code_gen_name,
+                code_gen.name(next(iter(node.get_inputs())).code_gen_name),
+            )
+            for node in subsystem.get_outputs()
+        ]
+
+        # Subsystem inputs read the values connected to the If inputs
+        aliases = {
+            node.output.code_gen_name: self._inputs[node.name].code_gen_name
+            for node in subsystem.get_inputs()
+        }
+        for node in ast.walk(code_gen.module(subsystem_ast.body, output_assignments)):
+            if isinstance(node, ast.Name) and node.id in aliases:
+                node.id = aliases[node.id]
+
+        return [*subsystem_ast.body, *output_assignments] or [ast.Pass()]
@@ -0,0 +1,195 @@
+import ast
+from typing import Any, Collection, Dict, Iterable, Optional, Tuple
+
+from bemore import BasicNode, BasicOutput, BasicSystem, RequiredInput, SystemProto
+from bemore.core import code_gen
+from bemore.core.connectors import InputConnectorProto, OutputConnectorProto
+from bemore.core.node import fingerprint_node
+from bemore.core.system_nodes import KeywordInput, Output
+
+# Names of the subsystem inputs and outputs each iteration goes through
+ACCUMULATOR = "accumulator"
+ITEM = "item"
+STOP = "stop"
+
+
+class Reduce[T](BasicNode):
+    def __init__(self) -> None:
+        super().__init__()
+        self.iterable: RequiredInput[Iterable[Any]] = RequiredInput(self, "iterable", Any)
+        self.initial: RequiredInput[T] = RequiredInput(self, "initial", Any)
+        self.output: BasicOutput[T] = BasicOutput(self, "output", Any)
+        self._inputs: Dict[str, InputConnectorProto[Any]] = {}
+
+        # The subsystem combines the accumulator with one item at a time, so only the latest
+        # accumulator is ever held, however many items the iterable gives
+        self._subsystem: SystemProto = BasicSystem("reduce")
+        self._subsystem.owner = self
+        self._accumulator: KeywordInput[T] = KeywordInput(ACCUMULATOR)
+        self._item: KeywordInput[Any] = KeywordInput(ITEM)
+        self._result: Output[T] = Output(ACCUMULATOR)
+        self._stop: Optional[Output[Any]] = None
+        self._subsystem.add_nodes(self._accumulator, self._item, self._result)
+
+    @property
+    def subsystem(self) -> SystemProto:
+        return self._subsystem
+
+    @property
+    def subsystems(self) -> Tuple[SystemProto]:
+        return (self._subsystem,)
+
+    @property
+    def accumulator(self) -> KeywordInput[T]:
+        return self._accumulator
+
+    @property
+    def item(self) -> KeywordInput[Any]:
+        return self._item
+
+    @property
+    def result(self) -> Output[T]:
+        return self._result
+
+    @property
+    def stop(self) -> Optional[Output[Any]]:
+        return self._stop
+
+    @property
+    def cacheable(self) -> bool:
+        # Changes to the subsystem mark the Reduce dirty, so only its nodes decide
+        return all(node.cacheable for node in self._subsystem.nodes)
+
+    @property
+    def has_side_effects(self) -> bool:
+        return any(node.has_side_effects for node in self._subsystem.nodes)
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        subsystem_fingerprint = self._subsystem.fingerprint
+        if subsystem_fingerprint is None:
+            return None
+
+        return fingerprint_node(
+            self, list(self._inputs), self._stop is not None, subsystem_fingerprint
+        )
+
+    def add_input(
+        self, name: str, signature: Any
+    ) -> Tuple[InputConnectorProto[Any], KeywordInput[Any]]:
+        assert name not in (ACCUMULATOR, ITEM), f"Input name {name} is reserved."
+        assert name not in self._inputs, f"Input with the name {name} already exists."
+
+        subsystem_input_node = KeywordInput[Any](name)
+        self._subsystem.add_node(subsystem_input_node)
+        self._inputs[name] = RequiredInput(self, name, signature)
+
+        return self._inputs[name], subsystem_input_node
+
+    def remove_input(self, name: str) -> None:
+        assert name in self._inputs, f"Input with the name {name} does not exist"
+        del self._inputs[name]
+
+        for node in self._subsystem.get_inputs():
+            if node.name == name:
+                self._subsystem.remove_node(node)
+                break
+
+    def add_stop_condition(self) -> Output[Any]:
+        # Once the value reaching this output is truthy, the accumulator of that iteration is the
+        # result and no more items are taken from the iterable
+        assert self._stop is None, "The stop condition already exists."
+        self._stop = Output(STOP)
+        self._subsystem.add_node(self._stop)
+        return self._stop
+
+    def remove_stop_condition(self) -> None:
+        assert self._stop is not None, "The stop condition does not exist."
+        self._subsystem.remove_node(self._stop)
+        self._stop = None
+
+    def get_inputs(self) -> Collection[InputConnectorProto[Any]]:
+        return [self.iterable, self.initial, *self._inputs.values()]
+
+    def get_outputs(self) -> Collection[OutputConnectorProto[Any]]:
+        return [self.output]
+
+    def run(self) -> None:
+        accumulator = self.initial.get_value()
+        inputs = {name: connector.get_value() for name, connector in self._inputs.items()}
+
+        # Items are taken one at a time, each iteration gets the accumulator the last one gave
+        for item in self.iterable.get_value():
+            output_map = self._subsystem.run(**inputs, **{ACCUMULATOR: accumulator, ITEM: item})
+            accumulator = output_map[ACCUMULATOR]
+            if output_map.get(STOP):
+                break
+
+        self.output.set_value(accumulator)
+
+    async def arun(self) -> None:
+        accumulator = self.initial.get_value()
+        inputs = {name: connector.get_value() for name, connector in self._inputs.items()}
+
+        for item in self.iterable.get_value():
+            output_map = await self._subsystem.arun(
+                **inputs, **{ACCUMULATOR: accumulator, ITEM: item}
+            )
+            accumulator = output_map[ACCUMULATOR]
+            if output_map.get(STOP):
+                break
+
+        self.output.set_value(accumulator)
+
+    def validate(self) -> None:
+        self.iterable.validate()
+        self.initial.validate()
+        for input_connector in self._inputs.values():
+            input_connector.validate()
+
+        self.output.validate()
+
+    def generate_ast(self) -> ast.Module:
+        # The accumulator input is the loop variable carrying the accumulator between iterations
+        accumulator = self._accumulator.output.code_gen_name
+        subsystem_ast = self._subsystem.generate_ast()
+
+        body = [
+            *subsystem_ast.body,
+            code_gen.assign(accumulator, _value_reaching(self._result)),
+        ]
+        if self._stop is not None:
+            body.append(ast.If(_value_reaching(self._stop), [ast.Break()], []))
+
+        # Replace subsystem singular inputs with the names connected to the Reduce inputs
+        aliases = {
+            node.output.code_gen_name: self._inputs[node.name].code_gen_name
+            for node in self._subsystem.get_inputs()
+            if node.name in self._inputs
+        }
+        for node in ast.walk(code_gen.module(body)):
+            if isinstance(node, ast.Name) and node.id in aliases:
+                node.id = aliases[node.id]
+
+        for_loop = ast.For(
+            iter=code_gen.name(self.iterable.code_gen_name),
+            target=ast.Name(self._item.output.code_gen_name, ast.Store()),
+            body=body,
+            col_offset=0,
+            end_col_offset=None,
+            end_lineno=None,
+            lineno=0,
+            orelse=[],
+        )
+
+        return code_gen.module(
+            [
+                code_gen.assign(accumulator, code_gen.name(self.initial.code_gen_name)),
+                for_loop,
+                code_gen.assign(self.output.code_gen_name, code_gen.name(accumulator)),
+            ]
+        )
+
+
+def _value_reaching(output: Output[Any]) -> ast.expr:
+    return code_gen.name(next(iter(output.get_inputs())).code_gen_name)
@@ -0,0 +1,76 @@
+import functools
+import hashlib
+import logging
+import marshal
+import os
+import sys
+from pathlib import Path
+from types import CodeType
+from typing import Optional, Union
+
+_logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def _bemore_source_hash() -> str:
+    # Generated code depends on the bemore source rather than on a released version, so any edit
+    # to it, even in a development checkout, starts a new set of entries
+    package = Path(__file__).resolve().parent.parent
+    source_hash = hashlib.sha256()
+    for path in sorted(package.rglob("*.py")):
+        source_hash.update(path.relative_to(package).as_posix().encode())
+        source_hash.update(path.read_bytes())
+
+    return source_hash.hexdigest()
+
+
+class CodeCache:
+    # Like __pycache__, entries are tagged with the interpreter since marshal data is specific to it
+    def __init__(self, directory: Union[str, "os.PathLike[str]"]) -> None:
+        self._directory = Path(directory)
+        self._source_hash = _bemore_source_hash()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    def get(self, fingerprint: str) -> Optional[CodeType]:
+        path = self._path(fingerprint)
+        try:
+            code = marshal.loads(path.read_bytes())
+        except FileNotFoundError:
+            code = None
+        except (OSError, EOFError, ValueError, TypeError) as error:
+            _logger.warning(f"Ignoring unreadable code cache entry '{path}': {error}")
+            code = None
+
+        if not isinstance(code, CodeType):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return code
+
+    def put(self, fingerprint: str, code: CodeType) -> None:
+        path = self._path(fingerprint)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            temporary.write_bytes(marshal.dumps(code))
+            # Readers either see the previous entry or the complete new one
+            os.replace(temporary, path)
+        except OSError as error:
+            _logger.warning(f"Could not write code cache entry '{path}': {error}")
+
+    def clear(self) -> None:
+        for path in self._directory.glob(f"*.{sys.implementation.cache_tag}.code"):
+            path.unlink(missing_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, fingerprint: str) -> Path:
+        key = hashlib.sha256(f"{self._source_hash}\n{fingerprint}".encode()).hexdigest()
+        return self._directory / f"{key}.{sys.implementation.cache_tag}.code"
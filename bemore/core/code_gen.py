@@ -1,5 +1,5 @@
 import ast
-from typing import Protocol
+from typing import Any, Iterable, Protocol
 
 
 class CodeGeneratorProto(Protocol):
@@ -9,3 +9,53 @@ class CodeGeneratorProto(Protocol):
 def generate_code(obj: CodeGeneratorProto) -> str:
     ast_gen = obj.generate_ast()
     return ast.unparse(ast_gen)
+
+
+def module(*bodies: Iterable[ast.stmt]) -> ast.Module:
+    return ast.Module(body=[statement for body in bodies for statement in body], type_ignores=[])
+
+
+def name(identifier: str) -> ast.expr:
+    # Dotted names such as 'math.prod' become attribute lookups
+    root, *attributes = identifier.split(".")
+    expression: ast.expr = ast.Name(root, ast.Load())
+    for attribute in attributes:
+        expression = ast.Attribute(expression, attribute, ast.Load())
+
+    return expression
+
+
+def literal(value: Any) -> ast.expr:
+    if isinstance(value, list):
+        return ast.List([literal(item) for item in value], ast.Load())
+
+    if isinstance(value, tuple):
+        return ast.Tuple([literal(item) for item in value], ast.Load())
+
+    if isinstance(value, dict):
+        return ast.Dict([literal(key) for key in value], [literal(item) for item in value.values()])
+
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return ast.Constant(value)
+
+    raise TypeError(f"Cannot generate a literal for value of type '{type(value).__name__}'.")
+
+
+def assign(target: str, value: ast.expr) -> ast.stmt:
+    return ast.Assign(targets=[ast.Name(target, ast.Store())], value=value, lineno=0)
+
+
+def call(function: str, *args: ast.expr) -> ast.expr:
+    return ast.Call(name(function), args=list(args), keywords=[])
+
+
+def binop(left: str, operator: ast.operator, right: str) -> ast.expr:
+    return ast.BinOp(name(left), operator, name(right))
+
+
+def expression(value: ast.expr) -> ast.stmt:
+    return ast.Expr(value)
+
+
+def import_module(module_name: str) -> ast.stmt:
+    return ast.Import([ast.alias(module_name)])
@@ -1,8 +1,19 @@
 import ast
 from enum import Enum, auto
-from typing import TYPE_CHECKING, Any, List, Optional, Protocol, Sequence, Tuple, TypeVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Hashable,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    TypeVar,
+    cast,
+)
 
-from bemore.core.code_gen import CodeGeneratorProto
+from bemore.core.code_gen import CodeGeneratorProto, assign, literal, module, name
 from bemore.core.logging import (
     get_connector_logger,
     get_connector_runtime_logger,
@@ -40,6 +51,7 @@ class ConnectorProto(CodeGeneratorProto, Protocol):
     def code_gen_name(self) -> str: ...
 
     def connect(self, other: Any) -> ConnectResult: ...
+    def disconnect(self, other: Any) -> None: ...
     def get_connections(self) -> Sequence["ConnectorProto"]: ...
     def validate(self) -> None: ...
 
@@ -62,6 +74,9 @@ class OptionalConnectorProto[T](InputConnectorProto[T]):
 
 
 class OutputConnectorProto(ConnectorProto, Protocol[T_co]):
+    @property
+    def has_value(self) -> bool: ...
+
     def connect(self, other: "InputConnectorProto[T_co]") -> ConnectResult: ...
     def set_value(self, value: Any) -> None: ...
     def get_value(self) -> T_co: ...
@@ -74,12 +89,45 @@ def connect[T](
     if output.node.system is not input.node.system:
         raise Exception("Connectors do not belong to the same system.")
 
+    previous = list(input.get_connections())
     output_result = output.connect(input)
     input_result = input.connect(output)
 
+    # Single inputs are re-targeted, their previous connection goes away
+    replaced = [
+        cast(OutputConnectorProto[Any], connection)
+        for connection in previous
+        if connection not in input.get_connections()
+    ]
+    for connection in replaced:
+        connection.disconnect(input)
+
+    system = output.node.system
+    if system is not None:
+        for connection in replaced:
+            system.remove_connection(connection, input)
+        system.add_connection(output, input)
+
     return output_result, input_result
 
 
+def disconnect[T](output: OutputConnectorProto[T], input: InputConnectorProto[T]) -> None:
+    output.disconnect(input)
+    input.disconnect(output)
+
+    system = output.node.system
+    if system is not None:
+        system.remove_connection(output, input)
+
+
+def _code_gen_name(connector: ConnectorProto) -> str:
+    system = connector.node.system
+    if system is None:
+        raise Exception(f"Node {connector.node} must belong to a system to generate code.")
+
+    return system.code_gen_name(connector)
+
+
 # Input types
 
 
@@ -114,6 +162,10 @@ class SingleInput[T](InputConnectorProto[T]):
         self._connection = other
         return ConnectResult.SUCCESS
 
+    def disconnect(self, other: "OutputConnectorProto[T]") -> None:
+        if self._connection is other:
+            self._connection = None
+
     def get_connections(self) -> Sequence[ConnectorProto]:
         if self._connection:
             return [self._connection]
@@ -174,15 +226,14 @@ class OptionalInput[T](SingleInput[T]):
         if self._connection:
             return ast.Module(body=[], type_ignores=[])
 
-        line = f"{self.code_gen_name} = None\n"
-        return ast.parse(line)
+        return module([assign(self.code_gen_name, literal(None))])
 
     @property
     def code_gen_name(self) -> str:
         if self._connection:
             return self._connection.code_gen_name
 
-        return f"{self.name}_{hash(self)}"
+        return _code_gen_name(self)
 
 
 class MultiInput[T](InputConnectorProto[T]):
@@ -219,6 +270,10 @@ class MultiInput[T](InputConnectorProto[T]):
         self._connections.append(other)
         return ConnectResult.SUCCESS
 
+    def disconnect(self, other: Any) -> None:
+        if other in self._connections:
+            self._connections.remove(other)
+
     def get_connections(self) -> Sequence[ConnectorProto]:
         return self._connections
 
@@ -231,13 +286,12 @@ class MultiInput[T](InputConnectorProto[T]):
                 )
 
     def generate_ast(self) -> ast.Module:
-        input_vars = ", ".join([connection.code_gen_name for connection in self._connections])
-        line = f"{self.code_gen_name} = [{input_vars}]\n"
-        return ast.parse(line)
+        values = [name(connection.code_gen_name) for connection in self._connections]
+        return module([assign(self.code_gen_name, ast.List(values, ast.Load()))])
 
     @property
     def code_gen_name(self) -> str:
-        return f"{self.name}_{hash(self)}"
+        return _code_gen_name(self)
 
 
 class RequiredMultiInput[T](MultiInput[T]):
@@ -271,6 +325,51 @@ class OptionalMultiInput[T](MultiInput[T]):
 NULL_VALUE_SENTINEL = object()
 
 
+# Containers with more items than this are not snapshot and always count as changed
+SNAPSHOT_LIMIT = 10_000
+
+_SCALARS = (bool, int, float, complex, str, bytes, type(None))
+
+
+def snapshot(value: Any) -> Hashable:
+    # Frozen copy of the value, so a list mutated in place no longer matches its earlier
+    # snapshot. Values that can't be frozen, or only compare by identity, never match.
+    if type(value) in _SCALARS:
+        return (type(value), value)
+
+    try:
+        return _freeze(value, [SNAPSHOT_LIMIT])
+    except TypeError:
+        return object()
+
+
+def _freeze(value: Any, budget: List[int]) -> Hashable:
+    # Tagged with types like memo.freeze, in a single walk over at most budget items
+    if isinstance(value, (list, tuple, set, frozenset, dict)):
+        if len(value) > budget[0]:
+            return object()
+        budget[0] -= len(value)
+
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(_freeze(item, budget) for item in value))
+
+    if isinstance(value, dict):
+        return (
+            type(value),
+            frozenset((key, _freeze(item, budget)) for key, item in value.items()),
+        )
+
+    if isinstance(value, (set, frozenset)):
+        return (type(value), frozenset(_freeze(item, budget) for item in value))
+
+    if getattr(type(value), "__eq__") is object.__eq__:
+        return object()
+
+    # Raises TypeError for anything else that is unhashable
+    hash(value)
+    return (type(value), value)
+
+
 class BasicOutput[T](OutputConnectorProto[T]):
     def __init__(self, node: "NodeProto", name: str, signature: Any) -> None:
         self._node = node
@@ -299,6 +398,10 @@ class BasicOutput[T](OutputConnectorProto[T]):
     def signature(self) -> Any:
         return self._signature
 
+    @property
+    def has_value(self) -> bool:
+        return self._value is not NULL_VALUE_SENTINEL
+
     def get_value(self) -> T:
         assert self._value is not NULL_VALUE_SENTINEL
         return self._value
@@ -313,6 +416,10 @@ class BasicOutput[T](OutputConnectorProto[T]):
         self._connections.append(other)
         return ConnectResult.SUCCESS
 
+    def disconnect(self, other: Any) -> None:
+        if other in self._connections:
+            self._connections.remove(other)
+
     def get_connections(self) -> Sequence[ConnectorProto]:
         return self._connections
 
@@ -324,4 +431,4 @@ class BasicOutput[T](OutputConnectorProto[T]):
 
     @property
     def code_gen_name(self) -> str:
-        return f"{self.name}_{hash(self)}"
+        return _code_gen_name(self)
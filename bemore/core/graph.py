@@ -0,0 +1,128 @@
+from collections import deque
+from typing import TYPE_CHECKING, Any, Collection, Deque, Dict, Iterable, List, Sequence, Set, Tuple
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+
+class CycleError(Exception):
+    def __init__(self, cycle: Sequence[Any]) -> None:
+        path = " -> ".join(str(node) for node in [*cycle, cycle[0]])
+        super().__init__(f"Graph contains a cycle: {path}")
+        self.cycle = list(cycle)
+
+
+class DiGraph[N]:
+    def __init__(self) -> None:
+        # Dicts are used as insertion-ordered sets to keep traversals deterministic
+        self._successors: Dict[N, Dict[N, None]] = {}
+        self._predecessors: Dict[N, Dict[N, None]] = {}
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._successors
+
+    def __len__(self) -> int:
+        return len(self._successors)
+
+    @property
+    def nodes(self) -> Collection[N]:
+        return self._successors.keys()
+
+    def add_node(self, node: N) -> None:
+        if node not in self._successors:
+            self._successors[node] = {}
+            self._predecessors[node] = {}
+
+    def remove_node(self, node: N) -> None:
+        for successor in self._successors.pop(node):
+            del self._predecessors[successor][node]
+
+        for predecessor in self._predecessors.pop(node):
+            del self._successors[predecessor][node]
+
+    def add_edge(self, source: N, target: N) -> None:
+        assert source in self._successors, f"Node {source} is not in the graph."
+        assert target in self._successors, f"Node {target} is not in the graph."
+        self._successors[source][target] = None
+        self._predecessors[target][source] = None
+
+    def remove_edge(self, source: N, target: N) -> None:
+        self._successors[source].pop(target, None)
+        self._predecessors[target].pop(source, None)
+
+    def successors(self, node: N) -> Collection[N]:
+        return self._successors[node].keys()
+
+    def predecessors(self, node: N) -> Collection[N]:
+        return self._predecessors[node].keys()
+
+    def edges(self) -> Iterable[Tuple[N, N]]:
+        for source, successors in self._successors.items():
+            for target in successors:
+                yield source, target
+
+    def ancestors(self, nodes: Iterable[N]) -> Set[N]:
+        return self._reachable(nodes, self._predecessors)
+
+    def descendants(self, nodes: Iterable[N]) -> Set[N]:
+        return self._reachable(nodes, self._successors)
+
+    def _reachable(self, nodes: Iterable[N], adjacency: Dict[N, Dict[N, None]]) -> Set[N]:
+        stack = list(nodes)
+        seen: Set[N] = set()
+        while stack:
+            node = stack.pop()
+            for neighbor in adjacency[node]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    stack.append(neighbor)
+
+        return seen
+
+    def topological_sort(self) -> List[N]:
+        in_degree = {node: len(predecessors) for node, predecessors in self._predecessors.items()}
+        ready: Deque[N] = deque(node for node, degree in in_degree.items() if degree == 0)
+
+        order: List[N] = []
+        while ready:
+            node = ready.popleft()
+            order.append(node)
+            for successor in self._successors[node]:
+                in_degree[successor] -= 1
+                if in_degree[successor] == 0:
+                    ready.append(successor)
+
+        if len(order) != len(in_degree):
+            remaining = {node for node, degree in in_degree.items() if degree > 0}
+            raise CycleError(self._find_cycle(remaining))
+
+        return order
+
+    def _find_cycle(self, remaining: Set[N]) -> List[N]:
+        # Every node left over by Kahn's algorithm has a predecessor that was also left over, so
+        # walking predecessors must eventually revisit a node.
+        node = next(iter(remaining))
+        path: List[N] = []
+        position: Dict[N, int] = {}
+        while node not in position:
+            position[node] = len(path)
+            path.append(node)
+            node = next(pred for pred in self._predecessors[node] if pred in remaining)
+
+        start = position[node]
+        cycle = path[start:]
+        cycle.reverse()
+        return cycle
+
+    def to_networkx(self) -> "nx.DiGraph":  # type: ignore
+        try:
+            import networkx as nx
+        except ImportError as error:
+            raise ImportError(
+                "networkx is required for graph analysis, install it with 'bemore[analysis]'."
+            ) from error
+
+        graph = nx.DiGraph()  # type: ignore
+        graph.add_nodes_from(self._successors)
+        graph.add_edges_from(self.edges())
+        return graph
@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+def freeze(value: Any) -> Hashable:
+    # Values are tagged with their type so e.g. 1, 1.0 and True do not share entries
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(freeze(item) for item in value))
+
+    if isinstance(value, dict):
+        return (type(value), frozenset((key, freeze(item)) for key, item in value.items()))
+
+    if isinstance(value, (set, frozenset)):
+        return (type(value), frozenset(value))
+
+    # Raises TypeError for anything else that is unhashable
+    hash(value)
+    return (type(value), value)
+
+
+class MemoCache:
+    def __init__(self, maxsize: int = 0) -> None:
+        self._entries: OrderedDict[Hashable, Tuple[Any, ...]] = OrderedDict()
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: int) -> None:
+        assert maxsize >= 0, "Memo cache size cannot be negative."
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._maxsize > 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, ...]]:
+        with self._lock:
+            values = self._entries.get(key)
+            if values is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return values
+
+    def put(self, key: Hashable, values: Tuple[Any, ...]) -> None:
+        with self._lock:
+            self._entries[key] = values
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _evict(self) -> None:
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
@@ -1,5 +1,17 @@
+import asyncio
 from collections.abc import Collection
-from typing import TYPE_CHECKING, Any, Optional, Protocol
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    cast,
+    runtime_checkable,
+)
 
 from bemore.core.code_gen import CodeGeneratorProto
 from bemore.core.connectors import ConnectorProto, InputConnectorProto, OutputConnectorProto
@@ -42,11 +54,104 @@ class NodeProto(CodeGeneratorProto, Protocol):
     def is_output(self, connector: ConnectorProto) -> bool:
         return connector in self.get_outputs()
 
+    @property
+    def pure(self) -> bool:
+        # Pure nodes are functions of their input values only and may be memoized
+        return False
+
+    @property
+    def has_side_effects(self) -> bool:
+        # Nodes with side effects are kept alive even when nothing consumes their outputs
+        return False
+
+    @property
+    def thread_safe(self) -> bool:
+        # Thread safe nodes may run on worker threads, concurrently with other nodes
+        return False
+
+    @property
+    def subsystems(self) -> Sequence["SystemProto"]:
+        # Systems the node runs itself, like the body of a loop or the branches of an If
+        return ()
+
+    @property
+    def cacheable(self) -> bool:
+        # Uncacheable nodes are run on every system run, even when none of their inputs changed
+        return True
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        # Describes everything that shapes the node's generated code, None when that is unknown
+        return None
+
+    def mark_dirty(self) -> None:
+        system = self.system
+        if system is not None:
+            system.mark_dirty(self)
+
+    def mark_modified(self) -> None:
+        # Unlike mark_dirty, a modification also changes the code generated for the node
+        system = self.system
+        if system is not None:
+            system.mark_modified(self)
+
     def validate(self) -> None:
         raise NotImplementedError()
 
 
+@runtime_checkable
+class AsyncNodeProto(NodeProto, Protocol):
+    async def arun(self) -> None:
+        raise NotImplementedError()
+
+    def run(self) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self.arun())
+            return
+
+        # A sync run reached from inside a running event loop can't start another loop on this
+        # thread, so the coroutine gets one on a worker thread
+        with ThreadPoolExecutor(1) as executor:
+            executor.submit(asyncio.run, self.arun()).result()
+
+
+@runtime_checkable
+class BatchNodeProto(NodeProto, Protocol):
+    # Vectorized run: inputs and outputs hold one column of values per connector
+    def run_batch(self, size: int) -> None:
+        raise NotImplementedError()
+
+
+# In batch runs connectors hold a column of values, one for every record
+
+
+def get_column[T](connector: InputConnectorProto[T]) -> List[T]:
+    return cast(List[T], connector.get_value())
+
+
+def get_columns[T](connector: InputConnectorProto[T]) -> List[List[T]]:
+    # Multi inputs hold one column per connection
+    return cast(List[List[T]], connector.get_value())
+
+
+def set_column[T](connector: OutputConnectorProto[T], values: List[T]) -> None:
+    connector.set_value(values)
+
+
+def fingerprint_node(node: NodeProto, *state: Any) -> str:
+    node_type = type(node)
+    connectors = [connector.name for connector in [*node.get_inputs(), *node.get_outputs()]]
+    return repr((f"{node_type.__module__}.{node_type.__qualname__}", connectors, state))
+
+
 class BasicNode(NodeProto):
+    pure: bool = False
+    thread_safe: bool = False
+
+    # Attributes the generated code depends on, None if the node cannot be fingerprinted
+    fingerprint_fields: Optional[Tuple[str, ...]] = None
 
     def __init__(self) -> None:
         self._name = type(self).__name__
@@ -70,3 +175,10 @@ class BasicNode(NodeProto):
     @system.setter
     def system(self, system: Optional["SystemProto"]) -> None:
         self._system = system
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        if self.fingerprint_fields is None:
+            return None
+
+        return fingerprint_node(self, *[getattr(self, field) for field in self.fingerprint_fields])
@@ -0,0 +1,345 @@
+import ast
+import copy
+import math
+import operator
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional, Set, Tuple
+
+DEDUPLICATE_IMPORTS = "deduplicate_imports"
+PROPAGATE_COPIES = "propagate_copies"
+FOLD_CONSTANTS = "fold_constants"
+INLINE_FAN_IN = "inline_fan_in"
+
+PASSES = (DEDUPLICATE_IMPORTS, PROPAGATE_COPIES, FOLD_CONSTANTS, INLINE_FAN_IN)
+
+_BINARY_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+_UNARY_OPERATORS: Dict[type, Callable[[Any], Any]] = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+_BUILTIN_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "abs": abs,
+    "len": len,
+    "max": max,
+    "min": min,
+    "sum": sum,
+}
+
+_MODULE_FUNCTIONS: Dict[Tuple[str, str], Callable[..., Any]] = {
+    ("math", "prod"): math.prod,
+}
+
+# Position of a statement, as the body it lives in and its index within that body
+_Site = Tuple[int, int]
+_Chain = Tuple[_Site, ...]
+
+
+def optimize(
+    module: ast.Module, passes: Iterable[str] = PASSES, keep: Collection[str] = ()
+) -> ast.Module:
+    # Names in 'keep' are read after the code runs, so their assignments are never removed
+    enabled = set(passes)
+    unknown = enabled.difference(PASSES)
+    if unknown:
+        raise Exception(f"Unknown optimization passes: {', '.join(sorted(unknown))}.")
+
+    if enabled.intersection([PROPAGATE_COPIES, FOLD_CONSTANTS, INLINE_FAN_IN]):
+        _Simplifier(module, enabled, keep).run()
+
+    if DEDUPLICATE_IMPORTS in enabled:
+        deduplicate_imports(module)
+
+    return module
+
+
+def deduplicate_imports(module: ast.Module) -> ast.Module:
+    # Generated imports are unconditional, so each one is moved to the top exactly once
+    imports: Dict[str, ast.stmt] = {}
+    for body in _statement_lists(module):
+        remaining = []
+        for statement in body:
+            if isinstance(statement, (ast.Import, ast.ImportFrom)):
+                imports.setdefault(ast.dump(statement), statement)
+            else:
+                remaining.append(statement)
+
+        body[:] = remaining
+
+    module.body[:0] = imports.values()
+    return module
+
+
+def _statement_lists(node: ast.AST) -> Iterable[List[ast.stmt]]:
+    for _, value in ast.iter_fields(node):
+        if isinstance(value, list):
+            if value and isinstance(value[0], ast.stmt):
+                yield value
+                for statement in value:
+                    yield from _statement_lists(statement)
+            else:
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        yield from _statement_lists(item)
+
+
+def _is_store(node: ast.Name) -> bool:
+    return isinstance(getattr(node, "ctx", None), (ast.Store, ast.Del))
+
+
+class _Analysis:
+    def __init__(self, module: ast.Module) -> None:
+        self.stores: Dict[str, List[_Chain]] = {}
+        self.loads: Dict[str, List[_Chain]] = {}
+        self.modules: Dict[str, Optional[str]] = {}
+        self._visit_body(module.body, ())
+
+    def store_count(self, name: str) -> int:
+        return len(self.stores.get(name, []))
+
+    def _visit_body(self, body: List[ast.stmt], chain: _Chain) -> None:
+        for index, statement in enumerate(body):
+            here = (*chain, (id(body), index))
+            if isinstance(statement, (ast.Import, ast.ImportFrom)):
+                self._visit_import(statement, here)
+
+            for _, value in ast.iter_fields(statement):
+                self._visit_field(value, here)
+
+    def _visit_field(self, value: Any, chain: _Chain) -> None:
+        if isinstance(value, list):
+            if value and isinstance(value[0], ast.stmt):
+                self._visit_body(value, chain)
+            else:
+                for item in value:
+                    self._visit_field(item, chain)
+        elif isinstance(value, ast.Name):
+            sites = self.stores if _is_store(value) else self.loads
+            sites.setdefault(value.id, []).append(chain)
+        elif isinstance(value, ast.AST):
+            for _, child in ast.iter_fields(value):
+                self._visit_field(child, chain)
+
+    def _visit_import(self, statement: ast.Import | ast.ImportFrom, chain: _Chain) -> None:
+        for alias in statement.names:
+            name = alias.asname or alias.name.split(".")[0]
+            self.stores.setdefault(name, []).append(chain)
+
+            # Only names bound solely by 'import <module>' are trusted to refer to that module
+            module = alias.name if isinstance(statement, ast.Import) and not alias.asname else None
+            if self.modules.get(name, module) != module:
+                module = None
+            self.modules[name] = module
+
+
+class _Simplifier(ast.NodeTransformer):
+    # Copy propagation, constant folding and fan-in inlining share one forward walk so that
+    # chains of constants collapse in a single pass over the module.
+    def __init__(self, module: ast.Module, passes: Set[str], keep: Collection[str]) -> None:
+        self._module = module
+        self._propagate = PROPAGATE_COPIES in passes
+        self._fold = FOLD_CONSTANTS in passes
+        self._inline = INLINE_FAN_IN in passes
+        self._keep = set(keep)
+        self._analysis = _Analysis(module)
+        self._values: Dict[str, ast.expr] = {}
+        self._fan_ins: Dict[str, ast.expr] = {}
+
+    def run(self) -> None:
+        self._simplify_body(self._module.body)
+
+    def _simplify_body(self, body: List[ast.stmt]) -> None:
+        remaining = []
+        for index, statement in enumerate(body):
+            for name, value in ast.iter_fields(statement):
+                if isinstance(value, list) and value and isinstance(value[0], ast.stmt):
+                    self._simplify_body(value)
+                    # Nested bodies can't be empty, e.g. when all their constants were folded
+                    if not value:
+                        value.append(ast.Pass())
+                elif isinstance(value, ast.expr):
+                    setattr(statement, name, self.visit(value))
+                elif isinstance(value, list):
+                    setattr(statement, name, [self.visit(item) for item in value])
+
+            if not self._record(statement, body, index):
+                remaining.append(statement)
+
+        body[:] = remaining
+
+    def _record(self, statement: ast.stmt, body: List[ast.stmt], index: int) -> bool:
+        # Returns whether the assignment was absorbed into its uses and can be removed
+        if not (
+            isinstance(statement, ast.Assign)
+            and len(statement.targets) == 1
+            and isinstance(statement.targets[0], ast.Name)
+        ):
+            return False
+
+        name = statement.targets[0].id
+        value = statement.value
+        if self._analysis.store_count(name) != 1:
+            return False
+
+        if self._propagate and self._is_copy(value, body, index):
+            if self._dominates(name, body, index):
+                self._values[name] = value
+                return name not in self._keep
+
+        if self._inline and name not in self._keep and self._is_fan_in(name, value, body, index):
+            self._fan_ins[name] = value
+            return True
+
+        return False
+
+    def _is_copy(self, value: ast.expr, body: List[ast.stmt], index: int) -> bool:
+        if isinstance(value, ast.Constant):
+            return True
+
+        if not isinstance(value, ast.Name) or value.id in self._fan_ins:
+            return False
+
+        # The copied name must keep its value for as long as the copy is used
+        stores = self._analysis.stores.get(value.id, [])
+        return len(stores) == 0 or (
+            len(stores) == 1 and not _stored_after(stores[0], id(body), index, None)
+        )
+
+    def _dominates(self, name: str, body: List[ast.stmt], index: int) -> bool:
+        # Every use must come later in the same body, so the value is always assigned first
+        return all(
+            any(site[0] == id(body) and site[1] > index for site in chain)
+            for chain in self._analysis.loads.get(name, [])
+        )
+
+    def _is_fan_in(self, name: str, value: ast.expr, body: List[ast.stmt], index: int) -> bool:
+        if not isinstance(value, ast.List):
+            return False
+
+        if not all(isinstance(element, (ast.Name, ast.Constant)) for element in value.elts):
+            return False
+
+        # Inline only into a single use in the same body so the list is still built once
+        loads = self._analysis.loads.get(name, [])
+        if len(loads) != 1 or loads[0][-1][0] != id(body) or loads[0][-1][1] <= index:
+            return False
+
+        use = loads[0][-1][1]
+        for element in value.elts:
+            if isinstance(element, ast.Name):
+                for chain in self._analysis.stores.get(element.id, []):
+                    if _stored_after(chain, id(body), index, use):
+                        return False
+
+        return True
+
+    def visit_Name(self, node: ast.Name) -> ast.expr:
+        if _is_store(node):
+            return node
+
+        fan_in = self._fan_ins.pop(node.id, None)
+        if fan_in is not None:
+            return fan_in
+
+        value = self._values.get(node.id)
+        if value is not None:
+            return copy.deepcopy(value)
+
+        return node
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.expr:
+        self.generic_visit(node)
+        function = _BINARY_OPERATORS.get(type(node.op))
+        if not self._fold or function is None:
+            return node
+
+        arguments = _constants([node.left, node.right])
+        if arguments is None or not all(_is_number(argument) for argument in arguments):
+            return node
+
+        return _evaluate(node, function, arguments)
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.expr:
+        self.generic_visit(node)
+        function = _UNARY_OPERATORS.get(type(node.op))
+        if not self._fold or function is None:
+            return node
+
+        arguments = _constants([node.operand])
+        if arguments is None or not _is_number(arguments[0]):
+            return node
+
+        return _evaluate(node, function, arguments)
+
+    def visit_Call(self, node: ast.Call) -> ast.expr:
+        self.generic_visit(node)
+        function = self._function(node.func)
+        if not self._fold or function is None or node.keywords:
+            return node
+
+        arguments = _constants(node.args)
+        if arguments is None:
+            return node
+
+        return _evaluate(node, function, arguments)
+
+    def _function(self, node: ast.expr) -> Optional[Callable[..., Any]]:
+        # Builtins and modules may be shadowed by names the generated code assigns
+        if isinstance(node, ast.Name) and self._analysis.store_count(node.id) == 0:
+            return _BUILTIN_FUNCTIONS.get(node.id)
+
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            module = self._analysis.modules.get(node.value.id)
+            if module is not None:
+                return _MODULE_FUNCTIONS.get((module, node.attr))
+
+        return None
+
+
+def _stored_after(chain: _Chain, body: int, start: int, end: Optional[int]) -> bool:
+    return any(
+        site[0] == body and site[1] > start and (end is None or site[1] < end) for site in chain
+    )
+
+
+def _constants(nodes: List[ast.expr]) -> Optional[List[Any]]:
+    values: List[Any] = []
+    for node in nodes:
+        if isinstance(node, ast.Constant):
+            values.append(node.value)
+        elif isinstance(node, (ast.List, ast.Tuple)):
+            items = _constants(node.elts)
+            if items is None:
+                return None
+            values.append(items if isinstance(node, ast.List) else tuple(items))
+        else:
+            return None
+
+    return values
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, complex))
+
+
+def _evaluate(node: ast.expr, function: Callable[..., Any], arguments: List[Any]) -> ast.expr:
+    # Anything that fails or has no exact literal form is left for the runtime to evaluate
+    try:
+        result = function(*arguments)
+    except (ArithmeticError, TypeError, ValueError):
+        return node
+
+    if isinstance(result, float) and not math.isfinite(result):
+        return node
+
+    if not isinstance(result, (int, float, complex, str)):
+        return node
+
+    return ast.Constant(result)
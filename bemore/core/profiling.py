@@ -0,0 +1,96 @@
+import sys
+import time
+from types import CodeType, TracebackType
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type
+
+from bemore.core.node import NodeProto
+
+if TYPE_CHECKING:
+    from bemore.core.system import BasicSystem
+
+_monitoring = sys.monitoring
+_TOOL_ID = _monitoring.PROFILER_ID
+_EVENTS = _monitoring.events.PY_START | _monitoring.events.LINE | _monitoring.events.PY_RETURN
+
+
+class NodeProfiler:
+    # Line level timings of a compiled system, attributed to the nodes that generated each line.
+    # Time spent in functions called from a line, e.g. sum or math.prod, counts towards it.
+    def __init__(self, system: "BasicSystem") -> None:
+        self._system = system
+        self._code: Optional[CodeType] = None
+        self._line: Optional[int] = None
+        self._started = 0
+        self.line_times: Dict[int, int] = {}
+        self.line_hits: Dict[int, int] = {}
+
+    def __enter__(self) -> "NodeProfiler":
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        if _monitoring.get_tool(_TOOL_ID) is not None:
+            raise Exception(
+                f"Profiler tool is already in use by '{_monitoring.get_tool(_TOOL_ID)}'."
+            )
+
+        self._code = self._system.compile().__code__
+        _monitoring.use_tool_id(_TOOL_ID, "bemore")
+        _monitoring.register_callback(_TOOL_ID, _monitoring.events.PY_START, self._on_start)
+        _monitoring.register_callback(_TOOL_ID, _monitoring.events.LINE, self._on_line)
+        _monitoring.register_callback(_TOOL_ID, _monitoring.events.PY_RETURN, self._on_return)
+        _monitoring.set_local_events(_TOOL_ID, self._code, _EVENTS)
+
+    def stop(self) -> None:
+        self._finish_line(time.perf_counter_ns())
+        if self._code is not None:
+            _monitoring.set_local_events(_TOOL_ID, self._code, 0)
+            self._code = None
+
+        for event in [
+            _monitoring.events.PY_START,
+            _monitoring.events.LINE,
+            _monitoring.events.PY_RETURN,
+        ]:
+            _monitoring.register_callback(_TOOL_ID, event, None)
+        _monitoring.free_tool_id(_TOOL_ID)
+
+    @property
+    def timings(self) -> Dict[NodeProto, float]:
+        source_map = self._system.source_map
+        timings: Dict[NodeProto, float] = {}
+        for line, elapsed in self.line_times.items():
+            node = source_map.node_at(line)
+            if node is not None:
+                timings[node] = timings.get(node, 0.0) + elapsed / 1e9
+
+        return timings
+
+    def report(self) -> List[Tuple[NodeProto, float]]:
+        return sorted(self.timings.items(), key=lambda item: item[1], reverse=True)
+
+    def _finish_line(self, now: int) -> None:
+        if self._line is not None:
+            self.line_times[self._line] = self.line_times.get(self._line, 0) + now - self._started
+            self._line = None
+
+    def _on_start(self, code: CodeType, offset: int) -> None:
+        self._line = None
+
+    def _on_line(self, code: CodeType, line: int) -> None:
+        now = time.perf_counter_ns()
+        self._finish_line(now)
+        self.line_hits[line] = self.line_hits.get(line, 0) + 1
+        self._line = line
+        self._started = time.perf_counter_ns()
+
+    def _on_return(self, code: CodeType, offset: int, value: Any) -> None:
+        self._finish_line(time.perf_counter_ns())
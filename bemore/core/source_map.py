@@ -0,0 +1,88 @@
+import ast
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from bemore.core.node import NodeProto
+
+_TAG = "bemore_node"
+
+
+class _NodeTag:
+    __slots__ = ("node",)
+
+    def __init__(self, node: "NodeProto") -> None:
+        self.node = node
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "_NodeTag":
+        # Copied statements still come from the same node, the node itself is never copied
+        return self
+
+
+def tag_statements(statements: Iterable[ast.stmt], node: "NodeProto") -> None:
+    # Statements tagged by a subsystem keep their more specific node
+    for statement in statements:
+        if getattr(statement, _TAG, None) is None:
+            setattr(statement, _TAG, _NodeTag(node))
+
+
+def statement_node(statement: ast.stmt) -> Optional["NodeProto"]:
+    tag: Optional[_NodeTag] = getattr(statement, _TAG, None)
+    return tag.node if tag is not None else None
+
+
+class SourceMap:
+    def __init__(self, filename: str, source: str, ranges: List[Tuple[int, int, "NodeProto"]]):
+        self._filename = filename
+        self._source = source
+        self._ranges = ranges
+
+        # Nested statements are more specific than the compound statements containing them
+        self._lines: Dict[int, "NodeProto"] = {}
+        for start, end, node in sorted(ranges, key=lambda item: item[0] - item[1]):
+            for line in range(start, end + 1):
+                self._lines[line] = node
+
+    @classmethod
+    def build(cls, module: ast.Module, source: str, filename: str) -> "SourceMap":
+        # Unparsed source parses back to the same statements, which carry the real line numbers
+        ranges: List[Tuple[int, int, "NodeProto"]] = []
+        _match(module.body, ast.parse(source).body, ranges)
+        return cls(filename, source, ranges)
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def source(self) -> str:
+        return self._source
+
+    @property
+    def ranges(self) -> List[Tuple[int, int, "NodeProto"]]:
+        return self._ranges
+
+    def node_at(self, line: int) -> Optional["NodeProto"]:
+        return self._lines.get(line)
+
+    def lines(self, node: "NodeProto") -> List[Tuple[int, int]]:
+        return [(start, end) for start, end, other in self._ranges if other is node]
+
+
+def _match(
+    generated: List[ast.stmt],
+    parsed: List[ast.stmt],
+    ranges: List[Tuple[int, int, "NodeProto"]],
+) -> None:
+    assert len(generated) == len(parsed), "Generated code does not match its source."
+    for statement, parsed_statement in zip(generated, parsed):
+        tag: Optional[_NodeTag] = getattr(statement, _TAG, None)
+        if tag is not None:
+            end = parsed_statement.end_lineno or parsed_statement.lineno
+            ranges.append((parsed_statement.lineno, end, tag.node))
+
+        for field, value in ast.iter_fields(statement):
+            if isinstance(value, list) and value and isinstance(value[0], ast.stmt):
+                _match(value, getattr(parsed_statement, field), ranges)
+            elif isinstance(value, list) and value and isinstance(value[0], ast.excepthandler):
+                for handler, parsed_handler in zip(value, getattr(parsed_statement, field)):
+                    _match(handler.body, parsed_handler.body, ranges)
@@ -1,15 +1,59 @@
 import ast
-from typing import Any, Dict, Iterable, List, Protocol, TypeVar, runtime_checkable
-
-import networkx as nx
-
+import asyncio
+import builtins
+import functools
+import hashlib
+import keyword
+import linecache
+import logging
+import re
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from types import MappingProxyType, TracebackType
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Protocol,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+    runtime_checkable,
+)
+
+from bemore.core import code_gen
+from bemore.core.code_cache import CodeCache
 from bemore.core.code_gen import CodeGeneratorProto
-from bemore.core.connectors import OutputConnectorProto
-from bemore.core.node import NodeProto
+from bemore.core.connectors import ConnectorProto, InputConnectorProto, OutputConnectorProto
+from bemore.core.graph import DiGraph
+from bemore.core.memo import MemoCache, freeze
+from bemore.core.node import AsyncNodeProto, BatchNodeProto, NodeProto
+from bemore.core.optimize import PASSES, optimize
+from bemore.core.source_map import SourceMap, tag_statements
 
 T_co = TypeVar("T_co", covariant=True)
 T_contra = TypeVar("T_contra", contravariant=True)
 
+_logger = logging.getLogger(__name__)
+
+Records = Union[Sequence[Mapping[str, Any]], Mapping[str, Sequence[Any]]]
+
+# Parameters of the run methods that input values passed as keywords would collide with
+RESERVED_INPUT_NAMES = ("outputs", "iterations")
+
 
 @runtime_checkable
 class InputProto(NodeProto, Protocol[T_contra]):
@@ -30,7 +74,39 @@ class OutputProto(NodeProto, Protocol[T_co]):
         raise NotImplementedError()
 
 
+@dataclass(frozen=True)
+class ExecutionPlan:
+    nodes: Tuple[NodeProto, ...]
+    successors: Mapping[NodeProto, Tuple[NodeProto, ...]]
+    predecessors: Mapping[NodeProto, Tuple[NodeProto, ...]]
+    inputs: Mapping[str, InputProto[Any]]
+    required_inputs: FrozenSet[str]
+    outputs: Mapping[str, OutputProto[Any]]
+
+
+class _Wavefront:
+    def __init__(self, plan: ExecutionPlan, stale: Set[NodeProto]) -> None:
+        self.stale = stale
+        self._successors = plan.successors
+        self._waiting_on = {node: len(plan.predecessors[node]) for node in plan.nodes}
+        self.ready: Deque[NodeProto] = deque(
+            node for node, count in self._waiting_on.items() if count == 0
+        )
+
+    def finish(self, node: NodeProto, ran: bool) -> None:
+        if ran:
+            self.stale.update(self._successors[node])
+
+        for successor in self._successors[node]:
+            self._waiting_on[successor] -= 1
+            if self._waiting_on[successor] == 0:
+                self.ready.append(successor)
+
+
 class SystemProto(CodeGeneratorProto, Protocol):
+    # Node that embeds this system, e.g. the For node running it as its loop body
+    owner: Optional[NodeProto]
+
     @property
     def name(self) -> str: ...
 
@@ -40,6 +116,12 @@ class SystemProto(CodeGeneratorProto, Protocol):
     @property
     def nodes(self) -> List[NodeProto]: ...
 
+    @property
+    def cacheable(self) -> bool: ...
+
+    @property
+    def memo(self) -> MemoCache: ...
+
     def add_node(self, node: NodeProto) -> None: ...
     def add_nodes(self, *nodes: NodeProto) -> None: ...
     def get_inputs(self) -> Iterable[InputProto[Any]]: ...
@@ -47,13 +129,79 @@ class SystemProto(CodeGeneratorProto, Protocol):
     def remove_node(self, node: NodeProto) -> None: ...
     def remove_nodes(self, *nodes: NodeProto) -> None: ...
     def validate(self) -> None: ...
-    def run(self, **kwargs: Dict[str, Any]) -> Dict[str, Any]: ...
+
+    def add_connection(
+        self, output: OutputConnectorProto[Any], input: InputConnectorProto[Any]
+    ) -> None: ...
+
+    def remove_connection(
+        self, output: OutputConnectorProto[Any], input: InputConnectorProto[Any]
+    ) -> None: ...
+
+    def invalidate(self) -> None: ...
+    def mark_dirty(self, node: NodeProto) -> None: ...
+    def mark_modified(self, node: NodeProto) -> None: ...
+    def prepare(self, outputs: Optional[Iterable[str]] = None) -> ExecutionPlan: ...
+    def run(self, outputs: Optional[Iterable[str]] = None, **kwargs: Any) -> Dict[str, Any]: ...
+
+    async def arun(
+        self, outputs: Optional[Iterable[str]] = None, **kwargs: Any
+    ) -> Dict[str, Any]: ...
+
+    def run_batch(
+        self, records: Records, outputs: Optional[Iterable[str]] = None
+    ) -> Dict[str, List[Any]]: ...
+
+    def run_each(
+        self,
+        iterations: Iterable[Mapping[str, Any]],
+        outputs: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> Iterator[Dict[str, Any]]: ...
+
+    def compile(self) -> Callable[..., Dict[str, Any]]: ...
+
+    @property
+    def fingerprint(self) -> Optional[str]: ...
+
+    def code_gen_name(self, connector: ConnectorProto) -> str: ...
+    def code_gen_scope(self, node: NodeProto) -> str: ...
 
 
 class BasicSystem(SystemProto):
     def __init__(self, name: str) -> None:
         self._name = name
         self._nodes: List[NodeProto] = []
+        self._graph: DiGraph[NodeProto] = DiGraph()
+        self._plan: Optional[ExecutionPlan] = None
+        self._partial_plans: Dict[FrozenSet[str], ExecutionPlan] = {}
+        self._compiled: Optional[Callable[..., Dict[str, Any]]] = None
+        self._source_map: Optional[SourceMap] = None
+        self._code_gen_names: Optional[Dict[ConnectorProto, str]] = None
+        self._code_gen_scopes: Dict[NodeProto, str] = {}
+        self._dirty: Set[NodeProto] = set()
+        self._memo = MemoCache()
+        self._max_workers = 1
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self._prune_dead_nodes = False
+        self._optimizations: Tuple[str, ...] = PASSES
+
+        self.owner: Optional[NodeProto] = None
+        self.incremental: bool = True
+        self.code_cache: Optional[CodeCache] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Copies rebuild their plans, compiled code and executor when they first need them
+        state = self.__dict__.copy()
+        state.update(
+            _plan=None,
+            _partial_plans={},
+            _compiled=None,
+            _source_map=None,
+            _executor=None,
+        )
+        return state
 
     @property
     def name(self) -> str:
@@ -67,15 +215,127 @@ class BasicSystem(SystemProto):
     def nodes(self) -> List[NodeProto]:
         return self._nodes
 
+    @property
+    def graph(self) -> DiGraph[NodeProto]:
+        return self._graph
+
+    @property
+    def cacheable(self) -> bool:
+        if self._plan is None or self._dirty:
+            return False
+
+        return all(node.cacheable for node in self._nodes)
+
+    @property
+    def memo(self) -> MemoCache:
+        return self._memo
+
+    @property
+    def prune_dead_nodes(self) -> bool:
+        return self._prune_dead_nodes
+
+    @prune_dead_nodes.setter
+    def prune_dead_nodes(self, prune_dead_nodes: bool) -> None:
+        self._prune_dead_nodes = prune_dead_nodes
+        self.invalidate()
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        # Structural hash of everything the generated code depends on, None if a node has no
+        # fingerprint. Node order matters since variable names are allocated by position.
+        nodes = list(self._graph.nodes)
+        positions = {node: position for position, node in enumerate(nodes)}
+
+        parts: List[Any] = [self._name, self._optimizations, self._prune_dead_nodes]
+        for node in nodes:
+            node_fingerprint = node.fingerprint
+            if node_fingerprint is None:
+                return None
+
+            connections = [
+                [
+                    (
+                        positions[connection.node],
+                        list(connection.node.get_outputs()).index(
+                            cast(OutputConnectorProto[Any], connection)
+                        ),
+                    )
+                    for connection in connector.get_connections()
+                ]
+                for connector in node.get_inputs()
+            ]
+            parts.append((node_fingerprint, connections))
+
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    @property
+    def optimizations(self) -> Tuple[str, ...]:
+        return self._optimizations
+
+    @optimizations.setter
+    def optimizations(self, optimizations: Iterable[str]) -> None:
+        optimizations = tuple(optimizations)
+        unknown = set(optimizations).difference(PASSES)
+        if unknown:
+            raise Exception(f"Unknown optimization passes: {', '.join(sorted(unknown))}.")
+
+        self._optimizations = optimizations
+        self._compiled = None
+        self._source_map = None
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    @max_workers.setter
+    def max_workers(self, max_workers: int) -> None:
+        assert max_workers >= 1, "A system needs at least one worker."
+        self._max_workers = max_workers
+        self.close()
+
+    def close(self) -> None:
+        # Shuts down the worker threads, the next parallel run starts new ones
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "BasicSystem":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
     def add_node(self, node: NodeProto) -> None:
-        assert node not in self._nodes
+        assert node not in self._graph
         node.system = self
         self._nodes.append(node)
+        self._graph.add_node(node)
+        self._dirty.add(node)
+
+        # Pick up connections made before the node joined the system
+        for input_connector in node.get_inputs():
+            for connection in input_connector.get_connections():
+                self._add_edge(connection, input_connector)
+
+        for output_connector in node.get_outputs():
+            for connection in output_connector.get_connections():
+                self._add_edge(output_connector, connection)
+
+        self.invalidate()
 
     def remove_node(self, node: NodeProto) -> None:
-        assert node in self._nodes
+        assert node in self._graph
         node.system = None
         self._nodes.remove(node)
+        self._dirty.discard(node)
+        self._dirty.update(self._graph.successors(node))
+        self._graph.remove_node(node)
+        self.invalidate()
 
     def add_nodes(self, *args: NodeProto) -> None:
         for node in args:
@@ -100,72 +360,606 @@ class BasicSystem(SystemProto):
             assert node.system is self, f"Node {node} does not belong to this system."
             node.validate()
 
-    def _construct_node_graph(self) -> nx.DiGraph:  # type: ignore
-        # Construct the node graph
-        graph = nx.DiGraph()  # type: ignore
-        for node in self._nodes:
-            graph.add_node(node)
-
-        for node in self._nodes:
-            for input in node.get_inputs():
-                for output in input.get_connections():
-                    for other in self._nodes:
-                        if node is other:
-                            continue
-
-                        if output in other.get_outputs():
-                            graph.add_edge(other, node)
+    def add_connection(
+        self, output: OutputConnectorProto[Any], input: InputConnectorProto[Any]
+    ) -> None:
+        self._add_edge(output, input)
+        if input.node in self._graph:
+            self._dirty.add(input.node)
+
+        self.invalidate()
+
+    def remove_connection(
+        self, output: OutputConnectorProto[Any], input: InputConnectorProto[Any]
+    ) -> None:
+        source = self._owner(output)
+        target = self._owner(input)
+        if source is not None and target is not None and source is not target:
+            # Other connections between the same nodes keep the edge
+            if not any(
+                connection.node is source
+                for connector in target.get_inputs()
+                for connection in connector.get_connections()
+            ):
+                self._graph.remove_edge(source, target)
+
+        if target is not None:
+            self._dirty.add(target)
+
+        self.invalidate()
+
+    def _owner(self, connector: ConnectorProto) -> Optional[NodeProto]:
+        node = connector.node
+        if node in self._graph:
+            return node
+
+        return None
+
+    def _add_edge(self, output: ConnectorProto, input: ConnectorProto) -> None:
+        source = self._owner(output)
+        target = self._owner(input)
+
+        if source is None or target is None or source is target:
+            return
+
+        self._graph.add_edge(source, target)
+
+    def invalidate(self) -> None:
+        self._plan = None
+        self._partial_plans.clear()
+        self._compiled = None
+        self._source_map = None
+        self._code_gen_names = None
+        if self.owner is not None:
+            self.owner.mark_modified()
+
+    def mark_dirty(self, node: NodeProto) -> None:
+        assert node in self._graph, f"Node {node} does not belong to this system."
+        self._dirty.add(node)
+
+    def mark_modified(self, node: NodeProto) -> None:
+        self.mark_dirty(node)
+        self._compiled = None
+        self._source_map = None
+        if self.owner is not None:
+            self.owner.mark_modified()
+
+    def prepare(self, outputs: Optional[Iterable[str]] = None) -> ExecutionPlan:
+        if self._plan is None:
+            self._plan = self._build_plan()
+
+        if outputs is None:
+            return self._plan
+
+        names = frozenset(outputs)
+        plan = self._partial_plans.get(names)
+        if plan is None:
+            plan = self._build_partial_plan(self._plan, names)
+            self._partial_plans[names] = plan
+
+        return plan
+
+    def _build_plan(self) -> ExecutionPlan:
+        order = self._graph.topological_sort()
+        input_map = {node.name: node for node in self.get_inputs()}
+        output_map = {node.name: node for node in self.get_outputs()}
+        for name in RESERVED_INPUT_NAMES:
+            if name in input_map:
+                raise Exception(f"Input name '{name}' is reserved by the system run methods.")
+
+        needed: Set[NodeProto] = set(order)
+        if self._prune_dead_nodes:
+            needed = self._find_live_nodes(output_map.values())
+            dead = [node for node in order if node not in needed]
+            if dead:
+                _logger.info(
+                    f"Pruned {len(dead)} dead node(s) from system '{self._name}': "
+                    + ", ".join(node.name for node in dead)
+                )
+
+        return self._make_plan(order, needed, input_map, output_map)
+
+    def _find_live_nodes(self, outputs: Iterable[OutputProto[Any]]) -> Set[NodeProto]:
+        # A node is live if its results can reach an output or a node with side effects
+        roots = [*outputs, *(node for node in self._nodes if node.has_side_effects)]
+        return self._graph.ancestors(roots).union(roots)
+
+    def _make_plan(
+        self,
+        order: Iterable[NodeProto],
+        needed: Set[NodeProto],
+        input_map: Mapping[str, InputProto[Any]],
+        output_map: Mapping[str, OutputProto[Any]],
+    ) -> ExecutionPlan:
+        nodes = tuple(node for node in order if node in needed)
+        inputs = {name: node for name, node in input_map.items() if node in needed}
+
+        return ExecutionPlan(
+            nodes=nodes,
+            successors=MappingProxyType(
+                {
+                    node: tuple(s for s in self._graph.successors(node) if s in needed)
+                    for node in nodes
+                }
+            ),
+            predecessors=MappingProxyType(
+                {
+                    node: tuple(p for p in self._graph.predecessors(node) if p in needed)
+                    for node in nodes
+                }
+            ),
+            inputs=MappingProxyType(inputs),
+            required_inputs=frozenset(name for name, node in inputs.items() if node.is_required),
+            outputs=MappingProxyType(
+                {name: node for name, node in output_map.items() if node in needed}
+            ),
+        )
 
-        return graph
+    def _build_partial_plan(self, plan: ExecutionPlan, names: FrozenSet[str]) -> ExecutionPlan:
+        unknown_outputs = names.difference(plan.outputs)
+        if unknown_outputs:
+            raise Exception(f"Unknown outputs: {unknown_outputs}.")
 
-    def run(self, **kwargs: Dict[str, Any]) -> Dict[str, Any]:
-        graph = self._construct_node_graph()
+        targets = [plan.outputs[name] for name in names]
+        needed = self._graph.ancestors(targets).union(targets)
+        output_map = {name: node for name, node in plan.outputs.items() if name in names}
 
-        cycles = list(nx.simple_cycles(graph))
-        assert not cycles
+        return self._make_plan(plan.nodes, needed, plan.inputs, output_map)
 
-        input_map = {node.name: node for node in self.get_inputs()}
+    def _bind_inputs(
+        self, outputs: Optional[Iterable[str]], kwargs: Mapping[str, Any]
+    ) -> ExecutionPlan:
+        plan = self.prepare(outputs)
 
-        required_names = set(name for name, node in input_map.items() if node.is_required)
-        given_names = set(kwargs.keys())
-
-        missing_inputs = required_names.difference(given_names)
+        missing_inputs = plan.required_inputs.difference(kwargs)
 
         if missing_inputs:
             raise Exception(f"Missing inputs: {missing_inputs}.")
 
-        for name, node in input_map.items():
-            node.set_value(kwargs.get(name))
+        for name, input_node in plan.inputs.items():
+            input_node.set_value(kwargs.get(name))
+
+        return plan
+
+    def _collect_outputs(self, plan: ExecutionPlan, stale: Set[NodeProto]) -> Dict[str, Any]:
+        if plan is self._plan:
+            self._dirty.clear()
+        else:
+            # Nodes left out of a partial run stay dirty, along with anything downstream of the
+            # nodes that did run
+            dirty = {node for node in self._dirty if node not in plan.successors}
+            for node in plan.nodes:
+                if self._is_stale(node, stale):
+                    dirty.update(
+                        s for s in self._graph.successors(node) if s not in plan.successors
+                    )
+
+            self._dirty = dirty
+
+        return {name: output_node.get_value() for name, output_node in plan.outputs.items()}
+
+    def run(self, outputs: Optional[Iterable[str]] = None, **kwargs: Any) -> Dict[str, Any]:
+        plan = self._bind_inputs(outputs, kwargs)
+
+        stale = set(self._dirty)
+        if self._max_workers > 1:
+            self._run_parallel(plan, stale)
+        else:
+            for node in plan.nodes:
+                if self._is_stale(node, stale):
+                    self._execute(node)
+                    stale.update(plan.successors[node])
+
+        return self._collect_outputs(plan, stale)
+
+    async def arun(self, outputs: Optional[Iterable[str]] = None, **kwargs: Any) -> Dict[str, Any]:
+        plan = self._bind_inputs(outputs, kwargs)
+
+        stale = set(self._dirty)
+        wavefront = _Wavefront(plan, stale)
+        running: Dict[asyncio.Future[None], NodeProto] = {}
+
+        try:
+            while wavefront.ready or running:
+                while wavefront.ready:
+                    node = wavefront.ready.popleft()
+                    if not self._is_stale(node, wavefront.stale):
+                        wavefront.finish(node, ran=False)
+                    elif isinstance(node, AsyncNodeProto):
+                        running[asyncio.ensure_future(self._aexecute(node))] = node
+                    elif node.thread_safe:
+                        offloaded = asyncio.to_thread(self._execute, node)
+                        running[asyncio.ensure_future(offloaded)] = node
+                    else:
+                        # Nodes that aren't thread safe run on the event loop
+                        self._execute(node)
+                        wavefront.finish(node, ran=True)
+
+                if running:
+                    done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                        wavefront.finish(running.pop(future), ran=True)
+        finally:
+            # After a failure nothing keeps running, and exceptions of the rest are retrieved
+            for future in running:
+                future.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+        return self._collect_outputs(plan, stale)
+
+    def run_batch(
+        self, records: Records, outputs: Optional[Iterable[str]] = None
+    ) -> Dict[str, List[Any]]:
+        if isinstance(records, Mapping):
+            columns = {name: list(column) for name, column in records.items()}
+            sizes = set(len(column) for column in columns.values())
+            assert len(sizes) <= 1, "All record columns must have the same length."
+            size = sizes.pop() if sizes else 0
+        else:
+            names = set(name for record in records for name in record)
+            columns = {name: [record.get(name) for record in records] for name in names}
+            size = len(records)
+
+        plan = self._bind_inputs(outputs, columns)
+        for name, input_node in plan.inputs.items():
+            if name not in columns:
+                input_node.set_value([None] * size)
+
+        for node in plan.nodes:
+            if isinstance(node, BatchNodeProto):
+                node.run_batch(size)
+            else:
+                self._run_per_record(node, size)
+
+        # Connectors now hold columns, so the next scalar run has to start from scratch
+        self._dirty.update(self._nodes)
+
+        return {name: output_node.get_value() for name, output_node in plan.outputs.items()}
+
+    def run_each(
+        self,
+        iterations: Iterable[Mapping[str, Any]],
+        outputs: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> Iterator[Dict[str, Any]]:
+        # Runs once per mapping of iteration values, with kwargs bound for every iteration. Only
+        # the first iteration goes through a full run, after that just the nodes depending on the
+        # iteration values, or that cannot be cached, are executed again.
+        remaining = iter(iterations)
+        first = next(remaining, None)
+        if first is None:
+            return
+
+        yield self.run(outputs, **{**kwargs, **first})
+
+        plan = self.prepare(outputs)
+        input_nodes = {name: plan.inputs[name] for name in first if name in plan.inputs}
+        bound = [(name, input_node.output) for name, input_node in input_nodes.items()]
+        steps = self._varying_steps(plan, input_nodes.values())
+        # Iteration values are bound straight to the input outputs, and nodes that can't be
+        # memoized skip the memo lookup entirely
+        runs = [
+            functools.partial(self._execute, node) if node.pure and self._memo.enabled else node.run
+            for node in steps
+            if node not in input_nodes.values()
+        ]
+        output_nodes = plan.outputs.items()
+
+        for values in remaining:
+            for name, output in bound:
+                output.set_value(values[name])
+
+            for run in runs:
+                run()
+
+            yield {name: output_node.get_value() for name, output_node in output_nodes}
+
+        # Every node that ran, and every input bound, is up to date with the last iteration
+        self._dirty.difference_update(steps)
+
+    def _varying_steps(
+        self, plan: ExecutionPlan, input_nodes: Iterable[NodeProto]
+    ) -> List[NodeProto]:
+        if not self.incremental:
+            return list(plan.nodes)
+
+        varying = set(input_nodes)
+        for node in plan.nodes:
+            if node in varying or not node.cacheable:
+                varying.add(node)
+                varying.update(plan.successors[node])
+
+        return [node for node in plan.nodes if node in varying]
+
+    def _run_per_record(self, node: NodeProto, size: int) -> None:
+        upstream: Dict[OutputConnectorProto[Any], List[Any]] = {}
+        for input_connector in node.get_inputs():
+            for connection in input_connector.get_connections():
+                output_connection = cast(OutputConnectorProto[Any], connection)
+                upstream[output_connection] = output_connection.get_value()
+
+        outputs = list(node.get_outputs())
+        results: List[List[Any]] = [[] for _ in outputs]
+        for index in range(size):
+            for connector, column in upstream.items():
+                connector.set_value(column[index])
 
-        for node in nx.topological_sort(graph):
             node.run()
-
-        outputs = {node.name: node.get_value for node in self.get_outputs()}
-
-        return outputs
+            for output, result in zip(outputs, results):
+                result.append(output.get_value() if output.has_value else None)
+
+        for connector, column in upstream.items():
+            connector.set_value(column)
+
+        for output, result in zip(outputs, results):
+            output.set_value(result)
+
+    def _is_stale(self, node: NodeProto, stale: Set[NodeProto]) -> bool:
+        return not self.incremental or node in stale or not node.cacheable
+
+    def _run_parallel(self, plan: ExecutionPlan, stale: Set[NodeProto]) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers,
+                thread_name_prefix=f"bemore-{self._name}",
+            )
+
+        wavefront = _Wavefront(plan, stale)
+        running: Dict[Future[None], NodeProto] = {}
+
+        try:
+            while wavefront.ready or running:
+                while wavefront.ready:
+                    node = wavefront.ready.popleft()
+                    if not self._is_stale(node, stale):
+                        wavefront.finish(node, ran=False)
+                    elif node.thread_safe:
+                        running[self._executor.submit(self._execute, node)] = node
+                    else:
+                        # Nodes that aren't thread safe run on the calling thread
+                        self._execute(node)
+                        wavefront.finish(node, ran=True)
+
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                        wavefront.finish(running.pop(future), ran=True)
+        finally:
+            # After a failure nodes that haven't started are dropped, the rest finish first
+            for future in running:
+                future.cancel()
+            wait(running)
+
+    def _memo_key(self, node: NodeProto) -> Optional[Hashable]:
+        if not (node.pure and self._memo.enabled):
+            return None
+
+        try:
+            return (node, tuple(freeze(input.get_value()) for input in node.get_inputs()))
+        except TypeError:
+            # Unhashable input values can't be memoized
+            return None
+
+    def _restore_memo(self, node: NodeProto, key: Hashable) -> bool:
+        values = self._memo.get(key)
+        if values is None:
+            return False
+
+        for output, value in zip(node.get_outputs(), values):
+            output.set_value(value)
+
+        return True
+
+    def _store_memo(self, node: NodeProto, key: Hashable) -> None:
+        self._memo.put(key, tuple(output.get_value() for output in node.get_outputs()))
+
+    def _execute(self, node: NodeProto) -> None:
+        key = self._memo_key(node)
+        if key is None:
+            node.run()
+        elif not self._restore_memo(node, key):
+            node.run()
+            self._store_memo(node, key)
+
+    async def _aexecute(self, node: AsyncNodeProto) -> None:
+        key = self._memo_key(node)
+        if key is None:
+            await node.arun()
+        elif not self._restore_memo(node, key):
+            await node.arun()
+            self._store_memo(node, key)
+
+    def code_gen_name(self, connector: ConnectorProto) -> str:
+        if self._code_gen_names is None or connector not in self._code_gen_names:
+            self._allocate_names()
+
+        assert self._code_gen_names is not None
+        name = self._code_gen_names.get(connector)
+        if name is None:
+            raise Exception(f"Connector {connector} does not belong to system '{self._name}'.")
+
+        return name
+
+    def code_gen_scope(self, node: NodeProto) -> str:
+        if self._code_gen_names is None or node not in self._code_gen_scopes:
+            self._allocate_names()
+
+        return self._code_gen_scopes[node]
+
+    def _allocate_names(self) -> None:
+        # Names only depend on graph position, so identical graphs generate identical source.
+        # Subsystems are prefixed with their owner's scope to keep inlined bodies apart.
+        owner = self.owner
+        owner_system = owner.system if owner is not None else None
+        prefix = "" if owner is None or owner_system is None else owner_system.code_gen_scope(owner)
+
+        # Owners of several subsystems, like the branches of an If, keep each one's names apart
+        siblings = owner.subsystems if owner is not None else [self]
+        if prefix and len(siblings) > 1:
+            prefix = f"{prefix}{siblings.index(self)}_"
+
+        names: Dict[ConnectorProto, str] = {}
+        scopes: Dict[NodeProto, str] = {}
+        for position, node in enumerate(self._graph.nodes):
+            scopes[node] = f"{prefix}_{position}_"
+            for connector in [*node.get_inputs(), *node.get_outputs()]:
+                # Labels start with a letter, so they can't run into the prefixes of subsystems
+                label = re.sub(r"\W", "_", connector.name).lstrip("_")
+                if not label[:1].isalpha():
+                    label = f"v{label}"
+                names[connector] = f"{prefix}{label}_{len(names)}"
+
+        self._code_gen_names = names
+        self._code_gen_scopes = scopes
 
     def generate_ast(self) -> ast.Module:
-        graph = self._construct_node_graph()
-
-        cycles = list(nx.simple_cycles(graph))
-        assert not cycles
+        plan = self.prepare()
+        self._allocate_names()
 
         gen_module = ast.Module(body=[], type_ignores=[])
 
         next_node: NodeProto
-        for next_node in nx.topological_sort(graph):
+        for next_node in plan.nodes:
             node_ast = next_node.generate_ast()
+            tag_statements(node_ast.body, next_node)
             gen_module.body.extend(node_ast.body)
 
-        # Surface imports to the top
-        imports = []
-        for node in ast.walk(gen_module):
-            if isinstance(node, ast.Import):
-                imports.append(node)
+        # Every node output stays assigned so it can still be read back by its code_gen_name
+        assert self._code_gen_names is not None
+        outputs = [
+            name
+            for connector, name in self._code_gen_names.items()
+            if connector in connector.node.get_outputs()
+        ]
+        return optimize(gen_module, self._optimizations, keep=outputs)
 
-        gen_module = ast.Module(
-            body=imports + gen_module.body,
-            type_ignores=gen_module.type_ignores,
+    def compile(self) -> Callable[..., Dict[str, Any]]:
+        if self._compiled is None:
+            self._compiled = self._compile()
+
+        return self._compiled
+
+    @property
+    def source_map(self) -> SourceMap:
+        # Maps lines of the compiled function's source back to the nodes that generated them
+        self.compile()
+        if self._source_map is None:
+            self._source_map = self._generate_source()
+
+        return self._source_map
+
+    def _function_name(self) -> str:
+        function_name = re.sub(r"\W", "_", self._name)
+        if not function_name.isidentifier():
+            function_name = f"_{function_name}"
+
+        # The function is a global of its module, it must not hide a builtin the body calls
+        if keyword.iskeyword(function_name) or hasattr(builtins, function_name):
+            function_name = f"{function_name}_"
+
+        return function_name
+
+    def _compile(self) -> Callable[..., Dict[str, Any]]:
+        # Unchanged graphs load their code from the cache without generating it again
+        fingerprint = self.fingerprint if self.code_cache is not None else None
+        code = None
+        if self.code_cache is not None and fingerprint is not None:
+            code = self.code_cache.get(fingerprint)
+
+        if code is None:
+            self._source_map = self._generate_source()
+            code = compile(self._source_map.source, self._source_map.filename, "exec")
+            if self.code_cache is not None and fingerprint is not None:
+                self.code_cache.put(fingerprint, code)
+
+        namespace: Dict[str, Any] = {}
+        exec(code, namespace)
+
+        compiled: Callable[..., Dict[str, Any]] = namespace[self._function_name()]
+        return compiled
+
+    def _generate_source(self) -> SourceMap:
+        plan = self.prepare()
+        function_name = self._function_name()
+
+        for name in plan.inputs:
+            if not name.isidentifier() or keyword.iskeyword(name):
+                raise Exception(f"Input name '{name}' is not a valid Python identifier.")
+
+        generated = self.generate_ast()
+
+        # Inputs named like something the generated code uses, e.g. sum, math or one of its own
+        # variables, are passed in a keyword dict rather than as arguments hiding that name
+        used = {node.id for node in ast.walk(generated) if isinstance(node, ast.Name)}
+        used.update(node.output.code_gen_name for node in plan.inputs.values())
+        used.update(
+            (alias.asname or alias.name).split(".")[0]
+            for node in ast.walk(generated)
+            if isinstance(node, (ast.Import, ast.ImportFrom))
+            for alias in node.names
         )
+        clashing = {name for name in plan.inputs if name in used}
+        extra_inputs = "inputs"
+        while extra_inputs in used or extra_inputs in plan.inputs:
+            extra_inputs = f"_{extra_inputs}"
+
+        arguments = ast.arguments(
+            posonlyargs=[],
+            args=[],
+            kwonlyargs=[ast.arg(name) for name in plan.inputs if name not in clashing],
+            kw_defaults=[
+                None if node.is_required else ast.Constant(None)
+                for name, node in plan.inputs.items()
+                if name not in clashing
+            ],
+            kwarg=ast.arg(extra_inputs) if clashing else None,
+            defaults=[],
+        )
+
+        # Bind keyword arguments to the names the generated code reads them from
+        bind_inputs: List[ast.stmt] = []
+        for name, node in plan.inputs.items():
+            value: ast.expr = ast.Name(name, ast.Load())
+            if name in clashing and node.is_required:
+                value = ast.Subscript(ast.Name(extra_inputs, ast.Load()), ast.Constant(name))
+            elif name in clashing:
+                value = code_gen.call(f"{extra_inputs}.get", ast.Constant(name))
+
+            bind_input = ast.Assign(
+                targets=[ast.Name(node.output.code_gen_name, ast.Store())], value=value
+            )
+            tag_statements([bind_input], node)
+            bind_inputs.append(bind_input)
+
+        return_outputs = ast.Return(
+            ast.Dict(
+                keys=[ast.Constant(name) for name in plan.outputs],
+                values=[
+                    ast.Name(next(iter(node.get_inputs())).code_gen_name, ast.Load())
+                    for node in plan.outputs.values()
+                ],
+            )
+        )
+
+        # Only the returned values are needed once the body is inside a function
+        body = ast.Module(body=bind_inputs + generated.body, type_ignores=[])
+        keep = [cast(ast.Name, value).id for value in cast(ast.Dict, return_outputs.value).values]
+        optimize(body, self._optimizations, keep=keep)
+
+        function = ast.FunctionDef(
+            name=function_name,
+            args=arguments,
+            body=body.body + [return_outputs],
+            decorator_list=[],
+            type_params=[],
+        )
+        module = ast.fix_missing_locations(ast.Module(body=[function], type_ignores=[]))
+
+        # Registering the source lets tracebacks and profilers show the generated lines
+        filename = f"<bemore:{self._name}>"
+        source = ast.unparse(module)
+        linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
 
-        return gen_module
+        return SourceMap.build(module, source, filename)
@@ -1,14 +1,16 @@
 from ast import Module
 from collections.abc import Collection
-from typing import Any, Optional
+from typing import Any, Hashable, Optional
 
 from bemore.core.connectors import (
     BasicOutput,
     InputConnectorProto,
     OutputConnectorProto,
     RequiredInput,
+    snapshot,
 )
 from bemore.core.logging import get_node_logger, get_node_runtime_logger, get_node_validation_logger
+from bemore.core.node import fingerprint_node
 from bemore.core.system import InputProto, OutputProto, SystemProto
 from bemore.core.typing import DynamicTypeVar
 
@@ -22,6 +24,8 @@ class KeywordInput[_T](InputProto[_T]):
         self._validation_logger = get_node_validation_logger(self)
 
         self.output: BasicOutput[_T] = BasicOutput(self, "output", DynamicTypeVar())
+        self._snapshot: Hashable = object()
+        self._snapshot_value: Any = None
 
     @property
     def is_required(self) -> bool:
@@ -34,6 +38,8 @@ class KeywordInput[_T](InputProto[_T]):
     @name.setter
     def name(self, name: str) -> None:
         self._name = name
+        if self._system is not None:
+            self._system.invalidate()
 
     @property
     def system(self) -> Optional["SystemProto"]:
@@ -47,6 +53,10 @@ class KeywordInput[_T](InputProto[_T]):
         # Nothing to do
         pass
 
+    def run_batch(self, size: int) -> None:
+        # Nothing to do
+        pass
+
     def get_inputs(self) -> Collection[InputConnectorProto[Any]]:
         return []
 
@@ -58,8 +68,23 @@ class KeywordInput[_T](InputProto[_T]):
         return
 
     def set_value(self, value: _T) -> None:
+        # run_each binds values to the output directly, so the snapshot may be of an older value
+        previous = self._snapshot
+        if self.output.has_value and self.output.get_value() is not self._snapshot_value:
+            previous = snapshot(self.output.get_value())
+
+        frozen = snapshot(value)
+        if frozen != previous:
+            self.mark_dirty()
+
+        self._snapshot = frozen
+        self._snapshot_value = value
         self.output.set_value(value)
 
+    @property
+    def fingerprint(self) -> Optional[str]:
+        return fingerprint_node(self, self._name, self.is_required)
+
     def generate_ast(self) -> Module:
         return Module(body=[], type_ignores=[])
 
@@ -86,6 +111,8 @@ class PositionalInput[_T](OutputProto[_T]):
     @name.setter
     def name(self, name: str) -> None:
         self._name = name
+        if self._system is not None:
+            self._system.invalidate()
 
     @property
     def system(self) -> Optional["SystemProto"]:
@@ -123,6 +150,8 @@ class Output[_T](OutputProto[_T]):
     @name.setter
     def name(self, name: str) -> None:
         self._name = name
+        if self._system is not None:
+            self._system.invalidate()
 
     @property
     def system(self) -> Optional["SystemProto"]:
@@ -136,6 +165,10 @@ class Output[_T](OutputProto[_T]):
         # Nothing to do
         pass
 
+    def run_batch(self, size: int) -> None:
+        # Nothing to do
+        pass
+
     def get_inputs(self) -> Collection[InputConnectorProto[_T]]:
         return [self.input]
 
@@ -149,5 +182,9 @@ class Output[_T](OutputProto[_T]):
     def get_value(self) -> _T:
         return self.input.get_value()
 
+    @property
+    def fingerprint(self) -> Optional[str]:
+        return fingerprint_node(self, self._name)
+
     def generate_ast(self) -> Module:
         return Module(body=[], type_ignores=[])
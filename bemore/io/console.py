@@ -3,9 +3,14 @@ from collections.abc import Collection
 from typing import Any
 
 from bemore import BasicNode, InputConnectorProto, OutputConnectorProto, RequiredInput
+from bemore.core.code_gen import call, expression, module, name
 
 
 class ConsolePrinter(BasicNode):
+    cacheable = False
+    has_side_effects = True
+    fingerprint_fields = ()
+
     def __init__(self) -> None:
         super().__init__()
         self.input: RequiredInput[Any] = RequiredInput(self, "input", Any)
@@ -23,4 +28,4 @@ class ConsolePrinter(BasicNode):
         self.input.validate()
 
     def generate_ast(self) -> ast.Module:
-        return ast.parse(f"print({self.input.code_gen_name})")
+        return module([expression(call("print", name(self.input.code_gen_name)))])
@@ -12,9 +12,15 @@ from bemore import (
     RequiredInput,
     RequiredMultiInput,
 )
+from bemore.core.code_gen import assign, binop, call, import_module, module, name
+from bemore.core.node import get_column, get_columns, set_column
 
 
 class Sum(BasicNode):
+    pure = True
+    thread_safe = True
+    fingerprint_fields = ()
+
     def __init__(self) -> None:
         super().__init__()
         self.input: RequiredMultiInput[float] = RequiredMultiInput(self, "input", float)
@@ -24,6 +30,10 @@ class Sum(BasicNode):
         in_value = self.input.get_value()
         self.output.set_value(sum(in_value))
 
+    def run_batch(self, size: int) -> None:
+        columns = get_columns(self.input)
+        set_column(self.output, [sum(values) for values in zip(*columns)])
+
     def get_inputs(self) -> Collection[InputConnectorProto[float]]:
         return [self.input]
 
@@ -35,14 +45,15 @@ class Sum(BasicNode):
         self.output.validate()
 
     def generate_ast(self) -> ast.Module:
-        gen_module = self.input.generate_ast()
-        line = f"{self.output.code_gen_name} = sum({self.input.code_gen_name})\n"
-        body_module = ast.parse(line)
-        gen_module.body.extend(body_module.body)
-        return gen_module
+        statement = assign(self.output.code_gen_name, call("sum", name(self.input.code_gen_name)))
+        return module(self.input.generate_ast().body, [statement])
 
 
 class Product(BasicNode):
+    pure = True
+    thread_safe = True
+    fingerprint_fields = ()
+
     def __init__(self) -> None:
         super().__init__()
         self.input: RequiredMultiInput[float] = RequiredMultiInput(self, "input", float)
@@ -53,6 +64,10 @@ class Product(BasicNode):
 
         self.output.set_value(value)
 
+    def run_batch(self, size: int) -> None:
+        columns = get_columns(self.input)
+        set_column(self.output, [math.prod(values) for values in zip(*columns)])
+
     def get_inputs(self) -> Collection[InputConnectorProto[float]]:
         return [self.input]
 
@@ -64,19 +79,16 @@ class Product(BasicNode):
         self.output.validate()
 
     def generate_ast(self) -> ast.Module:
-        import_math = ast.Import([ast.alias("math")])
-        inputs = self.input.generate_ast()
-        lines = "\n".join(
-            [
-                f"{self.output.code_gen_name} = math.prod({self.input.code_gen_name})",
-            ]
+        statement = assign(
+            self.output.code_gen_name, call("math.prod", name(self.input.code_gen_name))
         )
-        body = ast.parse(lines)
-
-        return ast.Module(body=[import_math] + inputs.body + body.body, type_ignores=[])
+        return module([import_module("math")], self.input.generate_ast().body, [statement])
 
 
 class Subtract(BasicNode):
+    pure = True
+    thread_safe = True
+    fingerprint_fields = ()
 
     def __init__(self) -> None:
         super().__init__()
@@ -92,6 +104,11 @@ class Subtract(BasicNode):
 
         self.output.set_value(result)
 
+    def run_batch(self, size: int) -> None:
+        lefts = get_column(self.left)
+        rights = get_column(self.right)
+        set_column(self.output, [left - right for left, right in zip(lefts, rights)])
+
     def get_inputs(self) -> Collection[InputConnectorProto[float]]:
         return [self.left, self.right]
 
@@ -104,19 +121,17 @@ class Subtract(BasicNode):
         self.output.validate()
 
     def generate_ast(self) -> ast.Module:
-        line = (
-            f"{self.output.code_gen_name} = "
-            f"{self.left.code_gen_name} - {self.right.code_gen_name}\n"
-        )
-        body = ast.parse(line)
-
-        return ast.Module(
-            body=self.left.generate_ast().body + self.right.generate_ast().body + body.body,
-            type_ignores=[],
+        statement = assign(
+            self.output.code_gen_name,
+            binop(self.left.code_gen_name, ast.Sub(), self.right.code_gen_name),
         )
+        return module(self.left.generate_ast().body, self.right.generate_ast().body, [statement])
 
 
 class Divide(BasicNode):
+    pure = True
+    thread_safe = True
+    fingerprint_fields = ()
 
     def __init__(self) -> None:
         super().__init__()
@@ -132,6 +147,14 @@ class Divide(BasicNode):
 
         self.output.set_value(result)
 
+    def run_batch(self, size: int) -> None:
+        numerators = get_column(self.numerator)
+        denominators = get_column(self.denominator)
+        results = [
+            numerator / denominator for numerator, denominator in zip(numerators, denominators)
+        ]
+        set_column(self.output, results)
+
     def get_inputs(self) -> Collection[InputConnectorProto[float]]:
         return [self.numerator, self.denominator]
 
@@ -144,23 +167,20 @@ class Divide(BasicNode):
         self.output.validate()
 
     def generate_ast(self) -> ast.Module:
-        line = (
-            f"{self.output.code_gen_name} = "
-            f"{self.numerator.code_gen_name} / {self.denominator.code_gen_name}\n"
+        statement = assign(
+            self.output.code_gen_name,
+            binop(self.numerator.code_gen_name, ast.Div(), self.denominator.code_gen_name),
         )
-        body = ast.parse(line)
-
-        return ast.Module(
-            body=(
-                self.numerator.generate_ast().body
-                + self.denominator.generate_ast().body
-                + body.body
-            ),
-            type_ignores=[],
+        return module(
+            self.numerator.generate_ast().body, self.denominator.generate_ast().body, [statement]
         )
 
 
 class Abs[_T](BasicNode):
+    pure = True
+    thread_safe = True
+    fingerprint_fields = ()
+
     def __init__(self) -> None:
         super().__init__()
         _t = DynamicTypeVar()
@@ -172,6 +192,10 @@ class Abs[_T](BasicNode):
         abs_val = abs(input_value)
         self.output.set_value(abs_val)
 
+    def run_batch(self, size: int) -> None:
+        values = get_column(self.input)
+        set_column(self.output, [abs(value) for value in values])
+
     def get_inputs(self) -> Collection[InputConnectorProto[SupportsAbs[_T]]]:
         return [self.input]
 
@@ -182,16 +206,14 @@ class Abs[_T](BasicNode):
         self.output.validate()
 
     def generate_ast(self) -> ast.Module:
-        line = f"{self.output.code_gen_name} = abs({self.input.code_gen_name})\n"
-        body = ast.parse(line)
-
-        return ast.Module(
-            body=(self.input.generate_ast().body + body.body),
-            type_ignores=[],
-        )
+        statement = assign(self.output.code_gen_name, call("abs", name(self.input.code_gen_name)))
+        return module(self.input.generate_ast().body, [statement])
 
 
 class Modulo(BasicNode):
+    pure = True
+    thread_safe = True
+    fingerprint_fields = ()
 
     def __init__(self) -> None:
         super().__init__()
@@ -207,6 +229,12 @@ class Modulo(BasicNode):
 
         self.output.set_value(result)
 
+    def run_batch(self, size: int) -> None:
+        dividends = get_column(self.dividend)
+        divisors = get_column(self.divisor)
+        results = [dividend % divisor for dividend, divisor in zip(dividends, divisors)]
+        set_column(self.output, results)
+
     def get_inputs(self) -> Collection[InputConnectorProto[float]]:
         return [self.dividend, self.divisor]
 
@@ -219,13 +247,10 @@ class Modulo(BasicNode):
         self.output.validate()
 
     def generate_ast(self) -> ast.Module:
-        line = (
-            f"{self.output.code_gen_name} = "
-            f"{self.dividend.code_gen_name} % {self.divisor.code_gen_name}\n"
+        statement = assign(
+            self.output.code_gen_name,
+            binop(self.dividend.code_gen_name, ast.Mod(), self.divisor.code_gen_name),
         )
-        body = ast.parse(line)
-
-        return ast.Module(
-            body=self.dividend.generate_ast().body + self.divisor.generate_ast().body + body.body,
-            type_ignores=[],
+        return module(
+            self.dividend.generate_ast().body, self.divisor.generate_ast().body, [statement]
         )
@@ -11,17 +11,34 @@ from bemore import (
     InputConnectorProto,
     OutputConnectorProto,
 )
+from bemore.core.code_gen import assign, literal, module
+from bemore.core.node import set_column
 
 
 class Int(BasicNode, CodeGeneratorProto):
+    thread_safe = True
+    fingerprint_fields = ("value",)
+
     def __init__(self, value: int) -> None:
         super().__init__()
         self.output: BasicOutput[int] = BasicOutput(self, "output", int)
         self._value = value
 
+    @property
+    def value(self) -> int:
+        return self._value
+
+    @value.setter
+    def value(self, value: int) -> None:
+        self._value = value
+        self.mark_modified()
+
     def run(self) -> None:
         self.output.set_value(self._value)
 
+    def run_batch(self, size: int) -> None:
+        set_column(self.output, [self._value] * size)
+
     def get_inputs(self) -> Collection[InputConnectorProto[Any]]:
         return []
 
@@ -32,19 +49,33 @@ class Int(BasicNode, CodeGeneratorProto):
         self.output.validate()
 
     def generate_ast(self) -> ast.Module:
-        line = f"{self.output.code_gen_name} = {self._value}\n"
-        return ast.parse(line)
+        return module([assign(self.output.code_gen_name, literal(self._value))])
 
 
 class Float(BasicNode):
+    thread_safe = True
+    fingerprint_fields = ("value",)
+
     def __init__(self, value: float) -> None:
         super().__init__()
         self.output: BasicOutput[float] = BasicOutput(self, "output", float)
         self._value = value
 
+    @property
+    def value(self) -> float:
+        return self._value
+
+    @value.setter
+    def value(self, value: float) -> None:
+        self._value = value
+        self.mark_modified()
+
     def run(self) -> None:
         self.output.set_value(self._value)
 
+    def run_batch(self, size: int) -> None:
+        set_column(self.output, [self._value] * size)
+
     def get_inputs(self) -> Collection[InputConnectorProto[Any]]:
         return []
 
@@ -55,19 +86,33 @@ class Float(BasicNode):
         self.output.validate()
 
     def generate_ast(self) -> ast.Module:
-        line = f"{self.output.code_gen_name} = {self._value}\n"
-        return ast.parse(line)
+        return module([assign(self.output.code_gen_name, literal(self._value))])
 
 
 class String(BasicNode):
+    thread_safe = True
+    fingerprint_fields = ("value",)
+
     def __init__(self, value: str) -> None:
         super().__init__()
         self.output: BasicOutput[str] = BasicOutput(self, "output", str)
         self._value = value
 
+    @property
+    def value(self) -> str:
+        return self._value
+
+    @value.setter
+    def value(self, value: str) -> None:
+        self._value = value
+        self.mark_modified()
+
     def run(self) -> None:
         self.output.set_value(self._value)
 
+    def run_batch(self, size: int) -> None:
+        set_column(self.output, [self._value] * size)
+
     def get_inputs(self) -> Collection[InputConnectorProto[Any]]:
         return []
 
@@ -78,19 +123,31 @@ class String(BasicNode):
         self.output.validate()
 
     def generate_ast(self) -> ast.Module:
-        line = f"{self.output.code_gen_name} = {self._value}\n"
-        return ast.parse(line)
+        return module([assign(self.output.code_gen_name, literal(self._value))])
 
 
 class List[_T](BasicNode):
+    # Downstream nodes may mutate the list, so a fresh copy is produced on every run
+    cacheable = False
+    fingerprint_fields = ("value",)
+
     def __init__(self) -> None:
         super().__init__()
         self.output: BasicOutput[_List[_T]] = BasicOutput(self, "output", _List[_T])
-        self.value: Optional[_List[_T]] = None
+        self._value: Optional[_List[_T]] = None
+
+    @property
+    def value(self) -> Optional[_List[_T]]:
+        return self._value
+
+    @value.setter
+    def value(self, value: Optional[_List[_T]]) -> None:
+        self._value = value
+        self.mark_modified()
 
     def run(self) -> None:
-        if self.value is not None:
-            self.output.set_value(self.value)
+        if self._value is not None:
+            self.output.set_value(list(self._value))
         else:
             self.output.set_value([])
 
@@ -104,9 +161,5 @@ class List[_T](BasicNode):
         self.output.validate()
 
     def generate_ast(self) -> ast.Module:
-        if self.value is not None:
-            line = f"{self.output.code_gen_name} = {self.value}\n"
-        else:
-            line = f"{self.output.code_gen_name} = []\n"
-
-        return ast.parse(line)
+        value = self._value if self._value is not None else []
+        return module([assign(self.output.code_gen_name, literal(value))])
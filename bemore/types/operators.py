@@ -9,9 +9,15 @@ from bemore import (
     OutputConnectorProto,
     RequiredInput,
 )
+from bemore.core.code_gen import call, expression, module, name
+from bemore.core.node import get_column, set_column
 
 
 class Append[_T](BasicNode):
+    cacheable = False
+    has_side_effects = True
+    fingerprint_fields = ()
+
     def __init__(self) -> None:
         super().__init__()
         self.list: RequiredInput[List[_T]] = RequiredInput(self, "list", List[_T])
@@ -25,6 +31,14 @@ class Append[_T](BasicNode):
 
         # Output is a relay, don't need to set its value.
 
+    def run_batch(self, size: int) -> None:
+        # Appends to each record's list in place, the same as one run per record
+        lists = get_column(self.list)
+        for input_list, value in zip(lists, get_column(self.value)):
+            input_list.append(value)
+
+        set_column(self.output, lists)
+
     def get_inputs(self) -> List[InputConnectorProto[Any]]:
         return [self.list, self.value]
 
@@ -37,5 +51,5 @@ class Append[_T](BasicNode):
         self.output.validate()
 
     def generate_ast(self) -> ast.Module:
-        line = f"{self.list.code_gen_name}.append({self.value.code_gen_name})\n"
-        return ast.parse(line)
+        append = call(f"{self.list.code_gen_name}.append", name(self.value.code_gen_name))
+        return module([expression(append)])
@@ -0,0 +1,58 @@
+import time
+from typing import List
+
+from bemore import BasicSystem, Float, connect, generate_code
+from bemore.core.node import NodeProto
+from bemore.math.basic import Product, Subtract, Sum
+
+SIZES = [10_000, 100_000]
+
+
+def build_graph(size: int) -> BasicSystem:
+    # Alternates multi-input and binary-op nodes so every code gen pattern is exercised
+    system = BasicSystem("code_gen")
+
+    first = Float(1.0)
+    nodes: List[NodeProto] = [first]
+    previous = first.output
+    while len(nodes) < size:
+        constant = Float(1.0)
+
+        summer = Sum()
+        connect(previous, summer.input)
+        connect(constant.output, summer.input)
+
+        producter = Product()
+        connect(summer.output, producter.input)
+
+        subtracter = Subtract()
+        connect(producter.output, subtracter.left)
+        connect(constant.output, subtracter.right)
+
+        nodes.extend([constant, summer, producter, subtracter])
+        previous = subtracter.output
+
+    system.add_nodes(*nodes)
+    return system
+
+
+def main() -> None:
+    print(f"{'nodes':>8} {'generate_ast (s)':>17} {'generate_code (s)':>18} {'us/node':>8}")
+    for size in SIZES:
+        system = build_graph(size)
+        system.prepare()
+
+        start = time.perf_counter()
+        system.generate_ast()
+        generated = time.perf_counter()
+        generate_code(system)
+        unparsed = time.perf_counter()
+
+        print(
+            f"{len(system.nodes):>8} {generated - start:>17.3f} {unparsed - generated:>18.3f} "
+            f"{(unparsed - generated) / size * 1e6:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
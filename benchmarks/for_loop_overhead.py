@@ -0,0 +1,24 @@
+import time
+
+from tests.system.control_flow.loop_systems import make_numeric_loop_system
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def main() -> None:
+    # Interpreted loop over a five node body, reported per element of the iterables
+    print(f"{'size':>8} {'total (s)':>10} {'per iteration (us)':>19}")
+    for size in SIZES:
+        system, _ = make_numeric_loop_system()
+        xs = [float(i) for i in range(size)]
+        ys = [float(i + 1) for i in range(size)]
+
+        start = time.perf_counter()
+        system.run(xs=xs, ys=ys)
+        elapsed = time.perf_counter() - start
+
+        print(f"{size:>8} {elapsed:>10.3f} {elapsed / size * 1e6:>19.2f}")
+
+
+if __name__ == "__main__":
+    main()
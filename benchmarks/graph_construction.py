@@ -0,0 +1,44 @@
+import time
+from typing import List
+
+from bemore import BasicSystem, Float, connect
+from bemore.core.node import NodeProto
+from bemore.math.basic import Sum
+
+SIZES = [1_000, 10_000, 50_000]
+
+
+def build_chain(size: int) -> BasicSystem:
+    system = BasicSystem("chain")
+
+    first = Float(1.0)
+    nodes: List[NodeProto] = [first]
+    previous = first.output
+    for _ in range(size - 1):
+        summer = Sum()
+        connect(previous, summer.input)
+        nodes.append(summer)
+        previous = summer.output
+
+    system.add_nodes(*nodes)
+    return system
+
+
+def main() -> None:
+    print(f"{'nodes':>8} {'build (s)':>10} {'prepare (s)':>12} {'us/node':>8}")
+    for size in SIZES:
+        start = time.perf_counter()
+        system = build_chain(size)
+        built = time.perf_counter()
+        system.prepare()
+        prepared = time.perf_counter()
+
+        total = prepared - start
+        print(
+            f"{size:>8} {built - start:>10.3f} {prepared - built:>12.3f} "
+            f"{total / size * 1e6:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import time
+from typing import Any
+
+from bemore import BasicSystem, connect
+from bemore.core.system_nodes import KeywordInput, Output
+
+SIZES = [1_000, 100_000, 1_000_000]
+
+
+def main() -> None:
+    # Keyword input relayed straight to an output, so the run is all input binding overhead
+    print(f"{'size':>8} {'run (ms)':>9}")
+    for size in SIZES:
+        keyword = KeywordInput[Any]("xs")
+        output = Output[Any]("xs")
+        system = BasicSystem("relay")
+        system.add_nodes(keyword, output)
+        connect(keyword.output, output.input)
+        values = list(range(size))
+        system.run(xs=values)
+
+        start = time.perf_counter()
+        system.run(xs=values)
+        elapsed = time.perf_counter() - start
+
+        print(f"{size:>8} {elapsed * 1e3:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import time
+
+import numpy
+
+from tests.system.control_flow.loop_systems import make_numeric_loop_system
+
+SIZE = 1_000_000
+
+
+def main() -> None:
+    xs = numpy.linspace(-5.0, 5.0, SIZE)
+    ys = numpy.linspace(1.0, 2.0, SIZE)
+
+    print(f"{'input':>8} {'scalar (s)':>11} {'vectorized (s)':>15}")
+    for label, arguments in [("ndarray", (xs, ys)), ("list", (xs.tolist(), ys.tolist()))]:
+        timings = []
+        for vectorize in [False, True]:
+            system, loop = make_numeric_loop_system()
+            loop.vectorize = vectorize
+            function = system.compile()
+
+            start = time.perf_counter()
+            function(xs=arguments[0], ys=arguments[1])
+            timings.append(time.perf_counter() - start)
+
+        print(f"{label:>8} {timings[0]:>11.3f} {timings[1]:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+from typing import Any, List, Tuple
+
+from bemore import BasicSystem, Float, connect
+from bemore.control_flow.for_loop import LAST, For
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Abs, Divide, Product, Sum
+
+
+def make_numeric_loop_system(mode: str = LAST) -> Tuple[BasicSystem, For[float]]:
+    # Loop computes abs(x * 2.0 + offset) / y over the iterables x and y
+    xs = KeywordInput[List[float]]("xs")
+    ys = KeywordInput[List[float]]("ys")
+    offset = Float(0.5)
+    loop: For[float] = For()
+    last = Output[Any]("last")
+    offset_output = Output[Any]("offset")
+
+    system = BasicSystem("outer")
+    system.add_nodes(xs, ys, offset, loop, last, offset_output)
+
+    x_input, x_node = loop.add_input("x", float)
+    loop.make_iterable("x")
+    y_input, y_node = loop.add_input("y", float)
+    loop.make_iterable("y")
+    offset_input, offset_node = loop.add_input("offset", float)
+
+    scale = Float(2.0)
+    producter = Product()
+    summer = Sum()
+    absolute: Abs[float] = Abs()
+    divider = Divide()
+    loop.subsystem.add_nodes(scale, producter, summer, absolute, divider)
+    result = loop.add_output("result", float, mode)
+    invariant = loop.add_output("invariant", float, mode)
+
+    connect(x_node.output, producter.input)
+    connect(scale.output, producter.input)
+    connect(producter.output, summer.input)
+    connect(offset_node.output, summer.input)
+    connect(summer.output, absolute.input)
+    connect(absolute.output, divider.numerator)
+    connect(y_node.output, divider.denominator)
+    outputs = {node.name: node for node in loop.subsystem.get_outputs()}
+    connect(divider.output, next(iter(outputs["result"].get_inputs())))
+    connect(offset_node.output, next(iter(outputs["invariant"].get_inputs())))
+
+    connect(xs.output, x_input)
+    connect(ys.output, y_input)
+    connect(offset.output, offset_input)
+    connect(result, last.input)
+    connect(invariant, offset_output.input)
+
+    return system, loop
@@ -1,8 +1,13 @@
-from typing import Dict, Tuple
+import array
+import operator
+from typing import Any, Dict, Iterable, Optional, Tuple
 
-from bemore import BasicSystem, Float, connect, generate_code
-from bemore.control_flow.for_loop import For
-from bemore.math.basic import Product
+import pytest
+
+from bemore import BasicSystem, Float, SystemProto, connect, generate_code
+from bemore.control_flow.for_loop import ARRAY, COLLECT, LAST, REDUCE, THREADS, For
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Divide, Product, Sum
 from bemore.types.basic import List
 from bemore.types.operators import Append
 
@@ -44,6 +49,53 @@ def make_for_loop_system() -> Tuple[BasicSystem, List[float]]:
     return outer_sys, new_list
 
 
+def make_output_modes_system(
+    reducer: Any = operator.add,
+) -> Tuple[BasicSystem, For[float]]:
+    # Every loop output gets the doubled element, combined in a different way
+    xs = KeywordInput[Any]("xs")
+    factor = Float(2.0)
+    loop: For[float] = For()
+
+    system = BasicSystem("outer")
+    system.add_nodes(xs, factor, loop)
+
+    x_input, x_node = loop.add_input("x", float)
+    loop.make_iterable("x")
+    factor_input, factor_node = loop.add_input("factor", float)
+    producter = Product()
+    loop.subsystem.add_node(producter)
+    connect(x_node.output, producter.input)
+    connect(factor_node.output, producter.input)
+    connect(xs.output, x_input)
+    connect(factor.output, factor_input)
+
+    outputs = {
+        "last": loop.add_output("last", float, LAST),
+        "list": loop.add_output("list", float, COLLECT),
+        "array": loop.add_output("array", float, ARRAY, typecode="d"),
+        "total": loop.add_output("total", float, REDUCE, function=reducer),
+        "largest": loop.add_output("largest", float, REDUCE, function=max),
+    }
+    inner_outputs = {node.name: node for node in loop.subsystem.get_outputs()}
+    for name, output in outputs.items():
+        connect(producter.output, next(iter(inner_outputs[name].get_inputs())))
+        outer_output = Output[Any](name)
+        system.add_node(outer_output)
+        connect(output, outer_output.input)
+
+    return system, loop
+
+
+EXPECTED_OUTPUTS = {
+    "last": 4.0,
+    "list": [2.0, 6.0, 4.0],
+    "array": array.array("d", [2.0, 6.0, 4.0]),
+    "total": 12.0,
+    "largest": 6.0,
+}
+
+
 def test_for_loop() -> None:
 
     system, new_list = make_for_loop_system()
@@ -52,6 +104,15 @@ def test_for_loop() -> None:
     assert new_list.output.get_value() == [1.0, 2.0, 4.0, 6.0, 7.0]
 
 
+def test_for_loop_rerun() -> None:
+
+    system, new_list = make_for_loop_system()
+    system.run()
+    system.run()
+
+    assert new_list.output.get_value() == [1.0, 2.0, 4.0, 6.0, 7.0]
+
+
 def test_for_loop_code_gen() -> None:
     system, new_list = make_for_loop_system()
 
@@ -62,3 +123,273 @@ def test_for_loop_code_gen() -> None:
     exec(code, globals, locals)
 
     assert locals[new_list.output.code_gen_name] == [1.0, 2.0, 4.0, 6.0, 7.0]
+
+
+def test_for_loop_code_gen_is_deterministic() -> None:
+    first, _ = make_for_loop_system()
+    second, _ = make_for_loop_system()
+
+    assert generate_code(first) == generate_code(second)
+
+
+@pytest.mark.parametrize("parallel", [None, THREADS])
+def test_for_loop_output_modes(parallel: Optional[str]) -> None:
+    system, loop = make_output_modes_system()
+    loop.parallel = parallel
+
+    assert system.run(xs=[1.0, 3.0, 2.0]) == EXPECTED_OUTPUTS
+    assert system.run(xs=iter([1.0, 3.0, 2.0])) == EXPECTED_OUTPUTS
+    assert system.compile()(xs=[1.0, 3.0, 2.0]) == EXPECTED_OUTPUTS
+    assert system.compile()(xs=iter([1.0, 3.0, 2.0])) == EXPECTED_OUTPUTS
+    assert system.compile()(xs=(x for x in [1.0, 3.0, 2.0])) == EXPECTED_OUTPUTS
+
+
+def test_for_loop_output_modes_code_gen() -> None:
+    system, _ = make_output_modes_system()
+    code = generate_code(system)
+
+    # Outputs are filled in by index when the length is known, and appended to otherwise
+    assert "[None] * " in code
+    assert ".append(" in code
+    assert "operator.add(" in code
+
+    system, _ = make_output_modes_system(lambda left, right: left + right)
+    assert system.run(xs=[1.0, 3.0])["total"] == 8.0
+    assert system.fingerprint is None
+    with pytest.raises(Exception):
+        generate_code(system)
+
+
+class CountingSum(Sum):
+    def __init__(self) -> None:
+        super().__init__()
+        self.runs = 0
+
+    def run(self) -> None:
+        self.runs += 1
+        super().run()
+
+
+def make_invariant_loop_system() -> Tuple[BasicSystem, CountingSum, CountingSum]:
+    # Elements are scaled by offset + 1, which only depends on the singular offset input
+    xs = KeywordInput[Any]("xs")
+    offset = KeywordInput[float]("offset")
+    loop: For[float] = For()
+    result = Output[Any]("scaled")
+
+    system = BasicSystem("outer")
+    system.add_nodes(xs, offset, loop, result)
+
+    x_input, x_node = loop.add_input("x", float)
+    loop.make_iterable("x")
+    offset_input, offset_node = loop.add_input("offset", float)
+    one = Float(1.0)
+    invariant = CountingSum()
+    varying = CountingSum()
+    producter = Product()
+    loop.subsystem.add_nodes(one, invariant, varying, producter)
+    scaled = loop.add_output("scaled", float, COLLECT)
+
+    connect(offset_node.output, invariant.input)
+    connect(one.output, invariant.input)
+    connect(x_node.output, varying.input)
+    connect(varying.output, producter.input)
+    connect(invariant.output, producter.input)
+    outputs = {node.name: node for node in loop.subsystem.get_outputs()}
+    connect(producter.output, next(iter(outputs["scaled"].get_inputs())))
+
+    connect(xs.output, x_input)
+    connect(offset.output, offset_input)
+    connect(scaled, result.input)
+
+    return system, invariant, varying
+
+
+def test_loop_invariants_run_once() -> None:
+    system, invariant, varying = make_invariant_loop_system()
+
+    assert system.run(xs=[1.0, 2.0, 3.0], offset=1.0) == {"scaled": [2.0, 4.0, 6.0]}
+    assert (invariant.runs, varying.runs) == (1, 3)
+
+    assert system.run(xs=[1.0, 2.0, 3.0], offset=2.0) == {"scaled": [3.0, 6.0, 9.0]}
+    assert (invariant.runs, varying.runs) == (2, 6)
+
+
+def test_loop_invariants_are_hoisted_in_generated_code() -> None:
+    system, invariant, varying = make_invariant_loop_system()
+    loop = next(node for node in system.nodes if isinstance(node, For))
+    loop.vectorize = False
+    code = generate_code(system)
+    first_iteration = code.index(f"if {loop._code_gen_index()} == 0:")
+
+    # Only the first iteration runs the invariant statements
+    assert code.index("for ") < first_iteration < code.index(invariant.output.code_gen_name)
+    assert code.index(varying.output.code_gen_name) > code.index(invariant.output.code_gen_name)
+    assert system.compile()(xs=[1.0, 2.0], offset=1.0) == {"scaled": [2.0, 4.0]}
+
+    loop.hoist_invariants = False
+    code = generate_code(system)
+    assert code.index(invariant.output.code_gen_name) > code.index("for ")
+    assert " == 0:" not in code
+
+
+@pytest.mark.parametrize("vectorize", [False, True])
+def test_loop_invariants_of_empty_loops_do_not_run(vectorize: bool) -> None:
+    # The invariant divides by zero, which no iteration ever gets to
+    system, invariant, varying = make_invariant_loop_system()
+    loop = next(node for node in system.nodes if isinstance(node, For))
+    loop.vectorize = vectorize
+    zero = Float(0.0)
+    divider = Divide()
+    loop.subsystem.add_nodes(zero, divider)
+    connect(invariant.output, divider.numerator)
+    connect(zero.output, divider.denominator)
+    loop.add_output("ratio", float)
+    inner_output = next(node for node in loop.subsystem.get_outputs() if node.name == "ratio")
+    connect(divider.output, next(iter(inner_output.get_inputs())))
+
+    empty: Tuple[Iterable[float], ...] = ([], iter([]))
+    for xs in empty:
+        assert system.run(xs=xs, offset=1.0) == {"scaled": []}
+        assert system.compile()(xs=xs, offset=1.0) == {"scaled": []}
+
+    with pytest.raises(ZeroDivisionError):
+        system.compile()(xs=[1.0], offset=1.0)
+
+
+def add_scaling_loop(system: BasicSystem, source: Any, factor: float) -> Tuple[For[float], Any]:
+    # Collects the elements of the source multiplied by the factor
+    scale = Float(factor)
+    loop: For[float] = For()
+    loop.vectorize = False
+    system.add_nodes(scale, loop)
+
+    x_input, x_node = loop.add_input("x", float)
+    loop.make_iterable("x")
+    factor_input, factor_node = loop.add_input("factor", float)
+    producter = Product()
+    loop.subsystem.add_node(producter)
+    connect(x_node.output, producter.input)
+    connect(factor_node.output, producter.input)
+    connect(source, x_input)
+    connect(scale.output, factor_input)
+
+    output = loop.add_output("scaled", float, COLLECT)
+    (inner_output,) = loop.subsystem.get_outputs()
+    connect(producter.output, next(iter(inner_output.get_inputs())))
+    return loop, output
+
+
+def make_loop_chain_system() -> Tuple[BasicSystem, For[float]]:
+    # Two chained loops and a third over the same elements as the first
+    xs = KeywordInput[Any]("xs")
+    system = BasicSystem("outer")
+    system.add_node(xs)
+
+    first, doubled = add_scaling_loop(system, xs.output, 2.0)
+    _, tripled = add_scaling_loop(system, doubled, 3.0)
+    _, halved = add_scaling_loop(system, xs.output, 0.5)
+    for name, output in [("tripled", tripled), ("halved", halved)]:
+        outer_output = Output[Any](name)
+        system.add_node(outer_output)
+        connect(output, outer_output.input)
+
+    return system, first
+
+
+def test_loops_over_the_same_iterations_are_fused() -> None:
+    system, first = make_loop_chain_system()
+    expected = {"tripled": [6.0, 18.0, 12.0], "halved": [0.5, 1.5, 1.0]}
+    assert system.run(xs=[1.0, 3.0, 2.0]) == expected
+
+    # Lists are iterated again by every loop, so one loop goes over them
+    code = generate_code(system)
+    fused = code[: code.index("\nelse:")]
+    assert fused.count("for ") == 1
+    # Nothing but the second loop reads the list of the first
+    assert next(iter(first.get_outputs())).code_gen_name not in fused
+    assert system.compile()(xs=[1.0, 3.0, 2.0]) == expected
+
+    first.fuse = False
+    assert generate_code(system).count("for ") == 3
+    assert system.compile()(xs=[1.0, 3.0, 2.0]) == expected
+
+
+def test_loops_over_the_same_iterator_are_not_fused() -> None:
+    # The first loop uses the iterator up, the loop over the same iterator gets nothing
+    system, _ = make_loop_chain_system()
+    expected = {"tripled": [6.0, 18.0, 12.0], "halved": []}
+
+    assert system.run(xs=iter([1.0, 3.0, 2.0])) == expected
+    assert system.compile()(xs=iter([1.0, 3.0, 2.0])) == expected
+
+
+def test_loops_appending_to_lists_are_not_fused() -> None:
+    # Appending is a side effect, so the loop keeps its place. A COLLECT output would fuse.
+    system, new_list = make_for_loop_system()
+    appending = next(node for node in system.nodes if isinstance(node, For))
+    iterator = next(input for input in appending.get_inputs() if input.name == "iterator")
+    source = iterator.get_connections()[0]
+    scaling, scaled = add_scaling_loop(system, source, 2.0)
+    result = Output[Any]("scaled")
+    system.add_node(result)
+    connect(scaled, result.input)
+
+    assert appending._fusion_chain() == [appending]
+    assert scaling._fusion_chain() == [scaling]
+    expected = [1.0, 2.0, 4.0, 6.0, 7.0]
+    assert system.run() == system.compile()() == {"scaled": expected}
+    assert new_list.output.get_value() == expected
+
+
+def add_nested_loop(system: SystemProto, source: Any, depth: int, mode: str) -> Any:
+    # Loops over nested lists of the given depth, doubling the innermost elements
+    loop: For[Any] = For()
+    system.add_node(loop)
+    iterable_input, iterable_node = loop.add_input("xs", Any)
+    loop.make_iterable("xs")
+    connect(source, iterable_input)
+
+    if depth == 1:
+        factor = Float(2.0)
+        producter = Product()
+        loop.subsystem.add_nodes(factor, producter)
+        connect(iterable_node.output, producter.input)
+        connect(factor.output, producter.input)
+        value = producter.output
+    else:
+        value = add_nested_loop(loop.subsystem, iterable_node.output, depth - 1, mode)
+
+    output = loop.add_output("result", Any, mode)
+    output_node = next(iter(loop.subsystem.get_outputs()))
+    connect(value, next(iter(output_node.get_inputs())))
+    return output
+
+
+def make_nested_loop_system(depth: int, mode: str) -> BasicSystem:
+    xs = KeywordInput[Any]("xs")
+    result = Output[Any]("result")
+    system = BasicSystem("outer")
+    system.add_nodes(xs, result)
+    connect(add_nested_loop(system, xs.output, depth, mode), result.input)
+    return system
+
+
+@pytest.mark.parametrize("mode", [LAST, COLLECT])
+def test_nested_loops_generate_code_of_linear_size(mode: str) -> None:
+    lines = [
+        len(generate_code(make_nested_loop_system(depth, mode)).splitlines())
+        for depth in range(1, 6)
+    ]
+
+    growth = [after - before for before, after in zip(lines, lines[1:])]
+    assert len(set(growth)) == 1
+
+
+def test_nested_loops_collect_from_iterators() -> None:
+    system = make_nested_loop_system(2, COLLECT)
+    expected = {"result": [[2.0, 4.0], [6.0]]}
+
+    assert system.run(xs=[[1.0, 2.0], [3.0]]) == expected
+    assert system.compile()(xs=[[1.0, 2.0], [3.0]]) == expected
+    assert system.compile()(xs=iter([iter([1.0, 2.0]), (x for x in [3.0])])) == expected
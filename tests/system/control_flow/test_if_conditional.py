@@ -1,88 +1,202 @@
-# def make_for_if_loop_system() -> Tuple[BasicSystem, List[int], List[int]]:
+from typing import Any, Dict, Tuple
+
+from bemore import BasicSystem, Float, Int, connect, generate_code
+from bemore.control_flow.for_loop import For
+from bemore.control_flow.if_condition import If
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Modulo, Product, Sum
+from bemore.types.basic import List
+from bemore.types.operators import Append
+
+
+class CountingProduct(Product):
+    def __init__(self) -> None:
+        super().__init__()
+        self.runs = 0
+        self.batches = 0
+
+    def run(self) -> None:
+        self.runs += 1
+        super().run()
+
+    def run_batch(self, size: int) -> None:
+        self.batches += 1
+        super().run_batch(size)
+
+
+def make_for_if_loop_system() -> Tuple[BasicSystem, List[int], List[int]]:
+    # Outer system does the looping
+    outer_sys = BasicSystem("outer")
+    all_list: List[int] = List()
+    all_list.value = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+    even_list: List[int] = List()
+    odd_list: List[int] = List()
+    loop: For[int] = For()
+    outer_sys.add_nodes(all_list, even_list, odd_list, loop)
+
+    value_input, value_node = loop.add_input("value", int)
+    loop.make_iterable("value")
+    even_input, even_node = loop.add_input("even", list)
+    odd_input, odd_node = loop.add_input("odd", list)
 
-#     # True system, append even values
-#     even_sys = BasicSystem("even")
-#     even_append: Append[float] = Append()
-#     even_sys.add_node(even_append)
+    # The loop body appends odd values to one list and even values to the other
+    if_node = If()
+    modulo = Modulo()
+    two = Int(2)
+    loop.subsystem.add_nodes(if_node, modulo, two)
 
-#     # False system, append odd values
-#     odd_sys = BasicSystem("odd")
-#     odd_append: Append[float] = Append()
-#     odd_sys.add_node(odd_append)
+    if_value_input, true_value_node, false_value_node = if_node.add_input("value", int)
+    if_even_input, _, false_even_node = if_node.add_input("even", list)
+    if_odd_input, true_odd_node, _ = if_node.add_input("odd", list)
 
-#     # If conditional
-#     if_sys = BasicSystem("if")
-#     if_node = If()
-#     if_node.true_system = odd_sys
-#     if_node.false_system = even_sys
-#     even_list_relay_pair = if_node.add_input("even")
-#     odd_list_relay_pair = if_node.add_input("odd")
-#     value_relay_pair = if_node.add_input("value")
-#     mod = Modulo()
-#     two = Int(2)
-#     if_sys.add_nodes(if_node, mod, two)
+    odd_append: Append[int] = Append()
+    if_node.true_subsystem.add_node(odd_append)
+    connect(true_value_node.output, odd_append.value)
+    connect(true_odd_node.output, odd_append.list)
 
-#     # Outer system does the looping
-#     outer_sys = BasicSystem("outer")
-#     all_list: List[int] = List()
-#     all_list.value = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+    even_append: Append[int] = Append()
+    if_node.false_subsystem.add_node(even_append)
+    connect(false_value_node.output, even_append.value)
+    connect(false_even_node.output, even_append.list)
 
-#     even_list: List[int] = List()
-#     odd_list: List[int] = List()
-#     loop: For[float] = For()
-#     outer_sys.add_nodes(all_list, even_list, odd_list, loop)
+    connect(value_node.output, modulo.dividend)
+    connect(two.output, modulo.divisor)
+    connect(modulo.output, if_node.condition)
+    connect(value_node.output, if_value_input)
+    connect(even_node.output, if_even_input)
+    connect(odd_node.output, if_odd_input)
 
-#     loop.system = if_sys
-#     even_list_relay = loop.add_input("even_list")
-#     odd_list_relay = loop.add_input("odd_list")
+    connect(all_list.output, value_input)
+    connect(even_list.output, even_input)
+    connect(odd_list.output, odd_input)
 
-#     # Make all connections from the if system to the even system
-#     connect(value_relay_pair.true.output, even_append.value, assert_same_system=False)
-#     connect(even_list_relay_pair.true.output, even_append.list, assert_same_system=False)
+    return outer_sys, even_list, odd_list
 
-#     # Make all connections from the if system to the odd system
-#     connect(value_relay_pair.false.output, odd_append.value, assert_same_system=False)
-#     connect(odd_list_relay_pair.false.output, odd_append.list, assert_same_system=False)
 
-#     # Make all connections for the if system
-#     connect(loop._iterator_relay.output, mod.dividend)
-#     connect(loop._iterator_relay.output, value_relay_pair.true.input, assert_same_system=False)
-#     connect(loop._iterator_relay.output, value_relay_pair.false.input, assert_same_system=False)
-#     connect(two.output, mod.divisor)
-#     connect(mod.output, if_node.condition)
+def make_if_system() -> Tuple[BasicSystem, CountingProduct, CountingProduct]:
+    # Doubles x when the flag is set, and multiplies it by ten plus one otherwise
+    flag = KeywordInput[bool]("flag")
+    x = KeywordInput[float]("x")
+    if_node = If()
+    result = Output[float]("result")
 
-#     connect(even_list_relay.output, even_list_relay_pair.true.input, assert_same_system=False)
-#     connect(even_list_relay.output, even_list_relay_pair.false.input, assert_same_system=False)
+    system = BasicSystem("outer")
+    system.add_nodes(flag, x, if_node, result)
 
-#     connect(odd_list_relay.output, odd_list_relay_pair.true.input, assert_same_system=False)
-#     connect(odd_list_relay.output, odd_list_relay_pair.false.input, assert_same_system=False)
+    x_input, true_x, false_x = if_node.add_input("x", float)
+    if_output, true_output, false_output = if_node.add_output("result", float)
 
-#     # Make all connections for the loop
-#     connect(all_list.output, loop.iterator, assert_same_system=False)
-#     connect(even_list.output, even_list_relay.input, assert_same_system=False)
-#     connect(odd_list.output, odd_list_relay.input, assert_same_system=False)
+    two = Float(2.0)
+    doubler = CountingProduct()
+    if_node.true_subsystem.add_nodes(two, doubler)
+    connect(true_x.output, doubler.input)
+    connect(two.output, doubler.input)
+    connect(doubler.output, true_output.input)
 
-#     return outer_sys, even_list, odd_list
+    ten = Float(10.0)
+    one = Float(1.0)
+    multiplier = CountingProduct()
+    summer = Sum()
+    if_node.false_subsystem.add_nodes(ten, one, multiplier, summer)
+    connect(false_x.output, multiplier.input)
+    connect(ten.output, multiplier.input)
+    connect(multiplier.output, summer.input)
+    connect(one.output, summer.input)
+    connect(summer.output, false_output.input)
 
+    connect(flag.output, if_node.condition)
+    connect(x.output, x_input)
+    connect(if_output, result.input)
 
-# def test_for_if_loop() -> None:
+    return system, doubler, multiplier
 
-#     system, even_list, odd_list = make_for_if_loop_system()
-#     system.run()
 
-#     assert even_list.output.get_value() == [0, 2, 4, 6, 8]
-#     assert odd_list.output.get_value() == [1, 3, 5, 7, 9]
+def test_for_if_loop() -> None:
+    system, even_list, odd_list = make_for_if_loop_system()
+    system.run()
 
+    assert even_list.output.get_value() == [0, 2, 4, 6, 8]
+    assert odd_list.output.get_value() == [1, 3, 5, 7, 9]
 
-# def test_for_if_loop_code_gen() -> None:
 
-#     system, even_list, odd_list = make_for_if_loop_system()
+def test_for_if_loop_code_gen() -> None:
+    system, even_list, odd_list = make_for_if_loop_system()
 
-#     code = generate_code(system)
+    code = generate_code(system)
+    assert "if " in code and "else:" in code
 
-#     globals: Dict[str, object] = {}
-#     locals: Dict[str, object] = {}
-#     exec(code, globals, locals)
+    globals: Dict[str, object] = {}
+    locals: Dict[str, object] = {}
+    exec(code, globals, locals)
 
-#     assert locals[even_list.output.code_gen_name] == [0, 2, 4, 6, 8]
-#     assert locals[odd_list.output.code_gen_name] == [1, 3, 5, 7, 9]
+    assert locals[even_list.output.code_gen_name] == [0, 2, 4, 6, 8]
+    assert locals[odd_list.output.code_gen_name] == [1, 3, 5, 7, 9]
+
+
+def test_only_the_selected_branch_runs() -> None:
+    system, doubler, multiplier = make_if_system()
+
+    assert system.run(flag=True, x=3.0) == {"result": 6.0}
+    assert (doubler.runs, multiplier.runs) == (1, 0)
+
+    assert system.run(flag=False, x=3.0) == {"result": 31.0}
+    assert (doubler.runs, multiplier.runs) == (1, 1)
+
+    function = system.compile()
+    assert function(flag=True, x=3.0) == {"result": 6.0}
+    assert function(flag=False, x=3.0) == {"result": 31.0}
+
+
+def test_if_batch_selects_per_record() -> None:
+    system, doubler, multiplier = make_if_system()
+    records: Dict[str, Any] = {"flag": [True, False, False, True], "x": [1.0, 2.0, 3.0, 4.0]}
+
+    assert system.run_batch(records) == {"result": [2.0, 21.0, 31.0, 8.0]}
+
+    # Each branch runs a single batch over its records instead of one run per record
+    assert (doubler.batches, multiplier.batches) == (1, 1)
+    assert (doubler.runs, multiplier.runs) == (0, 0)
+
+
+def test_if_batch_with_a_single_branch() -> None:
+    system, doubler, multiplier = make_if_system()
+    records: Dict[str, Any] = {"flag": [True, True], "x": [1.0, 2.0]}
+
+    assert system.run_batch(records) == {"result": [2.0, 4.0]}
+    assert (doubler.batches, multiplier.batches) == (1, 0)
+
+
+def test_if_is_cacheable_unless_its_branches_are_not() -> None:
+    system, doubler, _ = make_if_system()
+    if_node = next(node for node in system.nodes if isinstance(node, If))
+
+    # Neither branch has been planned yet
+    assert if_node.cacheable
+    assert not if_node.has_side_effects
+
+    system.run(flag=True, x=3.0)
+    system.run(flag=True, x=3.0)
+    assert doubler.runs == 1
+
+    appender: Append[float] = Append()
+    if_node.false_subsystem.add_node(appender)
+    assert not if_node.cacheable
+    assert if_node.has_side_effects
+
+
+def test_if_inputs_and_outputs_are_removed_from_both_branches() -> None:
+    system, _, _ = make_if_system()
+    if_node = next(node for node in system.nodes if isinstance(node, If))
+    fingerprint = if_node.fingerprint
+
+    if_node.add_input("unused", float)
+    if_node.add_output("unused", float)
+    assert if_node.fingerprint != fingerprint
+
+    if_node.remove_input("unused")
+    if_node.remove_output("unused")
+    assert if_node.fingerprint == fingerprint
+    for subsystem in if_node.subsystems:
+        names = [node.name for node in [*subsystem.get_inputs(), *subsystem.get_outputs()]]
+        assert "unused" not in names
+    assert system.run(flag=False, x=1.0) == {"result": 11.0}
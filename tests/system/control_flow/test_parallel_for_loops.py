@@ -0,0 +1,115 @@
+from typing import Any, Optional, Tuple
+
+import pytest
+
+from bemore import BasicSystem, Float, SystemProto, connect
+from bemore.control_flow.for_loop import PROCESSES, THREADS, For
+from bemore.core.system_nodes import Output
+from bemore.math.basic import Product
+from bemore.types.basic import List
+from bemore.types.operators import Append
+from tests.system.control_flow.test_for_loops import make_for_loop_system
+
+MODES = [THREADS, PROCESSES]
+
+
+def find_loop(system: SystemProto) -> For[Any]:
+    return next(node for node in system.nodes if isinstance(node, For))
+
+
+def make_nested_loop_system() -> Tuple[BasicSystem, List[float], For[Any]]:
+    # Outer loop goes over rows, the inner loop appends every element of a row times a factor
+    rows: List[Any] = List()
+    rows.value = [[1.0, 2.0], [3.0], [], [4.0, 5.0, 6.0]]
+    factor = Float(10.0)
+    results: List[float] = List()
+    outer: For[Any] = For()
+    last = Output[float]("last")
+
+    system = BasicSystem("outer")
+    system.add_nodes(rows, factor, results, outer, last)
+
+    row_input, row_node = outer.add_input("row", list)
+    outer.make_iterable("row")
+    factor_input, factor_node = outer.add_input("factor", float)
+    results_input, results_node = outer.add_input("results", list)
+    outer_last = outer.add_output("last", float)
+
+    inner: For[Any] = For()
+    producter = Product()
+    appender: Append[float] = Append()
+    outer.subsystem.add_nodes(inner)
+    element_input, element_node = inner.add_input("element", float)
+    inner.make_iterable("element")
+    inner_factor_input, inner_factor_node = inner.add_input("factor", float)
+    inner_results_input, inner_results_node = inner.add_input("results", list)
+    inner_last = inner.add_output("last", float)
+
+    inner.subsystem.add_nodes(producter, appender)
+    connect(element_node.output, producter.input)
+    connect(inner_factor_node.output, producter.input)
+    connect(producter.output, appender.value)
+    connect(inner_results_node.output, appender.list)
+    inner_outputs = {node.name: node for node in inner.subsystem.get_outputs()}
+    connect(producter.output, next(iter(inner_outputs["last"].get_inputs())))
+
+    connect(row_node.output, element_input)
+    connect(factor_node.output, inner_factor_input)
+    connect(results_node.output, inner_results_input)
+    outer_outputs = {node.name: node for node in outer.subsystem.get_outputs()}
+    connect(inner_last, next(iter(outer_outputs["last"].get_inputs())))
+
+    connect(rows.output, row_input)
+    connect(factor.output, factor_input)
+    connect(results.output, results_input)
+    connect(outer_last, last.input)
+
+    return system, results, outer
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("chunk_size", [1, 2, 10])
+def test_parallel_for_loop_matches_sequential(mode: str, chunk_size: int) -> None:
+    system, new_list = make_for_loop_system()
+    loop = find_loop(system)
+    loop.parallel = mode
+    loop.max_workers = 2
+    loop.chunk_size = chunk_size
+
+    system.run()
+    assert new_list.output.get_value() == [1.0, 2.0, 4.0, 6.0, 7.0]
+
+    # Running sequentially afterwards starts from a clean subsystem
+    loop.parallel = None
+    system.run()
+    assert new_list.output.get_value() == [1.0, 2.0, 4.0, 6.0, 7.0]
+
+
+@pytest.mark.parametrize("mode", [None, *MODES])
+def test_parallel_nested_for_loops(mode: Optional[str]) -> None:
+    system, results, outer = make_nested_loop_system()
+    outer.parallel = mode
+    outer.max_workers = 2
+
+    assert system.run() == {"last": 60.0}
+    assert results.output.get_value() == [10.0, 20.0, 30.0, 40.0, 50.0, 60.0]
+
+
+def test_parallel_for_loop_without_side_effects() -> None:
+    system, _, outer = make_nested_loop_system()
+    inner = find_loop(outer.subsystem)
+    inner.subsystem.remove_nodes(
+        *[node for node in inner.subsystem.nodes if isinstance(node, Append)]
+    )
+    outer.parallel = THREADS
+    outer.chunk_size = 3
+
+    assert system.run() == {"last": 60.0}
+
+
+def test_unknown_parallel_mode() -> None:
+    system, _ = make_for_loop_system()
+    find_loop(system).parallel = "gpu"
+
+    with pytest.raises(Exception):
+        system.run()
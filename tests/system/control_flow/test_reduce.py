@@ -0,0 +1,165 @@
+import ast
+import asyncio
+import itertools
+from pathlib import Path
+from typing import Any, List, Tuple
+
+from bemore import BasicSystem, Float, connect, generate_code
+from bemore.control_flow.reduce import Reduce
+from bemore.core.code_cache import CodeCache
+from bemore.core.code_gen import module
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Product, Subtract, Sum
+from bemore.types.operators import Append
+from tests.unit.core.test_code_cache import Opaque
+
+
+class CountingProduct(Product):
+    def __init__(self) -> None:
+        super().__init__()
+        self.runs = 0
+
+    def run(self) -> None:
+        self.runs += 1
+        super().run()
+
+
+class Exceeds(Subtract):
+    def run(self) -> None:
+        self.output.set_value(self.left.get_value() > self.right.get_value())
+
+    def generate_ast(self) -> ast.Module:
+        comparison = ast.Compare(
+            ast.Name(self.left.code_gen_name, ast.Load()),
+            [ast.Gt()],
+            [ast.Name(self.right.code_gen_name, ast.Load())],
+        )
+        return module(
+            [ast.Assign([ast.Name(self.output.code_gen_name, ast.Store())], comparison, lineno=0)]
+        )
+
+
+def make_reduce_system() -> Tuple[BasicSystem, Reduce[float]]:
+    # Sums the scaled items, stopping once the total exceeds the limit
+    xs = KeywordInput[Any]("xs")
+    limit = KeywordInput[float]("limit")
+    zero = Float(0.0)
+    reduce: Reduce[float] = Reduce()
+    total = Output[float]("total")
+
+    system = BasicSystem("outer")
+    system.add_nodes(xs, limit, zero, reduce, total)
+
+    factor_input, factor_node = reduce.add_input("factor", float)
+    limit_input, limit_node = reduce.add_input("limit", float)
+    factor = Float(2.0)
+    scaled = CountingProduct()
+    summer = Sum()
+    exceeds = Exceeds()
+    reduce.subsystem.add_nodes(scaled, summer, exceeds)
+    connect(reduce.item.output, scaled.input)
+    connect(factor_node.output, scaled.input)
+    connect(reduce.accumulator.output, summer.input)
+    connect(scaled.output, summer.input)
+    connect(summer.output, reduce.result.input)
+    connect(summer.output, exceeds.left)
+    connect(limit_node.output, exceeds.right)
+    connect(exceeds.output, reduce.add_stop_condition().input)
+
+    system.add_node(factor)
+    connect(xs.output, reduce.iterable)
+    connect(zero.output, reduce.initial)
+    connect(factor.output, factor_input)
+    connect(limit.output, limit_input)
+    connect(reduce.output, total.input)
+
+    return system, reduce
+
+
+def test_reduce() -> None:
+    system, _ = make_reduce_system()
+    function = system.compile()
+
+    for run in [system.run, function]:
+        assert run(xs=[1.0, 2.0, 3.0], limit=100.0) == {"total": 12.0}
+        assert run(xs=iter([1.0, 2.0, 3.0]), limit=100.0) == {"total": 12.0}
+        assert run(xs=[], limit=100.0) == {"total": 0.0}
+
+
+def test_reduce_stops_early() -> None:
+    system, reduce = make_reduce_system()
+    function = system.compile()
+
+    for run in [system.run, function]:
+        # Items are taken one at a time, so an endless iterable works once the loop stops
+        items = itertools.count(1.0)
+        assert run(xs=items, limit=10.0) == {"total": 12.0}
+        assert next(items) == 4.0
+
+    reduce.remove_stop_condition()
+    assert system.run(xs=[1.0, 2.0, 3.0], limit=1.0) == {"total": 12.0}
+    assert "break" not in generate_code(system)
+
+
+def test_reduce_is_cacheable_unless_its_subsystem_is_not() -> None:
+    system, reduce = make_reduce_system()
+    scaled = next(node for node in reduce.subsystem.nodes if isinstance(node, CountingProduct))
+
+    # The subsystem has not been planned yet
+    assert reduce.cacheable
+    assert not reduce.has_side_effects
+
+    system.run(xs=[1.0, 2.0, 3.0], limit=100.0)
+    system.run(xs=[1.0, 2.0, 3.0], limit=100.0)
+    assert scaled.runs == 3
+
+    items = KeywordInput[List[float]]("items")
+    appender: Append[float] = Append()
+    reduce.subsystem.add_nodes(items, appender)
+    connect(items.output, appender.list)
+    connect(reduce.item.output, appender.value)
+    assert not reduce.cacheable
+    assert reduce.has_side_effects
+
+
+def test_reduce_input_is_removed() -> None:
+    system, reduce = make_reduce_system()
+    fingerprint = reduce.fingerprint
+
+    reduce.add_input("unused", float)
+    assert reduce.fingerprint != fingerprint
+
+    reduce.remove_input("unused")
+    assert reduce.fingerprint == fingerprint
+    assert "unused" not in [node.name for node in reduce.subsystem.get_inputs()]
+    assert system.run(xs=[1.0, 2.0], limit=100.0) == {"total": 6.0}
+
+
+def test_reduce_code_is_cached(tmp_path: Path) -> None:
+    cache = CodeCache(tmp_path)
+    for _ in range(2):
+        system, reduce = make_reduce_system()
+        system.code_cache = cache
+        assert system.compile()(xs=[1.0, 2.0, 3.0], limit=3.0) == {"total": 6.0}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Without the stop condition the generated code differs
+    reduce.remove_stop_condition()
+    assert reduce.fingerprint is not None
+    assert system.compile()(xs=[1.0, 2.0, 3.0], limit=3.0) == {"total": 12.0}
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # The code of nodes without a fingerprint is unknown, so it is never cached
+    opaque = Opaque()
+    reduce.subsystem.add_node(opaque)
+    connect(reduce.item.output, opaque.input)
+    assert reduce.fingerprint is None
+    system.compile()
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_reduce_arun() -> None:
+    system, _ = make_reduce_system()
+
+    assert asyncio.run(system.arun(xs=[1.0, 2.0, 3.0], limit=100.0)) == {"total": 12.0}
+    assert asyncio.run(system.arun(xs=itertools.count(1.0), limit=10.0)) == {"total": 12.0}
@@ -0,0 +1,155 @@
+import itertools
+import tracemalloc
+from typing import Any, Iterable, Iterator, Tuple
+
+import pytest
+
+from bemore import BasicSystem, Float, connect, generate_code
+from bemore.control_flow.for_loop import For
+from bemore.core.connectors import OutputConnectorProto
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Product, Sum
+
+
+def add_streaming_loop(
+    system: BasicSystem, source: OutputConnectorProto[Any], node: Any, constant: float
+) -> OutputConnectorProto[Any]:
+    # Loop applying a two input math node to every element of the source and a constant
+    loop: For[float] = For()
+    loop.stream = True
+    value = Float(constant)
+    system.add_nodes(value, loop)
+
+    element_input, element_node = loop.add_input("element", float)
+    loop.make_iterable("element")
+    constant_input, constant_node = loop.add_input("constant", float)
+    loop.subsystem.add_node(node)
+    result = loop.add_output("result", float)
+
+    connect(element_node.output, node.input)
+    connect(constant_node.output, node.input)
+    outputs = {output.name: output for output in loop.subsystem.get_outputs()}
+    connect(node.output, next(iter(outputs["result"].get_inputs())))
+
+    connect(source, element_input)
+    connect(value.output, constant_input)
+
+    return result
+
+
+def make_streaming_system() -> Tuple[BasicSystem, For[float]]:
+    # Numbers are doubled, then offset by one, both loops streaming into the output
+    numbers = KeywordInput[Iterator[float]]("numbers")
+    output = Output[Iterator[float]]("results")
+
+    system = BasicSystem("outer")
+    system.add_nodes(numbers, output)
+
+    doubled = add_streaming_loop(system, numbers.output, Product(), 2.0)
+    offset = add_streaming_loop(system, doubled, Sum(), 1.0)
+    connect(offset, output.input)
+
+    first = next(node for node in system.nodes if isinstance(node, For))
+    return system, first
+
+
+def consume(results: Iterator[float], count: int) -> int:
+    # Returns the peak memory traced while pulling 'count' results
+    tracemalloc.start()
+    try:
+        for _ in itertools.islice(results, count):
+            pass
+
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_streaming_for_loops_are_lazy() -> None:
+    system, _ = make_streaming_system()
+    results = system.run(numbers=itertools.count())["results"]
+
+    assert list(itertools.islice(results, 4)) == [1.0, 3.0, 5.0, 7.0]
+
+
+def test_streaming_memory_is_constant() -> None:
+    system, _ = make_streaming_system()
+    few = consume(system.run(numbers=itertools.count())["results"], 200)
+    many = consume(system.run(numbers=itertools.count())["results"], 5_000)
+
+    assert many < few + 10_000
+
+
+def test_streaming_for_loop_code_gen() -> None:
+    system, _ = make_streaming_system()
+    function = system.compile()
+
+    results = function(numbers=iter([0.0, 0.5, 2.0]))["results"]
+    assert list(results) == [1.0, 2.0, 5.0]
+    assert "yield" in generate_code(system)
+
+
+def test_streaming_loop_reruns() -> None:
+    system, first = make_streaming_system()
+    assert not first.cacheable
+
+    assert list(system.run(numbers=iter([1.0]))["results"]) == [3.0]
+    assert list(system.run(numbers=iter([2.0, 3.0]))["results"]) == [5.0, 7.0]
+
+
+def make_two_stream_system() -> BasicSystem:
+    # One loop streams both the doubled numbers and the numbers offset by one
+    numbers = KeywordInput[Iterable[float]]("numbers")
+    loop: For[float] = For()
+    loop.stream = True
+    system = BasicSystem("outer")
+    system.add_nodes(numbers, loop)
+
+    number_input, number_node = loop.add_input("number", float)
+    loop.make_iterable("number")
+    two, one = Float(2.0), Float(1.0)
+    producter, summer = Product(), Sum()
+    loop.subsystem.add_nodes(two, one, producter, summer)
+    connect(number_node.output, producter.input)
+    connect(two.output, producter.input)
+    connect(number_node.output, summer.input)
+    connect(one.output, summer.input)
+    connect(numbers.output, number_input)
+
+    for name, source in [("doubled", producter.output), ("offset", summer.output)]:
+        loop_output = loop.add_output(name, float)
+        inner_output = next(
+            output for output in loop.subsystem.get_outputs() if output.name == name
+        )
+        connect(source, next(iter(inner_output.get_inputs())))
+        outer_output = Output[Iterator[float]](name)
+        system.add_node(outer_output)
+        connect(loop_output, outer_output.input)
+
+    return system
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_streams_are_consumed_at_their_own_pace(compiled: bool) -> None:
+    system = make_two_stream_system()
+    run = system.compile() if compiled else system.run
+
+    streams = run(numbers=itertools.count())
+    assert list(itertools.islice(streams["doubled"], 3)) == [0.0, 2.0, 4.0]
+    assert list(itertools.islice(streams["offset"], 5)) == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    # Running again while the first streams are being consumed leaves them alone
+    rerun = run(numbers=[10.0, 20.0])
+    assert list(itertools.islice(streams["doubled"], 2)) == [6.0, 8.0]
+    assert list(rerun["offset"]) == [11.0, 21.0]
+    assert list(itertools.islice(streams["offset"], 2)) == [6.0, 7.0]
+    assert list(rerun["doubled"]) == [20.0, 40.0]
+
+
+def test_streams_over_iterables_buffer_nothing() -> None:
+    # A range can be iterated again, so one stream running ahead keeps nothing for the other
+    system = make_two_stream_system()
+    few = consume(system.run(numbers=range(10**9))["doubled"], 200)
+    many = consume(system.run(numbers=range(10**9))["doubled"], 5_000)
+
+    assert many < few + 10_000
@@ -0,0 +1,113 @@
+from typing import Any, List, Tuple
+
+import pytest
+
+from bemore import BasicSystem, Float, connect, generate_code
+from bemore.control_flow.for_loop import ARRAY, COLLECT, LAST, For
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Sum
+from tests.system.control_flow.loop_systems import make_numeric_loop_system
+from tests.system.control_flow.test_for_loops import make_for_loop_system
+
+numpy = pytest.importorskip("numpy")
+
+
+def compile_both(xs: Any, ys: Any) -> Tuple[Any, Any]:
+    system, _ = make_numeric_loop_system()
+    scalar_system, scalar_loop = make_numeric_loop_system()
+    scalar_loop.vectorize = False
+
+    return system.compile()(xs=xs, ys=ys), scalar_system.compile()(xs=xs, ys=ys)
+
+
+def test_numeric_loop_is_vectorized() -> None:
+    system, loop = make_numeric_loop_system()
+    assert "numpy.asarray" in generate_code(system)
+
+    loop.vectorize = False
+    system.invalidate()
+    assert "numpy" not in generate_code(system)
+
+
+def test_other_loops_are_not_vectorized() -> None:
+    system, _ = make_for_loop_system()
+
+    assert "numpy" not in generate_code(system)
+
+
+@pytest.mark.parametrize(
+    "xs, ys",
+    [
+        ([0.5, -1.25, 3.0], [2.0, 4.0, -0.5]),
+        (numpy.linspace(-5.0, 5.0, 1001), numpy.linspace(1.0, 2.0, 1001)),
+        # Not float arrays, the scalar loop runs instead
+        ([1, 2, 3], [1, 2, 3]),
+        ([0.5, 1.5, 2.5], [1.0, 2.0]),
+    ],
+)
+def test_vectorized_loop_matches_scalar_loop(xs: Any, ys: Any) -> None:
+    vectorized, scalar = compile_both(xs, ys)
+
+    assert vectorized == scalar
+    assert isinstance(vectorized["last"], float)
+    assert vectorized["offset"] == 0.5
+
+
+def test_vectorized_loop_keeps_python_errors() -> None:
+    system, _ = make_numeric_loop_system()
+
+    with pytest.raises(ZeroDivisionError):
+        system.compile()(xs=[1.0, 2.0], ys=[1.0, 0.0])
+
+    with pytest.raises(TypeError):
+        system.compile()(xs=["a", "b"], ys=[1.0, 2.0])
+
+
+@pytest.mark.parametrize("mode", [LAST, COLLECT, ARRAY])
+@pytest.mark.parametrize(
+    "xs, ys",
+    [
+        ([0.5, -1.25, 3.0], [2.0, 4.0, -0.5]),
+        # Ill-conditioned, any difference in rounding would show
+        ([1e16, 0.1, -1e16, 3e-17, 7.0], [3.0, 1e-8, 0.7, 1e300, 0.1]),
+    ],
+)
+@pytest.mark.parametrize("lazy", [False, True])
+def test_vectorized_outputs_match_the_interpreter(mode: str, xs: Any, ys: Any, lazy: bool) -> None:
+    # Generators aren't turned into arrays, the loop runs and appends to collected outputs
+    system, _ = make_numeric_loop_system(mode)
+    assert "numpy.asarray" in generate_code(system)
+
+    compiled = system.compile()(xs=iter(xs) if lazy else xs, ys=ys)
+    interpreted = system.run(xs=iter(xs) if lazy else xs, ys=ys)
+    assert compiled == interpreted
+    assert [type(value) for value in compiled.values()] == [
+        type(value) for value in interpreted.values()
+    ]
+
+
+def test_compensated_sums_are_not_vectorized() -> None:
+    # sum() of the floats is 1.0, adding them up in order as arrays would give 0.0
+    xs = KeywordInput[List[float]]("xs")
+    loop: For[float] = For()
+    total = Output[List[float]]("total")
+    system = BasicSystem("outer")
+    system.add_nodes(xs, loop, total)
+
+    x_input, x_node = loop.add_input("x", float)
+    loop.make_iterable("x")
+    summer = Sum()
+    large, small = Float(1e16), Float(-1e16)
+    loop.subsystem.add_nodes(summer, large, small)
+    connect(large.output, summer.input)
+    connect(x_node.output, summer.input)
+    connect(small.output, summer.input)
+    output = loop.add_output("total", float, COLLECT)
+    (inner_output,) = loop.subsystem.get_outputs()
+    connect(summer.output, next(iter(inner_output.get_inputs())))
+    connect(xs.output, x_input)
+    connect(output, total.input)
+
+    assert "numpy" not in generate_code(system)
+    expected = {"total": [1.0, 2.0, 0.5]}
+    assert system.compile()(xs=[1.0, 2.0, 0.5]) == system.run(xs=[1.0, 2.0, 0.5]) == expected
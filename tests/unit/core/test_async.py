@@ -0,0 +1,204 @@
+import ast
+import asyncio
+import gc
+import threading
+from typing import Any, Collection, Dict, List
+
+import pytest
+
+from bemore import (
+    AsyncNodeProto,
+    BasicNode,
+    BasicOutput,
+    BasicSystem,
+    Float,
+    InputConnectorProto,
+    OutputConnectorProto,
+    RequiredInput,
+    connect,
+)
+from bemore.control_flow.for_loop import COLLECT, For
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Sum
+
+
+class BarrierSum(Sum, AsyncNodeProto):
+    def __init__(self, barrier: asyncio.Barrier) -> None:
+        super().__init__()
+        self._barrier = barrier
+
+    async def arun(self) -> None:
+        # Only passes if every branch is awaited at the same time
+        await asyncio.wait_for(self._barrier.wait(), timeout=5)
+        Sum.run(self)
+
+
+class AsyncDouble(BasicNode, AsyncNodeProto):
+    # Only has an async run, the sync one comes from AsyncNodeProto
+    def __init__(self) -> None:
+        super().__init__()
+        self.input: RequiredInput[float] = RequiredInput(self, "input", float)
+        self.output: BasicOutput[float] = BasicOutput(self, "output", float)
+
+    async def arun(self) -> None:
+        await asyncio.sleep(0)
+        self.output.set_value(2.0 * self.input.get_value())
+
+    def get_inputs(self) -> Collection[InputConnectorProto[Any]]:
+        return [self.input]
+
+    def get_outputs(self) -> Collection[OutputConnectorProto[Any]]:
+        return [self.output]
+
+    def validate(self) -> None:
+        pass
+
+    def generate_ast(self) -> ast.Module:
+        raise NotImplementedError()
+
+
+class ThreadRecordingSum(Sum):
+    thread_safe = True
+
+    def __init__(self, threads: List[threading.Thread]) -> None:
+        super().__init__()
+        self._threads = threads
+
+    def run(self) -> None:
+        self._threads.append(threading.current_thread())
+        super().run()
+
+
+class AsyncFailingSum(Sum, AsyncNodeProto):
+    async def arun(self) -> None:
+        await asyncio.sleep(0)
+        raise Exception("failed")
+
+
+class AsyncSlowSum(Sum, AsyncNodeProto):
+    def __init__(self) -> None:
+        super().__init__()
+        self.cancelled = False
+
+    async def arun(self) -> None:
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def test_async_branches_are_awaited_concurrently() -> None:
+    async def main() -> None:
+        width = 3
+        barrier = asyncio.Barrier(width)
+        keyword = KeywordInput[float]("x")
+        total = Sum()
+        result = Output[float]("result")
+
+        system = BasicSystem("async")
+        system.add_nodes(keyword, total, result)
+        connect(total.output, result.input)
+
+        for _ in range(width):
+            branch = BarrierSum(barrier)
+            system.add_node(branch)
+            connect(keyword.output, branch.input)
+            connect(branch.output, total.input)
+
+        assert await system.arun(x=2.0) == {"result": 6.0}
+
+    asyncio.run(main())
+
+
+def test_thread_safe_sync_nodes_are_offloaded() -> None:
+    threads: List[threading.Thread] = []
+    constant = Float(1.0)
+    summer = ThreadRecordingSum(threads)
+    result = Output[float]("result")
+
+    system = BasicSystem("async")
+    system.add_nodes(constant, summer, result)
+    connect(constant.output, summer.input)
+    connect(summer.output, result.input)
+
+    assert asyncio.run(system.arun()) == {"result": 1.0}
+    assert len(threads) == 1
+    assert threads[0] is not threading.current_thread()
+
+
+def test_async_node_runs_synchronously() -> None:
+    keyword = KeywordInput[float]("x")
+    branch = BarrierSum(asyncio.Barrier(1))
+    result = Output[float]("result")
+
+    system = BasicSystem("sync")
+    system.add_nodes(keyword, branch, result)
+    connect(keyword.output, branch.input)
+    connect(branch.output, result.input)
+
+    assert system.run(x=4.0) == {"result": 4.0}
+
+
+def make_async_loop_system() -> BasicSystem:
+    xs = KeywordInput[Any]("xs")
+    loop: For[float] = For()
+    doubled = Output[Any]("doubled")
+
+    system = BasicSystem("async")
+    system.add_nodes(xs, loop, doubled)
+
+    x_input, x_node = loop.add_input("x", float)
+    loop.make_iterable("x")
+    double = AsyncDouble()
+    loop.subsystem.add_node(double)
+    output = loop.add_output("doubled", float, COLLECT)
+    (inner_output,) = loop.subsystem.get_outputs()
+    connect(x_node.output, double.input)
+    connect(double.output, next(iter(inner_output.get_inputs())))
+    connect(xs.output, x_input)
+    connect(output, doubled.input)
+
+    return system
+
+
+def test_async_node_in_loop_body_is_awaited() -> None:
+    system = make_async_loop_system()
+
+    async def main() -> None:
+        assert await system.arun(xs=[1.0, 2.0]) == {"doubled": [2.0, 4.0]}
+        # A sync run inside the event loop runs the coroutines on a worker thread instead
+        assert system.run(xs=[3.0]) == {"doubled": [6.0]}
+
+    asyncio.run(main())
+    assert system.run(xs=[4.0]) == {"doubled": [8.0]}
+
+
+def test_failing_node_cancels_the_rest() -> None:
+    async def main() -> None:
+        handled: List[Dict[str, Any]] = []
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: handled.append(context)
+        )
+
+        keyword = KeywordInput[float]("x")
+        slow = AsyncSlowSum()
+        total = Sum()
+        result = Output[float]("result")
+
+        system = BasicSystem("async")
+        system.add_nodes(keyword, total, result)
+        connect(total.output, result.input)
+        for branch in [slow, AsyncFailingSum(), AsyncFailingSum()]:
+            system.add_node(branch)
+            connect(keyword.output, branch.input)
+            connect(branch.output, total.input)
+
+        with pytest.raises(Exception, match="failed"):
+            await system.arun(x=1.0)
+
+        assert slow.cancelled
+        gc.collect()
+        assert handled == []
+
+    asyncio.run(main())
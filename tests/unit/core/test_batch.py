@@ -0,0 +1,111 @@
+import ast
+from collections.abc import Collection
+from typing import Any, Dict, List, Tuple
+
+from bemore import (
+    BasicNode,
+    BasicOutput,
+    BasicSystem,
+    Float,
+    InputConnectorProto,
+    OutputConnectorProto,
+    RequiredInput,
+    connect,
+)
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Divide, Sum
+from bemore.types.basic import List as ListNode
+from bemore.types.operators import Append
+
+
+class Negate(BasicNode):
+    # No vectorized implementation, runs once per record
+    def __init__(self) -> None:
+        super().__init__()
+        self.input: RequiredInput[float] = RequiredInput(self, "input", float)
+        self.output: BasicOutput[float] = BasicOutput(self, "output", float)
+        self.runs = 0
+
+    def run(self) -> None:
+        self.runs += 1
+        self.output.set_value(-self.input.get_value())
+
+    def get_inputs(self) -> Collection[InputConnectorProto[Any]]:
+        return [self.input]
+
+    def get_outputs(self) -> Collection[OutputConnectorProto[Any]]:
+        return [self.output]
+
+    def validate(self) -> None:
+        self.input.validate()
+
+    def generate_ast(self) -> ast.Module:
+        return ast.Module(body=[], type_ignores=[])
+
+
+def make_system() -> Tuple[BasicSystem, Negate]:
+    x = KeywordInput[float]("x")
+    y = KeywordInput[float]("y")
+    offset = Float(1.0)
+    summer = Sum()
+    negate = Negate()
+    divider = Divide()
+    total = Output[float]("total")
+    ratio = Output[float]("ratio")
+
+    system = BasicSystem("batch")
+    system.add_nodes(x, y, offset, summer, negate, divider, total, ratio)
+
+    connect(x.output, summer.input)
+    connect(offset.output, summer.input)
+    connect(summer.output, negate.input)
+    connect(negate.output, total.input)
+    connect(x.output, divider.numerator)
+    connect(y.output, divider.denominator)
+    connect(divider.output, ratio.input)
+
+    return system, negate
+
+
+def test_run_batch_rows() -> None:
+    system, negate = make_system()
+    records = [{"x": 1.0, "y": 2.0}, {"x": 3.0, "y": 4.0}, {"x": 5.0, "y": 5.0}]
+
+    results = system.run_batch(records)
+
+    assert results == {"total": [-2.0, -4.0, -6.0], "ratio": [0.5, 0.75, 1.0]}
+    assert negate.runs == 3
+
+
+def test_run_batch_columns_matches_scalar_runs() -> None:
+    system, _ = make_system()
+    xs: List[float] = [1.0, -2.0, 7.5]
+    ys: List[float] = [4.0, 8.0, 2.5]
+
+    results = system.run_batch({"x": xs, "y": ys})
+
+    for index, (x, y) in enumerate(zip(xs, ys)):
+        scalar = system.run(x=x, y=y)
+        assert scalar == {name: column[index] for name, column in results.items()}
+
+
+def test_append_batch_matches_scalar_runs() -> None:
+    value = KeywordInput[int]("x")
+    items: ListNode[int] = ListNode()
+    items.value = [1]
+    append: Append[int] = Append()
+    output = Output[List[int]]("o")
+
+    system = BasicSystem("batch")
+    system.add_nodes(value, items, append, output)
+    connect(items.output, append.list)
+    connect(value.output, append.value)
+    connect(items.output, output.input)
+
+    records: List[Dict[str, Any]] = [{"x": 5}, {"x": 6}]
+    results = system.run_batch(records)
+
+    assert results == {"o": [[1, 5], [1, 6]]}
+    assert [{"o": column[index] for column in results.values()} for index in range(2)] == [
+        system.run(**record) for record in records
+    ]
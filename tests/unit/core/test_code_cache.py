@@ -0,0 +1,134 @@
+import ast
+from pathlib import Path
+from typing import Any, Collection
+
+import pytest
+
+from bemore import BasicNode, BasicSystem, Float, connect
+from bemore.core import code_cache
+from bemore.core.code_cache import CodeCache
+from bemore.core.connectors import InputConnectorProto, OutputConnectorProto, RequiredInput
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Product, Sum
+from tests.system.control_flow.test_for_loops import make_for_loop_system
+
+
+class Opaque(BasicNode):
+    def __init__(self) -> None:
+        super().__init__()
+        self.input: RequiredInput[float] = RequiredInput(self, "input", float)
+
+    def run(self) -> None:
+        pass
+
+    def get_inputs(self) -> Collection[InputConnectorProto[Any]]:
+        return [self.input]
+
+    def get_outputs(self) -> Collection[OutputConnectorProto[Any]]:
+        return []
+
+    def validate(self) -> None:
+        pass
+
+    def generate_ast(self) -> ast.Module:
+        return ast.Module(body=[], type_ignores=[])
+
+
+def make_system(scale: float = 2.0) -> BasicSystem:
+    x = KeywordInput[float]("x")
+    factor = Float(scale)
+    producter = Product()
+    summer = Sum()
+    result = Output[float]("result")
+
+    system = BasicSystem("cached")
+    system.add_nodes(x, factor, producter, summer, result)
+    connect(x.output, producter.input)
+    connect(factor.output, producter.input)
+    connect(producter.output, summer.input)
+    connect(x.output, summer.input)
+    connect(summer.output, result.input)
+    return system
+
+
+def test_fingerprint_is_structural() -> None:
+    assert make_system().fingerprint == make_system().fingerprint
+    assert make_system().fingerprint != make_system(3.0).fingerprint
+
+    first, _ = make_for_loop_system()
+    second, _ = make_for_loop_system()
+    assert first.fingerprint is not None
+    assert first.fingerprint == second.fingerprint
+
+
+def test_unchanged_graph_skips_code_generation(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = CodeCache(tmp_path)
+    system = make_system()
+    system.code_cache = cache
+    assert system.compile()(x=1.5) == {"result": 4.5}
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    def fail(self: BasicSystem) -> None:
+        raise AssertionError("Code was generated again.")
+
+    monkeypatch.setattr(BasicSystem, "generate_ast", fail)
+    other = make_system()
+    other.code_cache = cache
+    assert other.compile()(x=1.5) == {"result": 4.5}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_changed_graph_misses(tmp_path: Path) -> None:
+    cache = CodeCache(tmp_path)
+    system = make_system()
+    system.code_cache = cache
+    system.compile()
+
+    factor = next(node for node in system.nodes if isinstance(node, Float))
+    factor.value = 3.0
+    assert system.compile()(x=1.0) == {"result": 4.0}
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert len(list(tmp_path.iterdir())) == 2
+
+    cache.clear()
+    assert not list(tmp_path.iterdir())
+
+
+def test_changed_bemore_source_misses(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    system = make_system()
+    system.code_cache = CodeCache(tmp_path)
+    system.compile()
+
+    monkeypatch.setattr(code_cache, "_bemore_source_hash", lambda: "edited")
+    other = make_system()
+    other.code_cache = CodeCache(tmp_path)
+    assert other.compile()(x=1.5) == {"result": 4.5}
+    assert (other.code_cache.hits, other.code_cache.misses) == (0, 1)
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_unknown_nodes_are_not_cached(tmp_path: Path) -> None:
+    system = make_system()
+    opaque = Opaque()
+    system.add_node(opaque)
+    connect(next(iter(system.get_inputs())).output, opaque.input)
+    system.code_cache = CodeCache(tmp_path)
+
+    assert system.fingerprint is None
+    assert system.compile()(x=1.0) == {"result": 3.0}
+    assert not list(tmp_path.iterdir())
+
+
+def test_corrupt_entry_is_regenerated(tmp_path: Path) -> None:
+    system = make_system()
+    system.code_cache = CodeCache(tmp_path)
+    system.compile()
+
+    for path in tmp_path.iterdir():
+        path.write_bytes(b"not marshal data")
+
+    other = make_system()
+    other.code_cache = CodeCache(tmp_path)
+    assert other.compile()(x=1.0) == {"result": 3.0}
@@ -0,0 +1,79 @@
+import ast
+from typing import Dict
+
+import pytest
+
+from bemore import BasicSystem, Float, String, connect, generate_code
+from bemore.core.code_gen import assign, binop, call, literal, module, name
+from bemore.math.basic import Sum
+from bemore.types.basic import List
+
+
+def test_string_code_gen_is_quoted() -> None:
+    text = String('it\'s a "quoted" value')
+    system = BasicSystem("default")
+    system.add_node(text)
+
+    namespace: Dict[str, object] = {}
+    exec(generate_code(system), namespace)
+
+    assert namespace[text.output.code_gen_name] == 'it\'s a "quoted" value'
+
+
+def test_list_code_gen() -> None:
+    values: List[object] = List()
+    values.value = [1, 2.5, "three", None, (4, 5)]
+    system = BasicSystem("default")
+    system.add_node(values)
+
+    namespace: Dict[str, object] = {}
+    exec(generate_code(system), namespace)
+
+    assert namespace[values.output.code_gen_name] == [1, 2.5, "three", None, (4, 5)]
+
+
+def test_helpers() -> None:
+    statements = [
+        assign("a", literal(3)),
+        assign("b", call("math.prod", literal([2, 4]))),
+        assign("c", binop("a", ast.Sub(), "b")),
+        assign("d", call("abs", name("c"))),
+    ]
+
+    assert ast.unparse(module(statements)) == "a = 3\nb = math.prod([2, 4])\nc = a - b\nd = abs(c)"
+
+
+def test_literal_rejects_unknown_values() -> None:
+    with pytest.raises(TypeError):
+        literal(object())
+
+
+def make_sum_system() -> BasicSystem:
+    a = Float(1.5)
+    b = Float(2.5)
+    summer = Sum()
+    connect(a.output, summer.input)
+    connect(b.output, summer.input)
+
+    system = BasicSystem("default")
+    system.add_nodes(a, b, summer)
+    return system
+
+
+def test_identical_graphs_generate_identical_code() -> None:
+    system = make_sum_system()
+    system.optimizations = ()
+    code = generate_code(system)
+
+    other = make_sum_system()
+    other.optimizations = ()
+    assert code == generate_code(other)
+    assert (
+        code
+        == "output_0 = 1.5\noutput_1 = 2.5\ninput_2 = [output_0, output_1]\noutput_3 = sum(input_2)"
+    )
+
+
+def test_code_gen_name_requires_system() -> None:
+    with pytest.raises(Exception):
+        Float(1.0).output.code_gen_name
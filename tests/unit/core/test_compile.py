@@ -0,0 +1,106 @@
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from bemore import BasicSystem, Float, connect
+from bemore.control_flow.for_loop import For
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Divide, Product, Sum
+
+
+def make_system() -> Tuple[BasicSystem, Float]:
+    x = KeywordInput[float]("x")
+    y = KeywordInput[float]("y")
+    offset = Float(1.0)
+    summer = Sum()
+    divider = Divide()
+    total = Output[float]("total")
+    ratio = Output[float]("ratio")
+
+    system = BasicSystem("compiled system")
+    system.add_nodes(x, y, offset, summer, divider, total, ratio)
+
+    connect(x.output, summer.input)
+    connect(offset.output, summer.input)
+    connect(summer.output, total.input)
+    connect(x.output, divider.numerator)
+    connect(y.output, divider.denominator)
+    connect(divider.output, ratio.input)
+
+    return system, offset
+
+
+def test_compiled_function_matches_run() -> None:
+    system, _ = make_system()
+    function = system.compile()
+
+    assert function.__name__ == "compiled_system"
+    for x, y in [(1.0, 2.0), (-3.0, 4.0), (10.0, 0.5)]:
+        assert function(x=x, y=y) == system.run(x=x, y=y)
+
+
+def test_compiled_function_is_cached() -> None:
+    system, offset = make_system()
+    function = system.compile()
+
+    assert system.compile() is function
+
+    offset.value = 5.0
+    assert system.compile() is not function
+    assert system.compile()(x=1.0, y=1.0) == {"total": 6.0, "ratio": 1.0}
+
+
+def test_compiled_function_takes_keyword_arguments_only() -> None:
+    system, _ = make_system()
+
+    with pytest.raises(TypeError):
+        system.compile()(1.0, 2.0)
+
+
+def make_loop_system() -> Tuple[BasicSystem, KeywordInput[List[float]], Float]:
+    values = KeywordInput[List[float]]("values")
+    loop: For[float] = For()
+    result = Output[float]("last")
+
+    system = BasicSystem("outer")
+    system.add_nodes(values, loop, result)
+
+    iterator_input, iterator_node = loop.add_input("iterator", float)
+    loop.make_iterable("iterator")
+    scale = Float(2.0)
+    producter = Product()
+    loop.subsystem.add_nodes(scale, producter)
+    loop_output = loop.add_output("scaled", float)
+
+    connect(iterator_node.output, producter.input)
+    connect(scale.output, producter.input)
+    subsystem_output = next(iter(loop.subsystem.get_outputs()))
+    connect(producter.output, next(iter(subsystem_output.get_inputs())))
+    connect(values.output, iterator_input)
+    connect(loop_output, result.input)
+
+    return system, values, scale
+
+
+def test_subsystem_changes_invalidate_compiled_function() -> None:
+    system, _, scale = make_loop_system()
+
+    function = system.compile()
+    assert function(values=[1.0, 2.0, 3.0]) == {"last": 6.0}
+
+    scale.value = 3.0
+    assert system.compile() is not function
+    assert system.compile()(values=[1.0, 2.0, 3.0]) == {"last": 9.0}
+
+
+@pytest.mark.parametrize("name", ["len", "zip", "math", "output_0", "output_1"])
+def test_names_do_not_shadow_what_generated_code_uses(name: str) -> None:
+    # The loop calls builtins, imports math and names its own variables output_<n>
+    system, values, _ = make_loop_system()
+    values.name = name
+    system.name = "sum"
+    inputs: Dict[str, Any] = {name: [1.0, 2.0, 3.0]}
+    function = system.compile()
+
+    assert function.__name__ == "sum_"
+    assert function(**inputs) == system.run(**inputs) == {"last": 6.0}
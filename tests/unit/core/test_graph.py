@@ -0,0 +1,64 @@
+import pytest
+
+from bemore.core.graph import CycleError, DiGraph
+
+
+def make_diamond() -> DiGraph[str]:
+    graph: DiGraph[str] = DiGraph()
+    for node in "abcd":
+        graph.add_node(node)
+
+    graph.add_edge("a", "b")
+    graph.add_edge("a", "c")
+    graph.add_edge("b", "d")
+    graph.add_edge("c", "d")
+
+    return graph
+
+
+def test_topological_sort() -> None:
+    graph = make_diamond()
+    order = graph.topological_sort()
+
+    for source, target in graph.edges():
+        assert order.index(source) < order.index(target)
+
+
+def test_neighbor_queries() -> None:
+    graph = make_diamond()
+
+    assert list(graph.successors("a")) == ["b", "c"]
+    assert list(graph.predecessors("d")) == ["b", "c"]
+    assert graph.ancestors(["d"]) == {"a", "b", "c"}
+    assert graph.descendants(["b"]) == {"d"}
+
+
+def test_remove_node() -> None:
+    graph = make_diamond()
+    graph.remove_node("b")
+
+    assert "b" not in graph
+    assert list(graph.successors("a")) == ["c"]
+    assert list(graph.predecessors("d")) == ["c"]
+
+
+def test_cycle_is_reported() -> None:
+    graph = make_diamond()
+    graph.add_node("e")
+    graph.add_edge("d", "e")
+    graph.add_edge("e", "b")
+
+    with pytest.raises(CycleError) as error:
+        graph.topological_sort()
+
+    cycle = error.value.cycle
+    assert sorted(cycle) == ["b", "d", "e"]
+    for index, node in enumerate(cycle):
+        assert cycle[(index + 1) % len(cycle)] in graph.successors(node)
+
+
+def test_to_networkx() -> None:
+    pytest.importorskip("networkx")
+    graph = make_diamond().to_networkx()
+
+    assert set(graph.edges) == {("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")}
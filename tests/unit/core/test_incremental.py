@@ -0,0 +1,209 @@
+from typing import Any, Tuple
+
+from bemore import BasicSystem, Float, connect
+from bemore.core.connectors import SNAPSHOT_LIMIT, snapshot
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Sum
+
+
+class CountingSum(Sum):
+    def __init__(self) -> None:
+        super().__init__()
+        self.runs = 0
+
+    def run(self) -> None:
+        self.runs += 1
+        super().run()
+
+
+class UncachedSum(CountingSum):
+    cacheable = False
+
+
+class ListTotal(CountingSum):
+    def run(self) -> None:
+        self.runs += 1
+        values: Any = self.input.get_value()[0]
+        self.output.set_value(sum(values))
+
+
+def make_system() -> Tuple[BasicSystem, Float, CountingSum, CountingSum]:
+    constant = Float(1.0)
+    keyword = KeywordInput[float]("x")
+    constant_sum = CountingSum()
+    keyword_sum = CountingSum()
+    constant_output = Output[float]("constant")
+    keyword_output = Output[float]("keyword")
+
+    system = BasicSystem("default")
+    system.add_nodes(
+        constant,
+        keyword,
+        constant_sum,
+        keyword_sum,
+        constant_output,
+        keyword_output,
+    )
+
+    connect(constant.output, constant_sum.input)
+    connect(keyword.output, keyword_sum.input)
+    connect(constant_sum.output, constant_output.input)
+    connect(keyword_sum.output, keyword_output.input)
+
+    return system, constant, constant_sum, keyword_sum
+
+
+def test_unchanged_nodes_are_not_rerun() -> None:
+    system, _, constant_sum, keyword_sum = make_system()
+
+    assert system.run(x=1.0) == {"constant": 1.0, "keyword": 1.0}
+    assert system.run(x=1.0) == {"constant": 1.0, "keyword": 1.0}
+    assert (constant_sum.runs, keyword_sum.runs) == (1, 1)
+
+
+def test_changed_keyword_input_reruns_downstream_only() -> None:
+    system, _, constant_sum, keyword_sum = make_system()
+
+    system.run(x=1.0)
+    assert system.run(x=2.0) == {"constant": 1.0, "keyword": 2.0}
+    assert (constant_sum.runs, keyword_sum.runs) == (1, 2)
+
+
+def test_changed_constant_reruns_downstream_only() -> None:
+    system, constant, constant_sum, keyword_sum = make_system()
+
+    system.run(x=1.0)
+    constant.value = 3.0
+    assert system.run(x=1.0) == {"constant": 3.0, "keyword": 1.0}
+    assert (constant_sum.runs, keyword_sum.runs) == (2, 1)
+
+
+def test_new_connection_reruns_target() -> None:
+    system, _, constant_sum, keyword_sum = make_system()
+
+    system.run(x=1.0)
+    other = Float(2.0)
+    system.add_node(other)
+    connect(other.output, constant_sum.input)
+
+    assert system.run(x=1.0) == {"constant": 3.0, "keyword": 1.0}
+    assert (constant_sum.runs, keyword_sum.runs) == (2, 1)
+
+
+def test_uncacheable_nodes_always_run() -> None:
+    constant = Float(1.0)
+    summer = UncachedSum()
+
+    system = BasicSystem("default")
+    system.add_nodes(constant, summer)
+    connect(constant.output, summer.input)
+
+    system.run()
+    system.run()
+    assert summer.runs == 2
+
+
+def test_non_incremental_system_reruns_everything() -> None:
+    system, _, constant_sum, keyword_sum = make_system()
+    system.incremental = False
+
+    system.run(x=1.0)
+    system.run(x=1.0)
+    assert (constant_sum.runs, keyword_sum.runs) == (2, 2)
+
+
+def test_requested_outputs_only_run_their_ancestors() -> None:
+    system, constant, constant_sum, keyword_sum = make_system()
+
+    assert system.run(outputs=["keyword"], x=1.0) == {"keyword": 1.0}
+    assert (constant_sum.runs, keyword_sum.runs) == (0, 1)
+    assert system.prepare(["keyword"]) is system.prepare(["keyword"])
+
+    # Skipped nodes are still stale for the next full run
+    assert system.run(x=1.0) == {"constant": 1.0, "keyword": 1.0}
+    assert (constant_sum.runs, keyword_sum.runs) == (1, 1)
+
+
+def test_partial_run_keeps_downstream_of_changes_dirty() -> None:
+    system, constant, constant_sum, keyword_sum = make_system()
+    system.run(x=1.0)
+
+    system.run(outputs=["constant"], x=2.0)
+    assert (constant_sum.runs, keyword_sum.runs) == (1, 1)
+
+    assert system.run(x=2.0) == {"constant": 1.0, "keyword": 2.0}
+    assert (constant_sum.runs, keyword_sum.runs) == (1, 2)
+
+
+def test_run_each_only_reruns_nodes_depending_on_iteration_values() -> None:
+    system, _, constant_sum, keyword_sum = make_system()
+
+    results = list(system.run_each({"x": x} for x in [1.0, 2.0, 3.0]))
+    assert [result["keyword"] for result in results] == [1.0, 2.0, 3.0]
+    assert [result["constant"] for result in results] == [1.0, 1.0, 1.0]
+    assert (constant_sum.runs, keyword_sum.runs) == (1, 3)
+
+    # The system is left up to date with the last iteration
+    assert system.run(x=3.0) == {"constant": 1.0, "keyword": 3.0}
+    assert (constant_sum.runs, keyword_sum.runs) == (1, 3)
+    assert list(system.run_each([])) == []
+
+
+def test_run_each_reruns_uncacheable_nodes() -> None:
+    constant = Float(1.0)
+    keyword = KeywordInput[float]("x")
+    summer = UncachedSum()
+    output = Output[float]("sum")
+
+    system = BasicSystem("default")
+    system.add_nodes(constant, keyword, summer, output)
+    connect(constant.output, summer.input)
+    connect(summer.output, output.input)
+
+    assert list(system.run_each({"x": x} for x in [1.0, 2.0])) == [{"sum": 1.0}, {"sum": 1.0}]
+    assert summer.runs == 2
+
+
+def make_list_total_system() -> Tuple[BasicSystem, ListTotal]:
+    keyword = KeywordInput[Any]("xs")
+    total = ListTotal()
+    output = Output[float]("total")
+
+    system = BasicSystem("default")
+    system.add_nodes(keyword, total, output)
+    connect(keyword.output, total.input)
+    connect(total.output, output.input)
+
+    return system, total
+
+
+def test_keyword_input_mutated_in_place_reruns_downstream() -> None:
+    system, total = make_list_total_system()
+
+    values = [1.0, 2.0]
+    assert system.run(xs=values) == {"total": 3.0}
+    assert system.run(xs=values) == {"total": 3.0}
+    assert total.runs == 1
+
+    values[0] = 5.0
+    assert system.run(xs=values) == {"total": 7.0}
+    assert system.run(xs=list(values)) == {"total": 7.0}
+    assert total.runs == 2
+
+
+def test_large_keyword_inputs_always_rerun_downstream() -> None:
+    system, total = make_list_total_system()
+
+    # Too many items to snapshot, so the list counts as changed on every run
+    values = [1.0] * 1_000_000
+    assert system.run(xs=values) == {"total": 1_000_000.0}
+    assert system.run(xs=values) == {"total": 1_000_000.0}
+    assert total.runs == 2
+
+
+def test_snapshot_limit_counts_nested_items() -> None:
+    small = [[1.0]] * (SNAPSHOT_LIMIT // 2 - 1)
+    large = [[1.0]] * (SNAPSHOT_LIMIT // 2 + 1)
+
+    assert snapshot(small) == snapshot(list(small))
+    assert snapshot(large) != snapshot(large)
@@ -0,0 +1,69 @@
+import pytest
+
+from bemore import BasicSystem, Float, connect
+from bemore.control_flow.for_loop import For
+from bemore.core.memo import MemoCache, freeze
+from bemore.math.basic import Product
+from bemore.types.basic import List
+from bemore.types.operators import Append
+
+
+def test_lru_eviction() -> None:
+    cache = MemoCache(maxsize=2)
+    cache.put("a", (1,))
+    cache.put("b", (2,))
+
+    # Touch "a" so "b" is the least recently used entry
+    assert cache.get("a") == (1,)
+    cache.put("c", (3,))
+
+    assert cache.get("b") is None
+    assert cache.get("c") == (3,)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    cache.maxsize = 1
+    assert len(cache) == 1
+
+
+def test_freeze() -> None:
+    assert freeze([1, [2, 3]]) == freeze([1, [2, 3]])
+    assert freeze([1, 2]) != freeze((1, 2))
+    assert freeze(1) != freeze(1.0)
+
+    with pytest.raises(TypeError):
+        freeze(bytearray(b"unhashable"))
+
+
+def test_pure_nodes_are_memoized_in_loops() -> None:
+    producter = Product()
+    appender: Append[float] = Append()
+
+    values: List[float] = List()
+    values.value = [1.0, 2.0, 1.0, 2.0, 1.0]
+    results: List[float] = List()
+    factor = Float(3.0)
+    loop: For[float] = For()
+
+    system = BasicSystem("outer")
+    system.add_nodes(values, results, factor, loop)
+    loop.subsystem.add_nodes(producter, appender)
+    loop.subsystem.memo.maxsize = 16
+
+    iterator_input, iterator_node = loop.add_input("iterator", list)
+    loop.make_iterable("iterator")
+    factor_input, factor_node = loop.add_input("factor", float)
+    results_input, results_node = loop.add_input("results", list)
+
+    connect(iterator_node.output, producter.input)
+    connect(factor_node.output, producter.input)
+    connect(producter.output, appender.value)
+    connect(results_node.output, appender.list)
+
+    connect(values.output, iterator_input)
+    connect(factor.output, factor_input)
+    connect(results.output, results_input)
+
+    system.run()
+
+    assert results.output.get_value() == [3.0, 6.0, 3.0, 6.0, 3.0]
+    assert (loop.subsystem.memo.hits, loop.subsystem.memo.misses) == (3, 2)
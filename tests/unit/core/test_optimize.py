@@ -0,0 +1,151 @@
+import ast
+from itertools import combinations
+from typing import Any, Dict, List, Sequence, cast
+
+import pytest
+
+from bemore import BasicSystem, Float, connect, generate_code
+from bemore.control_flow.for_loop import For
+from bemore.core.optimize import PASSES, optimize
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Abs, Divide, Modulo, Product, Subtract, Sum
+from tests.system.control_flow.test_for_loops import make_for_loop_system
+
+ALL_PASS_SETS = [passes for size in range(len(PASSES) + 1) for passes in combinations(PASSES, size)]
+
+
+def make_math_system() -> BasicSystem:
+    x = KeywordInput[float]("x")
+    a = Float(1e16)
+    b = Float(1.0)
+    c = Float(-1e16)
+    d = Float(-3.5)
+    summer = Sum()
+    producter = Product()
+    subtracter = Subtract()
+    divider = Divide()
+    absolute: Abs[float] = Abs()
+    modulo = Modulo()
+    constant_sum = Output[float]("constant_sum")
+    result = Output[float]("result")
+
+    system = BasicSystem("math")
+    system.add_nodes(x, a, b, c, d, summer, producter, subtracter, divider, absolute, modulo)
+    system.add_nodes(constant_sum, result)
+
+    # sum() compensates float error, the folded value must match it exactly
+    connect(a.output, summer.input)
+    connect(b.output, summer.input)
+    connect(c.output, summer.input)
+    connect(summer.output, constant_sum.input)
+
+    connect(summer.output, producter.input)
+    connect(x.output, producter.input)
+    connect(d.output, producter.input)
+    connect(producter.output, subtracter.left)
+    connect(d.output, subtracter.right)
+    connect(subtracter.output, divider.numerator)
+    connect(x.output, divider.denominator)
+    connect(divider.output, absolute.input)
+    connect(absolute.output, modulo.dividend)
+    connect(b.output, modulo.divisor)
+    connect(modulo.output, result.input)
+
+    return system
+
+
+def execute(system: BasicSystem, passes: Sequence[str]) -> Dict[str, Any]:
+    system.optimizations = passes
+    namespace: Dict[str, Any] = {}
+    exec(generate_code(system), namespace)
+    return namespace
+
+
+def test_for_loop_runs_the_same_with_any_passes() -> None:
+    expected: List[float] = []
+    for passes in ALL_PASS_SETS:
+        system, new_list = make_for_loop_system()
+        namespace = execute(system, passes)
+
+        value = namespace[new_list.output.code_gen_name]
+        assert value == (expected or value)
+        expected = value
+
+    assert expected == [1.0, 2.0, 4.0, 6.0, 7.0]
+
+
+@pytest.mark.parametrize("passes", ALL_PASS_SETS)
+def test_compiled_system_runs_the_same(passes: Sequence[str]) -> None:
+    reference = make_math_system()
+    reference.optimizations = ()
+    system = make_math_system()
+    system.optimizations = passes
+
+    for x in [1.0, -2.5, 7.0]:
+        assert system.compile()(x=x) == reference.compile()(x=x) == system.run(x=x)
+
+
+def test_passes_simplify_generated_code() -> None:
+    system, _ = make_for_loop_system()
+    code = generate_code(system)
+
+    assert code.count("import math") == 1
+    assert code.startswith("import math\n")
+    assert "input_" not in code
+    assert "math.prod([_2_output_5, 2.0])" in code
+
+    # The constant sum is folded, with the same compensated result sum() gives
+    code = generate_code(make_math_system())
+    assert "sum(" not in code
+    assert "output_6 = 1.0\n" in code
+
+
+def test_disabled_passes_leave_code_unchanged() -> None:
+    system, _ = make_for_loop_system()
+    loop = next(node for node in system.nodes if isinstance(node, For))
+    cast(BasicSystem, loop.subsystem).optimizations = ()
+    system.optimizations = ()
+
+    code = generate_code(system)
+    assert not code.startswith("import math")
+    assert "    import math" in code
+    assert "input_0 = [_2_output_5, output_1]" in code
+
+
+def test_unknown_pass() -> None:
+    system = make_math_system()
+
+    with pytest.raises(Exception):
+        system.optimizations = ["unroll_loops"]
+
+    with pytest.raises(Exception):
+        optimize(ast.parse("a = 1"), ["unroll_loops"])
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        # Reassigned names are not propagated
+        "a = 1\nb = a\na = 2\nc = b + a",
+        # Shadowed builtins are not folded
+        "sum = len\nc = sum([1, 2])",
+        # Fan-in lists are not inlined into a loop that would rebuild them
+        "a = [1, 2]\nfor i in range(3):\n    a.append(i)\nc = a",
+        # Loop values are not hoisted out of the loop
+        "for i in range(3):\n    a = i\nc = a",
+    ],
+)
+def test_optimize_keeps_semantics(source: str) -> None:
+    reference: Dict[str, Any] = {}
+    exec(source, reference)
+
+    namespace: Dict[str, Any] = {}
+    exec(ast.unparse(optimize(ast.parse(source), keep=["c"])), namespace)
+
+    assert namespace["c"] == reference["c"]
+
+
+def test_errors_are_left_for_runtime() -> None:
+    code = ast.unparse(optimize(ast.parse("a = 0\nb = 1 / a"), keep=["b"]))
+
+    assert code == "b = 1 / 0"
@@ -0,0 +1,158 @@
+import threading
+import time
+from typing import List
+
+import pytest
+
+from bemore import BasicSystem, Float, connect
+from bemore.core.system_nodes import Output
+from bemore.math.basic import Sum
+
+
+class BarrierSum(Sum):
+    thread_safe = True
+
+    def __init__(self, barrier: threading.Barrier) -> None:
+        super().__init__()
+        self._barrier = barrier
+
+    def run(self) -> None:
+        # Only passes if every branch is running at the same time
+        self._barrier.wait()
+        super().run()
+
+
+class ThreadRecordingSum(Sum):
+    thread_safe = False
+
+    def __init__(self, threads: List[threading.Thread]) -> None:
+        super().__init__()
+        self._threads = threads
+
+    def run(self) -> None:
+        self._threads.append(threading.current_thread())
+        super().run()
+
+
+class SlowSum(Sum):
+    thread_safe = True
+
+    def __init__(self, barrier: threading.Barrier) -> None:
+        super().__init__()
+        self._barrier = barrier
+        self.finished = False
+
+    def run(self) -> None:
+        self._barrier.wait()
+        time.sleep(0.2)
+        super().run()
+        self.finished = True
+
+
+class FailingSum(BarrierSum):
+    def run(self) -> None:
+        # Fails once the slow nodes are running
+        self._barrier.wait()
+        raise Exception("failed")
+
+
+def test_independent_branches_run_concurrently() -> None:
+    width = 4
+    barrier = threading.Barrier(width, timeout=5)
+    total = Sum()
+    result = Output[float]("result")
+
+    system = BasicSystem("parallel")
+    system.max_workers = width
+    system.add_nodes(total, result)
+    connect(total.output, result.input)
+
+    for index in range(width):
+        constant = Float(float(index))
+        branch = BarrierSum(barrier)
+        system.add_nodes(constant, branch)
+        connect(constant.output, branch.input)
+        connect(branch.output, total.input)
+
+    assert system.run() == {"result": 0.0 + 1.0 + 2.0 + 3.0}
+
+
+def test_thread_unsafe_nodes_run_on_calling_thread() -> None:
+    threads: List[threading.Thread] = []
+    constant = Float(2.0)
+    unsafe = ThreadRecordingSum(threads)
+    safe = Sum()
+    result = Output[float]("result")
+
+    system = BasicSystem("parallel")
+    system.max_workers = 2
+    system.add_nodes(constant, unsafe, safe, result)
+    connect(constant.output, unsafe.input)
+    connect(unsafe.output, safe.input)
+    connect(safe.output, result.input)
+
+    assert system.run() == {"result": 2.0}
+    assert threads == [threading.current_thread()]
+
+
+def test_parallel_run_is_incremental() -> None:
+    constant = Float(1.0)
+    summer = Sum()
+    result = Output[float]("result")
+
+    system = BasicSystem("parallel")
+    system.max_workers = 2
+    system.add_nodes(constant, summer, result)
+    connect(constant.output, summer.input)
+    connect(summer.output, result.input)
+
+    assert system.run() == {"result": 1.0}
+    constant.value = 5.0
+    assert system.run() == {"result": 5.0}
+
+
+def test_closing_shuts_down_the_worker_threads() -> None:
+    constant = Float(1.0)
+    summer = Sum()
+    result = Output[float]("result")
+
+    with BasicSystem("parallel") as system:
+        system.max_workers = 2
+        system.add_nodes(constant, summer, result)
+        connect(constant.output, summer.input)
+        connect(summer.output, result.input)
+        assert system.run() == {"result": 1.0}
+        executor = system._executor
+        assert executor is not None
+
+    assert system._executor is None
+    assert executor._shutdown
+
+    # A closed system can still run, with new worker threads
+    constant.value = 2.0
+    assert system.run() == {"result": 2.0}
+    system.close()
+
+
+def test_failing_node_waits_for_running_nodes() -> None:
+    barrier = threading.Barrier(3, timeout=5)
+    slow = [SlowSum(barrier), SlowSum(barrier)]
+    total = Sum()
+    result = Output[float]("result")
+
+    system = BasicSystem("parallel")
+    system.max_workers = 3
+    system.add_nodes(total, result)
+    connect(total.output, result.input)
+
+    for branch in [*slow, FailingSum(barrier)]:
+        constant = Float(1.0)
+        system.add_nodes(constant, branch)
+        connect(constant.output, branch.input)
+        connect(branch.output, total.input)
+
+    with pytest.raises(Exception, match="failed"):
+        system.run()
+
+    assert all(branch.finished for branch in slow)
+    system.close()
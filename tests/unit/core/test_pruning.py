@@ -0,0 +1,62 @@
+import logging
+from typing import Tuple
+
+import pytest
+
+from bemore import BasicSystem, Float, connect, generate_code
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.io.console import ConsolePrinter
+from bemore.math.basic import Product, Sum
+
+
+def make_system() -> Tuple[BasicSystem, Sum, Product, ConsolePrinter]:
+    x = KeywordInput[float]("x")
+    constant = Float(2.0)
+    live = Sum()
+    dead = Product()
+    printer = ConsolePrinter()
+    result = Output[float]("result")
+
+    system = BasicSystem("pruning")
+    system.add_nodes(x, constant, live, dead, printer, result)
+
+    connect(x.output, live.input)
+    connect(constant.output, live.input)
+    connect(live.output, result.input)
+    connect(x.output, dead.input)
+    connect(constant.output, dead.input)
+    connect(x.output, printer.input)
+
+    return system, live, dead, printer
+
+
+def test_dead_nodes_are_kept_by_default() -> None:
+    system, live, dead, printer = make_system()
+
+    assert dead in system.prepare().nodes
+
+
+def test_dead_nodes_are_pruned(caplog: pytest.LogCaptureFixture) -> None:
+    system, live, dead, printer = make_system()
+
+    with caplog.at_level(logging.INFO, logger="bemore.core.system"):
+        system.prune_dead_nodes = True
+        nodes = system.prepare().nodes
+
+    assert live in nodes
+    assert printer in nodes
+    assert dead not in nodes
+    assert "Pruned 1 dead node(s) from system 'pruning': Product" in caplog.text
+
+    assert system.run(x=1.0) == {"result": 3.0}
+    assert not dead.output.has_value
+
+
+def test_dead_nodes_are_not_generated() -> None:
+    system, live, dead, printer = make_system()
+    system.prune_dead_nodes = True
+
+    code = generate_code(system)
+
+    assert "math.prod" not in code
+    assert live.output.code_gen_name in code
@@ -0,0 +1,114 @@
+import traceback
+from typing import List
+
+import pytest
+
+from bemore import BasicSystem, Float, connect
+from bemore.control_flow.for_loop import For
+from bemore.core.profiling import NodeProfiler
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Divide, Product, Sum
+
+
+def make_loop_system() -> BasicSystem:
+    values = KeywordInput[List[float]]("values")
+    loop: For[float] = For()
+    loop.vectorize = False
+    last = Output[float]("last")
+
+    system = BasicSystem("profiled")
+    system.add_nodes(values, loop, last)
+
+    iterator_input, iterator_node = loop.add_input("value", float)
+    loop.make_iterable("value")
+    scale = Float(2.0)
+    producter = Product()
+    summer = Sum()
+    loop.subsystem.add_nodes(scale, producter, summer)
+    loop_output = loop.add_output("scaled", float)
+
+    connect(iterator_node.output, producter.input)
+    connect(scale.output, producter.input)
+    connect(producter.output, summer.input)
+    connect(iterator_node.output, summer.input)
+    subsystem_output = next(iter(loop.subsystem.get_outputs()))
+    connect(summer.output, next(iter(subsystem_output.get_inputs())))
+    connect(values.output, iterator_input)
+    connect(loop_output, last.input)
+
+    return system
+
+
+def find[N](system: BasicSystem, node_type: type[N]) -> N:
+    for node in system.nodes:
+        if isinstance(node, node_type):
+            return node
+        if isinstance(node, For):
+            for inner in node.subsystem.nodes:
+                if isinstance(inner, node_type):
+                    return inner
+
+    raise LookupError(node_type)
+
+
+def test_lines_map_to_nodes() -> None:
+    system = make_loop_system()
+    source_map = system.source_map
+    source_lines = source_map.source.splitlines()
+
+    loop = find(system, For)
+    producter = find(system, Product)
+    summer = find(system, Sum)
+
+    [(for_start, for_end)] = source_map.lines(loop)
+    assert source_lines[for_start - 1].lstrip().startswith("for ")
+    assert for_end > for_start
+
+    # The hoisted 'import math' also belongs to the product
+    [(import_line, _), (line, _)] = source_map.lines(producter)
+    assert source_lines[import_line - 1].strip() == "import math"
+    assert f"{producter.output.code_gen_name} = math.prod(" in source_lines[line - 1]
+    assert source_map.node_at(line) is producter
+    assert for_start < line <= for_end
+
+    [(line, _)] = source_map.lines(summer)
+    assert source_map.node_at(line) is summer
+
+
+def test_tracebacks_show_generated_source() -> None:
+    numerator = KeywordInput[float]("numerator")
+    denominator = KeywordInput[float]("denominator")
+    divider = Divide()
+    result = Output[float]("result")
+
+    system = BasicSystem("division")
+    system.add_nodes(numerator, denominator, divider, result)
+    connect(numerator.output, divider.numerator)
+    connect(denominator.output, divider.denominator)
+    connect(divider.output, result.input)
+
+    with pytest.raises(ZeroDivisionError) as error:
+        system.compile()(numerator=1.0, denominator=0.0)
+
+    frame = error.traceback[-1]
+    assert str(frame.path) == "<bemore:division>"
+    assert system.source_map.node_at(frame.lineno + 1) is divider
+    assert "/" in "".join(traceback.format_tb(error.value.__traceback__))
+
+
+def test_profiler_attributes_time_to_nodes() -> None:
+    system = make_loop_system()
+    values = [float(value) for value in range(2000)]
+
+    with NodeProfiler(system) as profiler:
+        assert system.compile()(values=values) == {"last": 5997.0}
+
+    timings = profiler.timings
+    producter = find(system, Product)
+    summer = find(system, Sum)
+    assert timings[producter] > 0.0
+    assert timings[summer] > 0.0
+
+    [_, (line, _)] = system.source_map.lines(producter)
+    assert profiler.line_hits[line] == len(values)
+    assert {node for node, _ in profiler.report()} >= {producter, summer, find(system, For)}
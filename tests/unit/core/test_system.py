@@ -0,0 +1,141 @@
+import pytest
+
+from bemore import BasicSystem, Float, connect, disconnect
+from bemore.core.graph import CycleError
+from bemore.core.system_nodes import KeywordInput, Output
+from bemore.math.basic import Subtract, Sum
+
+
+def make_sum_system() -> BasicSystem:
+    a = KeywordInput[float]("a")
+    b = Float(2.0)
+    summer = Sum()
+    result = Output[float]("result")
+
+    system = BasicSystem("default")
+    system.add_nodes(a, b, summer, result)
+
+    connect(a.output, summer.input)
+    connect(b.output, summer.input)
+    connect(summer.output, result.input)
+
+    return system
+
+
+def test_run_returns_output_values() -> None:
+    system = make_sum_system()
+
+    assert system.run(a=1.0) == {"result": 3.0}
+    assert system.run(a=5.0) == {"result": 7.0}
+
+
+def test_plan_is_reused() -> None:
+    system = make_sum_system()
+
+    plan = system.prepare()
+    system.run(a=1.0)
+
+    assert system.prepare() is plan
+
+
+def test_plan_is_invalidated_on_graph_change() -> None:
+    system = make_sum_system()
+    summer = next(node for node in system.nodes if isinstance(node, Sum))
+
+    plan = system.prepare()
+    c = Float(4.0)
+    system.add_node(c)
+    assert system.prepare() is not plan
+
+    plan = system.prepare()
+    connect(c.output, summer.input)
+    assert system.prepare() is not plan
+    assert system.run(a=1.0) == {"result": 7.0}
+
+    plan = system.prepare()
+    system.remove_node(c)
+    assert system.prepare() is not plan
+    assert c not in system.prepare().nodes
+
+
+def test_edges_are_discovered_regardless_of_connection_order() -> None:
+    a = Float(1.0)
+    b = Float(2.0)
+    summer = Sum()
+    result = Output[float]("result")
+
+    # Connect before the nodes join the system
+    connect(a.output, summer.input)
+
+    system = BasicSystem("default")
+    system.add_nodes(result, summer, a, b)
+
+    # Connect after the nodes joined the system
+    connect(b.output, summer.input)
+    connect(summer.output, result.input)
+
+    order = system.prepare().nodes
+    assert order.index(a) < order.index(summer)
+    assert order.index(b) < order.index(summer)
+    assert order.index(summer) < order.index(result)
+    assert system.run() == {"result": 3.0}
+
+
+def test_cycle_is_rejected() -> None:
+    first = Sum()
+    second = Sum()
+
+    system = BasicSystem("default")
+    system.add_nodes(first, second)
+
+    connect(first.output, second.input)
+    connect(second.output, first.input)
+
+    with pytest.raises(CycleError) as error:
+        system.run()
+
+    assert set(error.value.cycle) == {first, second}
+
+
+def test_reconnected_input_drops_its_previous_edge() -> None:
+    first = Subtract()
+    second = Subtract()
+    one = Float(1.0)
+    two = Float(2.0)
+
+    system = BasicSystem("default")
+    system.add_nodes(first, second, one, two)
+    connect(first.output, second.left)
+    connect(one.output, first.left)
+    connect(two.output, first.right)
+    connect(two.output, second.right)
+
+    # Re-targeting the input removes the edge from first, so the new connection is no cycle
+    connect(one.output, second.left)
+    connect(second.output, first.left)
+    assert second.left.get_connections() == [one.output]
+    assert second.left not in first.output.get_connections()
+
+    order = system.prepare().nodes
+    assert order.index(second) < order.index(first)
+    system.run()
+    assert first.output.get_value() == -3.0
+
+
+def test_disconnect_removes_the_edge() -> None:
+    system = make_sum_system()
+    summer = next(node for node in system.nodes if isinstance(node, Sum))
+    b = next(node for node in system.nodes if isinstance(node, Float))
+
+    disconnect(b.output, summer.input)
+    assert summer not in system.graph.successors(b)
+    assert system.run(a=1.0) == {"result": 1.0}
+
+
+def test_reserved_input_names_are_rejected() -> None:
+    system = make_sum_system()
+    keyword = next(node for node in system.get_inputs() if isinstance(node, KeywordInput))
+    keyword.name = "outputs"
+
+    with pytest.raises(Exception, match="reserved"):
+        system.run()